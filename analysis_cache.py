@@ -0,0 +1,57 @@
+import hashlib
+import os
+
+import summarizer
+from cache import TieredCache
+
+# Bump whenever the prompts or the way projections are parsed out of a
+# response change, so entries produced by the old code stop matching.
+ANALYSIS_CACHE_VERSION = '4'
+ANALYSIS_CACHE_PATH = os.getenv('ANALYSIS_CACHE_PATH', 'analysis_cache.db')
+ANALYSIS_CACHE_MEMORY_MB = float(os.getenv('ANALYSIS_CACHE_MEMORY_MB', 16))
+ANALYSIS_CACHE_DISK_MB = float(os.getenv('ANALYSIS_CACHE_DISK_MB', 256))
+ANALYSIS_TTL = float(os.getenv('ANALYSIS_TTL', 30 * 86400))
+
+analysis_cache = TieredCache(
+    'analyses',
+    memory_budget_mb=ANALYSIS_CACHE_MEMORY_MB,
+    disk_path=ANALYSIS_CACHE_PATH,
+    disk_budget_mb=ANALYSIS_CACHE_DISK_MB,
+)
+
+
+def _digest(*parts):
+    hasher = hashlib.sha256()
+    for part in parts:
+        hasher.update(part.encode('utf-8'))
+        hasher.update(b'\0')
+    return hasher.hexdigest()
+
+
+def article_hash(article):
+    return _digest(article.get('title') or '', article.get('link') or '', article.get('content') or '')
+
+
+def prompt_key(prompt, model_name):
+    return 'article:' + _digest(ANALYSIS_CACHE_VERSION, model_name, prompt)
+
+
+def final_analysis_key(articles, model_name, stock_ticker=None):
+    # The final prompt summarizes each article to SUMMARY_FINAL_ARTICLE_TOKENS,
+    # boosting sentences that mention the ticker, so both are part of the key.
+    hashes = sorted(set(article_hash(article) for article in articles))
+    return 'final:' + _digest(
+        ANALYSIS_CACHE_VERSION, model_name, (stock_ticker or '').upper(),
+        str(summarizer.SUMMARY_FINAL_ARTICLE_TOKENS), *hashes,
+    )
+
+
+def get(key):
+    entry = analysis_cache.get(key)
+    if entry is not None and entry.fresh:
+        return entry.value
+    return None
+
+
+def put(key, value):
+    analysis_cache.set(key, value, ANALYSIS_TTL)
@@ -1,19 +1,119 @@
 from textblob import TextBlob
+from textblob.en.sentiments import PatternAnalyzer
+import numpy as np
 import pandas as pd
-import yfinance as yf
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, timedelta
+from price_store import price_store
+import summarizer
+
+TRADING_DAYS_PER_YEAR = 252
+FORWARD_WINDOWS = {'1d': 1, '1m': 21, '1y': TRADING_DAYS_PER_YEAR}
+
+_sentiment_analyzer = PatternAnalyzer()
 
 def analyze_sentiment(article_text):
     analysis = TextBlob(article_text)
     return analysis.sentiment.polarity
 
-def summarize_article(article_text):
-    from gensim.summarization import summarize
-    return summarize(article_text)
+def analyze_sentiment_batch(texts):
+    # One shared analyzer for the whole batch, and each distinct text (e.g.
+    # syndicated copies of a story) is scored once.
+    scores = {}
+    polarity = np.empty(len(texts), dtype=np.float64)
+    for index, text in enumerate(texts):
+        text = text or ''
+        if text not in scores:
+            scores[text] = _sentiment_analyzer.analyze(text).polarity
+        polarity[index] = scores[text]
+    return polarity
+
+def summarize_article(article_text, max_tokens=summarizer.SUMMARY_ARTICLE_TOKENS, keywords=()):
+    return summarizer.summarize(article_text, max_tokens, keywords)
 
 def get_stock_data(stock_symbol):
-    stock = yf.Ticker(stock_symbol)
-    return stock.history(period="1y")
+    price_store.update(stock_symbol)
+    return price_store.frame(stock_symbol, start=date.today() - timedelta(days=365))
+
+def get_price_panel(stock_symbols, start=None, end=None, field="close"):
+    # Brings each symbol's local history up to date (only missing bars are
+    # downloaded), then reads the aligned dates x tickers frame from disk.
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        list(executor.map(price_store.update, stock_symbols))
+    return price_store.panel(stock_symbols, start, end, field)
+
+def price_panel(prices, field="Close"):
+    # Accepts a yfinance multi-ticker frame (columns: field, ticker), a long
+    # frame with 'Date'/'ticker' columns, or an already wide frame, and
+    # returns a dates x tickers frame without copying when possible.
+    if isinstance(prices.columns, pd.MultiIndex):
+        return prices[field]
+    if 'ticker' in prices.columns:
+        return prices.pivot(index='Date', columns='ticker', values=field)
+    return prices
 
 def calculate_growth_potential(stock_data):
-    stock_data['Moving Average'] = stock_data['Close'].rolling(window=30).mean()
-    return stock_data
+    return stock_data.assign(**{'Moving Average': stock_data['Close'].rolling(window=30).mean()})
+
+def _rsi(close, window=14):
+    change = close.diff()
+    gains = change.clip(lower=0).ewm(alpha=1 / window, adjust=False, min_periods=window).mean()
+    losses = (-change).clip(lower=0).ewm(alpha=1 / window, adjust=False, min_periods=window).mean()
+    return 100 - 100 / (1 + gains / losses)
+
+def compute_price_features(close):
+    # close is a dates x tickers frame. Every feature is computed for all
+    # tickers at once with column-wise rolling/ewm kernels; the input is only
+    # read, never modified. Returns a frame with (feature, ticker) columns.
+    log_close = np.log(close)
+    log_return = log_close.diff()
+    rolling_20 = close.rolling(window=20)
+    ema_12 = close.ewm(span=12, adjust=False).mean()
+    ema_26 = close.ewm(span=26, adjust=False).mean()
+    macd = ema_12 - ema_26
+
+    features = {
+        'return_1d': close.pct_change(fill_method=None),
+        'log_return_1d': log_return,
+        'moving_average_30': close.rolling(window=30).mean(),
+        'moving_average_200': close.rolling(window=200).mean(),
+        'zscore_20': (close - rolling_20.mean()) / rolling_20.std(),
+        'macd': macd,
+        'macd_signal': macd.ewm(span=9, adjust=False).mean(),
+        'rsi_14': _rsi(close),
+        'momentum_21': close / close.shift(21) - 1,
+        'momentum_252': close / close.shift(TRADING_DAYS_PER_YEAR) - 1,
+        'volatility_21': log_return.rolling(window=21).std() * np.sqrt(TRADING_DAYS_PER_YEAR),
+        'drawdown': close / close.cummax() - 1,
+    }
+    return pd.concat(features, axis=1, names=['feature', 'ticker'])
+
+def forward_returns(close, windows=FORWARD_WINDOWS):
+    return {name: close.shift(-days) / close - 1 for name, days in windows.items()}
+
+def join_sentiment_returns(articles, close, windows=FORWARD_WINDOWS):
+    # articles needs 'ticker' and 'published_at' columns plus either
+    # 'sentiment' or 'content'. Each article is aligned to the first trading
+    # day strictly after it was published (so same-day moves that may have
+    # preceded the story are not credited to it) and gets that day's forward
+    # return for every window, looked up with one fancy-index per window.
+    articles = articles.copy()
+    if 'sentiment' not in articles:
+        articles['sentiment'] = analyze_sentiment_batch(articles['content'].tolist())
+
+    published = pd.DatetimeIndex(pd.to_datetime(articles['published_at']))
+    if close.index.tz is not None and published.tz is None:
+        published = published.tz_localize(close.index.tz)
+    rows = close.index.searchsorted(published, side='right')
+    columns = close.columns.get_indexer(articles['ticker'])
+    valid = (rows < len(close.index)) & (columns >= 0)
+
+    articles['trade_date'] = close.index[np.minimum(rows, len(close.index) - 1)].where(valid)
+    for name, returns in forward_returns(close, windows).items():
+        values = np.full(len(articles), np.nan)
+        values[valid] = returns.to_numpy()[rows[valid], columns[valid]]
+        articles[f'return_{name}'] = values
+    return articles
+
+def sentiment_return_correlation(joined, windows=FORWARD_WINDOWS):
+    return pd.Series({name: joined['sentiment'].corr(joined[f'return_{name}']) for name in windows})
@@ -1,25 +1,48 @@
-from flask import Flask, request, jsonify
+from flask import Flask, request, jsonify, Response, stream_with_context
 from flask_cors import CORS
 import requests
-from bs4 import BeautifulSoup
 import google.generativeai as genai
-import time
 import re
+import atexit
+import threading
+import time
+import json
 from dotenv import load_dotenv
 import os
 import logging
+from urllib.parse import urljoin
 import yfinance as yf
 from datetime import datetime, timedelta
-from concurrent.futures import ThreadPoolExecutor
 
+# Load .env before the local modules below read their settings from it.
 load_dotenv()
+
+from fetch_pipeline import iter_bodies
+from article_store import article_store
+from extraction import extract_article_text, parse_finviz_news_table
+import http_client
+from cache import response_cache, NEWS_LISTING_TTL, ARTICLE_BODY_TTL
+import analysis_cache
+from llm_scheduler import scheduler, estimate_tokens
+import jobs
+import ticker_index
+import summarizer
+import tracing
+from prefetch import PrefetchScheduler, PREFETCH_ENABLED, PREFETCH_ARTICLES, PREFETCH_LOOKBACK_DAYS
+
 logging.basicConfig(level=logging.INFO)
 
 GOOGLE_API_KEY = os.getenv('GOOGLE_API_KEY')
 if not GOOGLE_API_KEY:
-    raise ValueError("GOOGLE_API_KEY not found in environment variables")
-genai.configure(api_key=GOOGLE_API_KEY)
-model = genai.GenerativeModel('gemini-1.5-flash')
+    logging.warning("GOOGLE_API_KEY not found in environment variables; analysis requests will fail")
+MODEL_NAME = 'gemini-1.5-flash'
+FINVIZ_URL = os.getenv('FINVIZ_URL', 'https://finviz.com/quote.ashx?t={ticker}')
+# Total budget for one listing fetch, retries and backoff included.
+LISTING_DEADLINE = float(os.getenv('LISTING_DEADLINE', 15))
+# Created on first use so the module imports without credentials or network
+# access; tests and benchmarks may assign their own model here.
+model = None
+_model_lock = threading.Lock()
 
 app = Flask(__name__)
 CORS(app)
@@ -28,27 +51,53 @@ PROXIES = {
     "http": "http://your_proxy_url",
     "https": "finviz.com",
 }
-requests.get('https://google.com', verify=False)
 
-MAX_RETRIES = 3
-RETRY_DELAY = 2
-REQUEST_HEADERS = {
-    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-}
+def get_model():
+    global model
+    if model is None:
+        with _model_lock:
+            if model is None:
+                if not GOOGLE_API_KEY:
+                    raise ValueError("GOOGLE_API_KEY not found in environment variables")
+                genai.configure(api_key=GOOGLE_API_KEY)
+                model = genai.GenerativeModel(MODEL_NAME)
+    return model
+
+@app.before_request
+def start_trace():
+    route = request.url_rule.rule if request.url_rule is not None else tracing.UNMATCHED_ROUTE
+    trace, token = tracing.start_request(route, profile=request.headers.get('X-Profile') == '1')
+    request.environ['tracing.trace'] = (trace, token)
+
+@app.after_request
+def tag_trace(response):
+    trace = tracing.current()
+    if trace is not None:
+        trace.status = response.status_code
+        response.headers['X-Trace-Id'] = trace.id
+    return response
+
+@app.teardown_request
+def finish_trace(error=None):
+    trace, token = request.environ.pop('tracing.trace', (None, None))
+    if trace is not None:
+        tracing.finish_request(trace, token, trace.status, str(error) if error else None)
 
 @app.route('/stock_suggestions', methods=['GET'])
 def stock_suggestions():
-    query = request.args.get('query', '').upper()
+    query = request.args.get('query', '').strip()
     if len(query) < 2:
         return jsonify({'suggestions': []})
 
     try:
-        tickers = yf.Ticker(query).info
-        if 'symbol' in tickers:
-            suggestions = [tickers['symbol']]
-        else:
-            suggestions = list(tickers.keys())[:5]  #limit 5 change to default
-        return jsonify({'suggestions': suggestions})
+        limit = int(request.args.get('limit', ticker_index.DEFAULT_LIMIT))
+        matches = ticker_index.search(query, limit)
+        if matches and matches[0]['symbol'] == query.upper():
+            article_store.record_request(matches[0]['symbol'])
+        return jsonify({
+            'suggestions': [match['symbol'] for match in matches],
+            'matches': matches,
+        })
     except Exception as e:
         logging.error(f"Error fetching stock suggestions: {str(e)}")
         return jsonify({'suggestions': []})
@@ -63,8 +112,12 @@ def search_articles():
     if not stock_ticker or not start_date:
         return jsonify({'error': 'Stock ticker and start date are required'}), 400
 
+    article_store.record_request(stock_ticker.upper())
+    job = jobs.start('search_articles', stock_ticker)
     try:
+        job.update(stage='fetching')
         articles = fetch_articles(stock_ticker, num_articles, start_date)
+        job.finish()
 
         if not articles:
             return jsonify({'message': 'No articles found'}), 404
@@ -77,8 +130,39 @@ def search_articles():
 
     except Exception as e:
         logging.error(f"Error in search_articles: {str(e)}")
+        job.finish(error=str(e))
         return jsonify({'error': 'An unexpected error occurred'}), 500
 
+@app.route('/search_articles/stream', methods=['POST'])
+def search_articles_stream():
+    data = request.get_json()
+    stock_ticker = data.get('stock_ticker')
+    num_articles = int(data.get('num_articles', 5))
+    start_date = data.get('start_date')
+
+    if not stock_ticker or not start_date:
+        return jsonify({'error': 'Stock ticker and start date are required'}), 400
+
+    article_store.record_request(stock_ticker.upper())
+    job = jobs.start('search_articles', stock_ticker)
+
+    def events():
+        job.update(stage='listing')
+        articles, fallbacks = fetch_article_listing(stock_ticker, num_articles, start_date)
+        if articles and 'error' in articles[0]:
+            raise RuntimeError(articles[0]['error'])
+
+        for index, article in enumerate(articles):
+            metadata = {key: value for key, value in article.items() if key != 'content'}
+            yield {'event': 'article', 'index': index, 'article': metadata}
+
+        job.update(stage='fetching_content', total=len(articles))
+        for index, content in iter_article_contents(stock_ticker, articles, fallbacks):
+            job.advance(failed=content == "Content not available")
+            yield {'event': 'content', 'index': index, 'content': content}
+
+    return stream_events(job, events())
+
 @app.route('/analyze_article', methods=['POST'])
 def analyze_article():
     data = request.get_json()
@@ -96,6 +180,51 @@ def analyze_article():
         logging.error(f"Error in analyze_article: {str(e)}")
         return jsonify({'error': 'An unexpected error occurred'}), 500
 
+@app.route('/analyze_articles', methods=['POST'])
+def analyze_articles():
+    data = request.get_json()
+    articles = data.get('articles')
+    stock_ticker = data.get('stock_ticker')
+
+    if not isinstance(articles, list) or not articles or not stock_ticker:
+        return jsonify({'error': 'Articles and stock ticker are required'}), 400
+
+    job = jobs.start('analyze_articles', stock_ticker, total=len(articles))
+    try:
+        job.update(stage='analyzing')
+        results, failed = analyze_articles_batch(stock_ticker, articles, job)
+        job.finish()
+        return jsonify({'articles': results, 'failed': failed})
+
+    except Exception as e:
+        logging.error(f"Error in analyze_articles: {str(e)}")
+        job.finish(error=str(e))
+        return jsonify({'error': 'An unexpected error occurred'}), 500
+
+@app.route('/analyze_articles/stream', methods=['POST'])
+def analyze_articles_stream():
+    data = request.get_json()
+    articles = data.get('articles')
+    stock_ticker = data.get('stock_ticker')
+
+    if not isinstance(articles, list) or not articles or not stock_ticker:
+        return jsonify({'error': 'Articles and stock ticker are required'}), 400
+
+    job = jobs.start('analyze_articles', stock_ticker, total=len(articles))
+
+    def events():
+        job.update(stage='analyzing')
+        outcomes = scheduler.iter_completed(lambda article: run_article_analysis(stock_ticker, article), articles)
+        for index, analysis, error in outcomes:
+            job.advance(failed=error is not None)
+            event = {'event': 'analysis', 'index': index, 'article': build_analyzed_article(articles[index], analysis)}
+            if error is not None:
+                logging.error(f"Error occurred during article analysis: {error}")
+                event['error'] = str(error)
+            yield event
+
+    return stream_events(job, events())
+
 @app.route('/generate_final_analysis', methods=['POST'])
 def generate_final_analysis_route():
     data = request.get_json()
@@ -105,198 +234,311 @@ def generate_final_analysis_route():
         return jsonify({'error': 'Articles are required'}), 400
 
     try:
-        final_analysis = generate_final_analysis(articles)
+        final_analysis = generate_final_analysis(articles, data.get('stock_ticker'))
         return jsonify({'final_analysis': final_analysis})
 
     except Exception as e:
         logging.error(f"Error in generate_final_analysis: {str(e)}")
         return jsonify({'error': 'An unexpected error occurred'}), 500
 
-@app.route('/status', methods=['GET'])
-def get_status():
-    return jsonify({'status': 'Current status message'})
+@app.route('/generate_final_analysis/stream', methods=['POST'])
+def generate_final_analysis_stream():
+    data = request.get_json()
+    articles = data.get('articles')
 
-def fetch_article_content(url):
-    for attempt in range(MAX_RETRIES):
-        try:
-            response = requests.get(url, headers=REQUEST_HEADERS, timeout=10, proxies={'http': None, 'https': None})
-            response.raise_for_status()
-
-            soup = BeautifulSoup(response.text, 'html.parser')
-            content_selectors = [
-                'div.article-content', 'div.entry-content', 'article',
-                'div.content', 'div.post-content'
-            ]
-
-            for selector in content_selectors:
-                content_div = soup.select_one(selector)
-                if content_div:
-                    content = content_div.get_text(strip=True)
-                    return content[:5000] if isinstance(content, str) else "Content not available"
-
-            logging.warning(f"Content div not found for URL: {url}")
-            return "Content not available"
-
-        except requests.RequestException as e:
-            logging.error(f"Attempt {attempt + 1} failed to fetch article content: {e}")
-            logging.error(f"Request details: URL={url}, Headers={REQUEST_HEADERS}")
-            if attempt == MAX_RETRIES - 1:
-                return "Content not available"
-            time.sleep(RETRY_DELAY)
+    if not articles:
+        return jsonify({'error': 'Articles are required'}), 400
 
-def fetch_articles(stock_ticker, num_articles, start_date):
-    url = f"https://finviz.com/quote.ashx?t={stock_ticker}"
+    job = jobs.start('generate_final_analysis')
 
-    try:
-        response = requests.get(url, headers=REQUEST_HEADERS, timeout=10, proxies={'http': None, 'https': None})
-        response.raise_for_status()
-
-        soup = BeautifulSoup(response.text, 'html.parser')
-        news_table = soup.find('table', class_='news-table')
-
-        if not news_table:
-            logging.warning("No news table found in HTML")
-            return []
-
-        articles = []
-        seen_titles = set()
-
-        start_date = datetime.strptime(start_date, '%Y-%m-%d')
-
-        for row in news_table.find_all('tr'):
-            cols = row.find_all('td')
-            if len(cols) < 2:
-                continue
-
-            title = cols[1].text.strip()
-            link = cols[1].a['href'] if cols[1].a else None
-            published_at = cols[0].text.strip()
-
-            try:
-                if len(published_at) > 8: 
-                    article_date = datetime.strptime(published_at, '%b-%d-%y %I:%M%p')
-                else: 
-                    article_date = datetime.combine(datetime.now().date(), datetime.strptime(published_at, '%I:%M%p').time())
-            except ValueError:
-                article_date = datetime.now()
-
-            if article_date >= start_date and title and link and title not in seen_titles:
-                seen_titles.add(title)
-                full_link = f"https://finviz.com/{link}" if not link.startswith("http") else link
-                articles.append({
-                    'title': title,
-                    'link': full_link,
-                    'author': "Unknown",
-                    'published_at': article_date.strftime('%Y-%m-%d %H:%M:%S'),
-                })
-
-                if len(articles) == num_articles:
-                    break
-
-        with ThreadPoolExecutor() as executor:
-            for article in articles:
-                executor.submit(fetch_article_content, article['link'])
+    def events():
+        job.update(stage='generating')
+        for text in stream_final_analysis(articles, data.get('stock_ticker')):
+            yield {'event': 'token', 'text': text}
 
-        return articles
-
-    except requests.RequestException as e:
-        logging.error(f"Failed to fetch articles from finviz: {e}")
-        logging.error(f"Request details: URL={url}, Headers={REQUEST_HEADERS}")
+    return stream_events(job, events())
 
-        return fetch_articles_from_yahoo(stock_ticker, num_articles, start_date)
+def stream_events(job, events):
+    # Streams events as NDJSON: a 'job' line first so clients can poll
+    # /status, then one line per event, then 'done' or 'error'.
+    def generate():
+        try:
+            yield json.dumps({'event': 'job', 'job_id': job.id}) + '\n'
+            for event in events:
+                yield json.dumps(event) + '\n'
+            job.finish()
+            yield json.dumps({'event': 'done', 'job': job.to_dict()}) + '\n'
+        except Exception as e:
+            logging.error(f"Error in {job.kind} stream: {str(e)}")
+            job.finish(error=str(e))
+            yield json.dumps({'event': 'error', 'error': 'An unexpected error occurred'}) + '\n'
+        finally:
+            job.finish(error='Client disconnected')
+
+    headers = {'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson', headers=headers)
 
-def fetch_articles_from_yahoo(stock_ticker, num_articles, start_date):
-    try:
-        ticker = yf.Ticker(stock_ticker)
+@app.route('/status', methods=['GET'])
+def get_status():
+    job_id = request.args.get('job_id')
+    if job_id:
+        job = jobs.get(job_id)
+        if job is None:
+            return jsonify({'error': 'Unknown job'}), 404
+        return jsonify(job.to_dict())
+
+    trace_id = request.args.get('trace_id')
+    if trace_id:
+        trace = tracing.get_trace(trace_id)
+        if trace is None:
+            return jsonify({'error': 'Unknown trace'}), 404
+        return jsonify(trace.to_dict())
+
+    return jsonify(status_snapshot())
+
+@app.route('/metrics', methods=['GET'])
+def metrics():
+    return Response(metrics_text(), mimetype='text/plain; version=0.0.4')
+
+def metrics_text():
+    return tracing.prometheus({
+        'http': http_client.stats(),
+        'llm': scheduler.stats(),
+        'summarizer': summarizer.stats(),
+        'prefetch': prefetcher.stats(),
+    })
+
+def status_snapshot():
+    job_snapshot = jobs.snapshot()
+    return {
+        'status': f"{len(job_snapshot['running'])} job(s) running",
+        'jobs': job_snapshot,
+        'http': http_client.stats(),
+        'cache': response_cache.stats(),
+        'analysis_cache': analysis_cache.analysis_cache.stats(),
+        'llm': scheduler.stats(),
+        'summarizer': summarizer.stats(),
+        'prefetch': prefetcher.stats(),
+        'tracing': tracing.stats(),
+    }
+
+def fetch_finviz_listing(stock_ticker, since=None):
+    url = FINVIZ_URL.format(ticker=stock_ticker)
+    with tracing.stage('finviz_fetch', source='finviz'):
+        html = http_client.get_text(url, NEWS_LISTING_TTL, timeout=10, deadline=time.monotonic() + LISTING_DEADLINE)
+    return finviz_articles(html, url, since)
+
+def finviz_articles(html, url, since=None):
+    with tracing.stage('finviz_parse'):
+        rows = parse_finviz_news_table(html)
+
+    if rows is None:
+        logging.warning("No news table found in HTML")
+        return []
+
+    articles = []
+    for row in rows:
+        title = row['title']
+        link = row['link']
+        published_at = row['published_at'].strftime('%Y-%m-%d %H:%M:%S')
+
+        # The table is newest first, so everything from here on is stored.
+        if since and published_at < since:
+            break
+
+        if title and link:
+            full_link = urljoin(url, link)
+            articles.append({
+                'title': title,
+                'link': full_link,
+                'author': "Unknown",
+                'published_at': published_at,
+            })
 
-        start_date = datetime.strptime(start_date, '%Y-%m-%d')
+    return articles
 
+def fetch_yahoo_listing(stock_ticker, since=None):
+    ticker = yf.Ticker(stock_ticker)
+    with tracing.stage('yahoo_fetch', source='yahoo'):
         news = ticker.news
 
-        filtered_news = [
-            article for article in news
-            if datetime.fromtimestamp(article['providerPublishTime']) >= start_date
-        ]
-
-        if not filtered_news:
-            logging.warning(f"No articles found for {stock_ticker} from {start_date}. Fetching most recent articles.")
-            filtered_news = news[:num_articles]
-
-        num_articles = min(num_articles, len(filtered_news))
-
-        formatted_articles = []
-        for article in filtered_news[:num_articles]:
-            content = fetch_article_content(article['link'])
-            formatted_articles.append({
-                'title': article['title'],
-                'link': article['link'],
-                'author': article.get('author', 'Unknown'),
-                'published_at': datetime.fromtimestamp(article['providerPublishTime']).strftime('%Y-%m-%d %H:%M:%S'),
-                'content': content if content else article.get('summary', 'Content not available')
-            })
+    articles = []
+    for article in news:
+        published_at = datetime.fromtimestamp(article['providerPublishTime']).strftime('%Y-%m-%d %H:%M:%S')
+        if since and published_at < since:
+            continue
+        articles.append({
+            'title': article['title'],
+            'link': article['link'],
+            'author': article.get('author', 'Unknown'),
+            'published_at': published_at,
+            'summary': article.get('summary'),
+        })
 
-        logging.info(f"Fetched {len(formatted_articles)} articles for {stock_ticker}")
-        return formatted_articles
+    logging.info(f"Fetched {len(articles)} articles for {stock_ticker} from Yahoo Finance")
+    return articles
 
-    except Exception as e:
-        logging.error(f"Failed to fetch articles from Yahoo Finance: {e}")
-        return [{"error": f"Failed to fetch articles: {str(e)}"}]
+def refresh_article_listing(stock_ticker):
+    # Pulls listings newer than the ticker's watermark into the article store.
+    watermark = article_store.watermark(stock_ticker)
+    since = watermark['published_at'] if watermark else None
 
-def fetch_article_content(url):
     try:
-        response = requests.get(url, headers=REQUEST_HEADERS, timeout=10)
-        response.raise_for_status()
-        soup = BeautifulSoup(response.text, 'html.parser')
+        articles = fetch_finviz_listing(stock_ticker, since)
+        source = 'finviz'
+    except requests.RequestException as e:
+        logging.error(f"Failed to fetch articles from finviz ({FINVIZ_URL.format(ticker=stock_ticker)}): {e}")
+        articles = fetch_yahoo_listing(stock_ticker, since)
+        source = 'yahoo'
+
+    inserted = article_store.add_articles(stock_ticker, articles, source)
+    logging.info(f"Stored {inserted} new {source} articles for {stock_ticker}")
 
-        content_selectors = [
-            'article', '.article-body', '.article-content', '.story-body',
-            '[itemprop="articleBody"]', '.entry-content', '.post-content'
-        ]
+def fetch_article_listing(stock_ticker, num_articles, start_date):
+    # Returns (articles, fallbacks): stored article metadata (with content
+    # when it has been fetched before), plus per-article fallback content for
+    # when a body cannot be fetched.
+    stock_ticker = stock_ticker.upper()
+    start_date = datetime.strptime(start_date, '%Y-%m-%d')
 
-        for selector in content_selectors:
-            content = soup.select_one(selector)
-            if content:
-                return content.get_text(strip=True)
+    if not article_store.is_fresh(stock_ticker, NEWS_LISTING_TTL):
+        try:
+            refresh_article_listing(stock_ticker)
+        except Exception as e:
+            logging.error(f"Failed to refresh articles for {stock_ticker}: {e}")
+            if article_store.watermark(stock_ticker) is None:
+                return [{"error": f"Failed to fetch articles: {str(e)}"}], None
+
+    return stored_article_listing(stock_ticker, num_articles, start_date)
+
+def stored_article_listing(stock_ticker, num_articles, start_date):
+    rows = article_store.query(stock_ticker, start_date, limit=num_articles)
+    articles = []
+    for row in rows:
+        article = {
+            'title': row['title'],
+            'link': row['url'],
+            'author': row['author'] or "Unknown",
+            'published_at': row['published_at'],
+        }
+        if row['content']:
+            article['content'] = row['content']
+        articles.append(article)
+    return articles, [row['summary'] for row in rows]
+
+def iter_article_contents(stock_ticker, articles, fallbacks):
+    # Yields (index, content): stored bodies straight away, the rest as the
+    # body pipeline fetches them. Fetched bodies are written back to the store.
+    stock_ticker = stock_ticker.upper()
+    missing = []
+    for index, article in enumerate(articles):
+        if article.get('content'):
+            yield index, article['content']
+        else:
+            missing.append(index)
 
+    for position, content in iter_bodies([articles[index]['link'] for index in missing], fetch_article_content):
+        index = missing[position]
+        if content:
+            article_store.save_content(stock_ticker, articles[index]['link'], content)
+        else:
+            content = fallbacks[index] if fallbacks and fallbacks[index] else "Content not available"
+        yield index, content
+
+def fetch_articles(stock_ticker, num_articles, start_date):
+    articles, fallbacks = fetch_article_listing(stock_ticker, num_articles, start_date)
+    if not articles or 'error' in articles[0]:
+        return articles
+    for index, content in iter_article_contents(stock_ticker, articles, fallbacks):
+        articles[index]['content'] = content
+    return articles
+
+def fetch_article_content(url, timeout=10, deadline=None):
+    try:
+        with tracing.stage('body_fetch', source='article'):
+            html = http_client.get_text(url, ARTICLE_BODY_TTL, timeout=timeout, deadline=deadline)
+        with tracing.stage('extraction'):
+            content = extract_article_text(html)
+        if content:
+            return content
+
+        logging.warning(f"Content div not found for URL: {url}")
         return None
     except Exception as e:
         logging.error(f"Error fetching article content: {e}")
         return None
 
-def analyze_single_article(stock_ticker, article):
-    logging.info(f"Analyzing article: {article['title']}")
-    prompt = generate_analysis_prompt(article)
-
-    try:
-        response = model.generate_content(prompt)
-        analysis_text = response.text.strip()
-
-        one_month_projection = extract_projection(analysis_text, "1 Month")
-        one_year_projection = extract_projection(analysis_text, "1 Year")
-
-        analyzed_article = {
-            'title': article['title'],
-            'link': article['link'],
-            'author': article['author'],
-            'published_at': article['published_at'],
-            'content': article['content'],
+def run_article_analysis(stock_ticker, article):
+    prompt = generate_analysis_prompt(article, stock_ticker)
+    cache_key = analysis_cache.prompt_key(prompt, MODEL_NAME)
+
+    cached = analysis_cache.get(cache_key)
+    if cached is not None:
+        logging.info(f"Analysis cache hit for article: {article['title']}")
+        return cached
+
+    response = scheduler.call(lambda: generate(prompt), estimate_tokens(prompt))
+    cached = parse_analysis(response.text.strip())
+    analysis_cache.put(cache_key, cached)
+    return cached
+
+def generate(prompt):
+    # Times the model call itself, not the time spent queued for quota.
+    with tracing.stage('llm', source='gemini') as span:
+        response = get_model().generate_content(prompt)
+        tracing.record_tokens(span, response)
+    return response
+
+def parse_analysis(analysis_text):
+    with tracing.stage('projection_extract'):
+        return {
             'analysis': analysis_text,
-            'estimated_returns_1_month': one_month_projection,
-            'estimated_returns_1_year': one_year_projection
+            'estimated_returns_1_month': extract_projection(analysis_text, "1 Month"),
+            'estimated_returns_1_year': extract_projection(analysis_text, "1 Year"),
         }
-        return analyzed_article
-    except Exception as e:
-        logging.error(f"Error occurred during article analysis: {e}")
-        return {
-            'title': article['title'],
-            'link': article['link'],
-            'author': article['author'],
-            'published_at': article['published_at'],
-            'content': article['content'],
+
+def build_analyzed_article(article, analysis=None):
+    if analysis is None:
+        analysis = {
             'analysis': 'Analysis failed',
             'estimated_returns_1_month': 'N/A',
             'estimated_returns_1_year': 'N/A'
         }
+    return {
+        'title': article['title'],
+        'link': article['link'],
+        'author': article['author'],
+        'published_at': article['published_at'],
+        'content': article['content'],
+        'analysis': analysis['analysis'],
+        'estimated_returns_1_month': analysis['estimated_returns_1_month'],
+        'estimated_returns_1_year': analysis['estimated_returns_1_year']
+    }
+
+def analyze_single_article(stock_ticker, article):
+    logging.info(f"Analyzing article: {article['title']}")
+    try:
+        return build_analyzed_article(article, run_article_analysis(stock_ticker, article))
+    except Exception as e:
+        logging.error(f"Error occurred during article analysis: {e}")
+        return build_analyzed_article(article)
+
+def analyze_articles_batch(stock_ticker, articles, job=None):
+    logging.info(f"Analyzing {len(articles)} articles for {stock_ticker}")
+    outcomes = [None] * len(articles)
+    for index, analysis, error in scheduler.iter_completed(lambda article: run_article_analysis(stock_ticker, article), articles):
+        outcomes[index] = (analysis, error)
+        if job is not None:
+            job.advance(failed=error is not None)
+
+    results = []
+    failed = []
+    for index, (article, (analysis, error)) in enumerate(zip(articles, outcomes)):
+        if error is not None:
+            logging.error(f"Error occurred during article analysis: {error}")
+            failed.append({'index': index, 'title': article.get('title'), 'error': str(error)})
+        results.append(build_analyzed_article(article, analysis))
+    return results, failed
 
 def extract_projection(analysis_text, time_frame):
     pattern = rf"Estimated Returns \({time_frame}\):\s*(.+?)(?:\n|$)"
@@ -305,8 +547,17 @@ def extract_projection(analysis_text, time_frame):
         return match.group(1).strip()
     return "Not available"
 
-def generate_analysis_prompt(article):
-    content = article['content'][:5000] if article['content'] else "Content not available"
+def ticker_keywords(stock_ticker):
+    if not stock_ticker:
+        return ()
+    return (stock_ticker, ticker_index.company_name(stock_ticker))
+
+def generate_analysis_prompt(article, stock_ticker=None):
+    # Boilerplate is stripped and the text cut down to the sentences most
+    # central to the article and most about the ticker, within a token budget.
+    with tracing.stage('prompt_build'):
+        content = summarizer.summarize(article['content'], keywords=ticker_keywords(stock_ticker)) if article['content'] else ""
+    content = content or "Content not available"
     return f"""
     **Article Details:**
     Title: {article['title']}
@@ -325,12 +576,20 @@ def generate_analysis_prompt(article):
     Please ensure that your analysis is thorough, specific to the article's content, and includes relevant quotes or paraphrases to support your points. Aim for a balanced analysis that considers both positive and negative aspects discussed in the article.
     """
 
-def generate_final_analysis(articles):
+def build_final_analysis_prompt(articles, stock_ticker=None):
     prompt = "**Final Summary Analysis:**\n\n"
     prompt += "Based on the following articles:\n\n"
 
-    for article in articles:
-        prompt += f"**Title:** {article['title']}\n**Content:** {article['content'][:500]}...\n\n"
+    with tracing.stage('prompt_build'):
+        summaries = summarizer.summarize_many([article.get('content') for article in articles], keywords=ticker_keywords(stock_ticker))
+    for article, summary in zip(articles, summaries):
+        if summary is None:
+            summary = "Covered by an earlier article"
+        elif not summary:
+            summary = "Content not available"
+        prompt += f"**Title:** {article['title']}\n**Content:** {summary}\n\n"
+    truncated = sum(len((article.get('content') or '')[:summarizer.TRUNCATED_FINAL_CHARS]) for article in articles)
+    logging.info(f"Final analysis prompt: {len(articles)} articles, {sum(len(summary or '') for summary in summaries)} chars of content (truncation would send {truncated})")
 
     prompt += """
     Provide a comprehensive analysis covering the following aspects:
@@ -365,13 +624,64 @@ def generate_final_analysis(articles):
     - Use bold (**) for key terms.
     - Only use articles related to the stock
     """
+    return prompt
 
+def generate_final_analysis(articles, stock_ticker=None):
+    cache_key = analysis_cache.final_analysis_key(articles, MODEL_NAME, stock_ticker)
     try:
-        response = model.generate_content(prompt)
-        return response.text.strip()
+        cached = analysis_cache.get(cache_key)
+        if cached is not None:
+            logging.info(f"Final analysis cache hit for {len(articles)} articles")
+            return cached['analysis']
+
+        prompt = build_final_analysis_prompt(articles, stock_ticker)
+        response = scheduler.call(lambda: generate(prompt), estimate_tokens(prompt))
+        final_analysis = response.text.strip()
+        analysis_cache.put(cache_key, {'analysis': final_analysis})
+        return final_analysis
     except Exception as e:
         logging.error(f"Error occurred while generating final analysis: {e}")
         return "Final analysis not available"
 
+def stream_final_analysis(articles, stock_ticker=None):
+    cache_key = analysis_cache.final_analysis_key(articles, MODEL_NAME, stock_ticker)
+    cached = analysis_cache.get(cache_key)
+    if cached is not None:
+        logging.info(f"Final analysis cache hit for {len(articles)} articles")
+        yield cached['analysis']
+        return
+
+    prompt = build_final_analysis_prompt(articles, stock_ticker)
+    response = scheduler.call(lambda: get_model().generate_content(prompt, stream=True), estimate_tokens(prompt))
+    parts = []
+    with tracing.stage('llm', source='gemini', stream=True) as span:
+        for chunk in response:
+            parts.append(chunk.text)
+            yield chunk.text
+        tracing.record_tokens(span, response)
+    analysis_cache.put(cache_key, {'analysis': ''.join(parts).strip()})
+
+def prefetch_ticker(stock_ticker):
+    start_date = (datetime.now() - timedelta(days=PREFETCH_LOOKBACK_DAYS)).strftime('%Y-%m-%d')
+    articles = fetch_articles(stock_ticker, PREFETCH_ARTICLES, start_date)
+    if articles and 'error' in articles[0]:
+        raise RuntimeError(articles[0]['error'])
+    return articles
+
+def is_article_analyzed(stock_ticker, article):
+    prompt = generate_analysis_prompt(article, stock_ticker)
+    return analysis_cache.get(analysis_cache.prompt_key(prompt, MODEL_NAME)) is not None
+
+prefetcher = PrefetchScheduler(
+    refresh_fn=prefetch_ticker,
+    analyze_fn=run_article_analysis,
+    popular_fn=article_store.popular_tickers,
+    is_analyzed_fn=is_article_analyzed,
+)
+if PREFETCH_ENABLED:
+    prefetcher.start()
+    atexit.register(prefetcher.stop)
+ticker_index.start_refresh()
+
 if __name__ == '__main__':
     app.run(host='0.0.0.0', port=80, debug=False)
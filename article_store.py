@@ -0,0 +1,230 @@
+import hashlib
+import os
+import re
+import sqlite3
+import threading
+import time
+from datetime import datetime, timedelta
+from urllib.parse import urlparse
+
+ARTICLE_STORE_PATH = os.getenv('ARTICLE_STORE_PATH', 'articles.db')
+CONTENT_FINGERPRINT_WORDS = 200
+# Copies of a story are only matched against articles published this close
+# to it, so a headline that recurs on later days is stored again.
+DUPLICATE_WINDOW_HOURS = float(os.getenv('DUPLICATE_WINDOW_HOURS', 48))
+DATE_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+_NON_WORD = re.compile(r'[^a-z0-9]+')
+SOURCE_TAGS = (
+    'Reuters', 'Bloomberg', 'Associated Press', 'AP', 'Yahoo Finance', 'Yahoo', 'MarketWatch', 'CNBC', 'CNN',
+    "Barron's", 'The Wall Street Journal', 'WSJ', 'Financial Times', 'FT', 'Forbes', 'Fortune', 'Business Insider',
+    'Insider Monkey', "Investor's Business Daily", 'IBD', 'The Motley Fool', 'Motley Fool', 'Zacks',
+    'Benzinga', 'Seeking Alpha', 'TipRanks', 'TheStreet', 'InvestorPlace', 'Investopedia', 'GuruFocus',
+    'Simply Wall St', 'Simply Wall St.', 'Morningstar', 'Kiplinger', 'Fox Business', 'Nasdaq', 'Quartz',
+    'GlobeNewswire', 'PR Newswire', 'Business Wire', 'Accesswire',
+)
+_SOURCE_NAMES = '|'.join(re.escape(tag) for tag in sorted(SOURCE_TAGS, key=len, reverse=True))
+_SOURCE_SUFFIX = re.compile(rf'\s*(?:\(\s*(?:{_SOURCE_NAMES})\s*\)|[-|–—:]\s*(?:{_SOURCE_NAMES}))\s*$', re.IGNORECASE)
+_STOPWORDS = frozenset('a an and are as at be by for from has in is it its of on or says that the to with'.split())
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS articles (
+    id INTEGER PRIMARY KEY,
+    ticker TEXT NOT NULL,
+    url TEXT NOT NULL,
+    url_hash TEXT NOT NULL,
+    fingerprint TEXT NOT NULL,
+    content_fingerprint TEXT,
+    duplicate_of INTEGER,
+    source TEXT,
+    title TEXT NOT NULL,
+    author TEXT,
+    published_at TEXT NOT NULL,
+    content TEXT,
+    summary TEXT,
+    stored_at REAL NOT NULL
+);
+CREATE UNIQUE INDEX IF NOT EXISTS articles_ticker_url ON articles (ticker, url_hash);
+CREATE INDEX IF NOT EXISTS articles_ticker_published ON articles (ticker, published_at);
+CREATE INDEX IF NOT EXISTS articles_ticker_fingerprint ON articles (ticker, fingerprint);
+CREATE INDEX IF NOT EXISTS articles_ticker_content_fingerprint ON articles (ticker, content_fingerprint);
+CREATE TABLE IF NOT EXISTS ticker_requests (
+    ticker TEXT PRIMARY KEY,
+    requests INTEGER NOT NULL,
+    last_requested_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS watermarks (
+    ticker TEXT PRIMARY KEY,
+    source TEXT,
+    published_at TEXT,
+    checked_at REAL NOT NULL
+);
+"""
+
+
+def _sha1(text):
+    return hashlib.sha1(text.encode('utf-8')).hexdigest()
+
+
+def title_fingerprint(title):
+    # Syndicated copies usually differ only in casing, punctuation, stopwords
+    # or a trailing "- Reuters"/"(Reuters)" tag for a known source, so hash
+    # the remaining words in order. Order matters: "Nvidia rises as AMD
+    # falls" is not "AMD rises as Nvidia falls".
+    title = _SOURCE_SUFFIX.sub('', title.strip()) or title
+    words = [word for word in _NON_WORD.sub(' ', title.lower()).split() if word not in _STOPWORDS]
+    return _sha1(' '.join(words))
+
+
+def content_fingerprint(content):
+    words = _NON_WORD.sub(' ', content.lower()).split()
+    if len(words) < 20:
+        return None
+    return _sha1(' '.join(words[:CONTENT_FINGERPRINT_WORDS]))
+
+
+def _window(published_at):
+    published = datetime.strptime(published_at, DATE_FORMAT)
+    window = timedelta(hours=DUPLICATE_WINDOW_HOURS)
+    return (published - window).strftime(DATE_FORMAT), (published + window).strftime(DATE_FORMAT)
+
+
+def _host(url):
+    return urlparse(url).netloc.lower()
+
+
+class ArticleStore:
+    def __init__(self, path=ARTICLE_STORE_PATH):
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._lock = threading.Lock()
+        with self._lock:
+            self._conn.execute('PRAGMA journal_mode=WAL')
+            self._conn.execute('PRAGMA synchronous=NORMAL')
+            self._conn.executescript(_SCHEMA)
+            self._conn.commit()
+
+    def watermark(self, ticker):
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT source, published_at, checked_at FROM watermarks WHERE ticker = ?", (ticker,)
+            ).fetchone()
+        return dict(row) if row else None
+
+    def is_fresh(self, ticker, ttl):
+        watermark = self.watermark(ticker)
+        return watermark is not None and time.time() - watermark['checked_at'] < ttl
+
+    def add_articles(self, ticker, articles, source):
+        # Inserts articles not seen before for this ticker, skipping URLs
+        # already stored. Syndicated copies, whose title fingerprint matches
+        # an article published within DUPLICATE_WINDOW_HOURS, are stored
+        # with duplicate_of set so listings hide them rather than dropped;
+        # save_content clears the mark if a body is saved and differs.
+        # Returns the number inserted.
+        inserted = 0
+        now = time.time()
+        with self._lock:
+            latest = self._conn.execute(
+                "SELECT published_at FROM watermarks WHERE ticker = ?", (ticker,)
+            ).fetchone()
+            latest = latest[0] if latest else None
+
+            for article in articles:
+                fingerprint = title_fingerprint(article['title'])
+                original = self._conn.execute(
+                    """SELECT id FROM articles WHERE ticker = ? AND fingerprint = ? AND duplicate_of IS NULL
+                       AND published_at BETWEEN ? AND ? ORDER BY id LIMIT 1""",
+                    (ticker, fingerprint, *_window(article['published_at'])),
+                ).fetchone()
+
+                content = article.get('content')
+                cursor = self._conn.execute(
+                    """INSERT OR IGNORE INTO articles
+                       (ticker, url, url_hash, fingerprint, content_fingerprint, duplicate_of, source, title, author,
+                        published_at, content, summary, stored_at)
+                       VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)""",
+                    (ticker, article['link'], _sha1(article['link']), fingerprint,
+                     content_fingerprint(content) if content else None, original['id'] if original else None,
+                     source, article['title'],
+                     article.get('author'), article['published_at'], content, article.get('summary'), now),
+                )
+                inserted += cursor.rowcount
+                if latest is None or article['published_at'] > latest:
+                    latest = article['published_at']
+
+            self._conn.execute(
+                "INSERT OR REPLACE INTO watermarks (ticker, source, published_at, checked_at) VALUES (?, ?, ?, ?)",
+                (ticker, source, latest, now),
+            )
+            self._conn.commit()
+        return inserted
+
+    def save_content(self, ticker, url, content):
+        # Marks the article as a copy of one with the same opening text,
+        # published within DUPLICATE_WINDOW_HOURS on a different host, and
+        # clears a title-based mark when the text differs. Pages one site
+        # serves for every URL (consent walls, paywalls) share a fingerprint
+        # too, but only ever on the same host. Text too short to fingerprint
+        # leaves the mark as it was.
+        fingerprint = content_fingerprint(content)
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT id, published_at FROM articles WHERE ticker = ? AND url_hash = ?", (ticker, _sha1(url))
+            ).fetchone()
+            if row is None:
+                return
+            if fingerprint:
+                candidates = self._conn.execute(
+                    """SELECT id, url FROM articles WHERE ticker = ? AND content_fingerprint = ? AND id != ?
+                       AND published_at BETWEEN ? AND ? ORDER BY id""",
+                    (ticker, fingerprint, row['id'], *_window(row['published_at'])),
+                ).fetchall()
+                original = next((candidate['id'] for candidate in candidates if _host(candidate['url']) != _host(url)), None)
+                self._conn.execute(
+                    "UPDATE articles SET content = ?, content_fingerprint = ?, duplicate_of = ? WHERE id = ?",
+                    (content, fingerprint, original, row['id']),
+                )
+            else:
+                self._conn.execute("UPDATE articles SET content = ? WHERE id = ?", (content, row['id']))
+            self._conn.commit()
+
+    def record_request(self, ticker):
+        with self._lock:
+            self._conn.execute(
+                """INSERT INTO ticker_requests (ticker, requests, last_requested_at) VALUES (?, 1, ?)
+                   ON CONFLICT (ticker) DO UPDATE SET requests = requests + 1, last_requested_at = excluded.last_requested_at""",
+                (ticker, time.time()),
+            )
+            self._conn.commit()
+
+    def popular_tickers(self, limit, since):
+        # Returns (ticker, request count) for tickers requested after since,
+        # most requested first. Kept in the store so a separate prefetch
+        # worker sees the same popularity as the web process.
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT ticker, requests FROM ticker_requests WHERE last_requested_at >= ? ORDER BY requests DESC LIMIT ?",
+                (since, limit),
+            ).fetchall()
+        return [(row['ticker'], row['requests']) for row in rows]
+
+    def query(self, ticker, start, end=None, limit=None):
+        # Newest first, syndicated duplicates excluded. start/end are
+        # datetimes; published_at is stored in a lexically sortable format,
+        # so the range is served straight from (ticker, published_at).
+        sql = "SELECT * FROM articles WHERE ticker = ? AND published_at >= ? AND duplicate_of IS NULL"
+        params = [ticker, start.strftime(DATE_FORMAT)]
+        if end is not None:
+            sql += " AND published_at <= ?"
+            params.append(end.strftime(DATE_FORMAT))
+        sql += " ORDER BY published_at DESC"
+        if limit is not None:
+            sql += " LIMIT ?"
+            params.append(limit)
+        with self._lock:
+            rows = self._conn.execute(sql, params).fetchall()
+        return [dict(row) for row in rows]
+
+
+article_store = ArticleStore()
@@ -0,0 +1,428 @@
+import asyncio
+import contextlib
+import logging
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+import requests
+from starlette.applications import Starlette
+from starlette.middleware import Middleware
+from starlette.middleware.cors import CORSMiddleware
+from starlette.responses import JSONResponse, Response
+from starlette.routing import Match, Route
+
+import app as flask_app
+import analysis_cache
+import async_http
+import jobs
+import ticker_index
+import tracing
+from article_store import article_store
+from cache import NEWS_LISTING_TTL, ARTICLE_BODY_TTL
+from extraction import extract_article_text
+from fetch_pipeline import REQUEST_TIMEOUT, DEADLINE
+from llm_scheduler import scheduler, estimate_tokens
+
+ASGI_MAX_CONCURRENT_REQUESTS = int(os.getenv('ASGI_MAX_CONCURRENT_REQUESTS', 256))
+ASGI_MAX_QUEUED_REQUESTS = int(os.getenv('ASGI_MAX_QUEUED_REQUESTS', 512))
+ASGI_WORKER_THREADS = int(os.getenv('ASGI_WORKER_THREADS', 32))
+
+# Async serving mode: the same routes as app.py, with listing and body
+# fetches on httpx and Gemini calls awaited through the shared LLM scheduler,
+# so a slow scrape or model call holds no thread. Prompts, parsing, the
+# article store and the caches are shared with the Flask app. Their SQLite
+# calls and the CPU-bound parsing and summarizing run on worker threads via
+# asyncio.to_thread so they never stall the event loop.
+#
+#   uvicorn asgi_app:app --host 0.0.0.0 --port 80
+
+
+class Backpressure:
+    # Admits up to max_concurrent requests at once and queues up to
+    # max_queued more; beyond that requests are rejected straight away with
+    # 503 rather than piling up behind work that cannot finish in time.
+    def __init__(self, max_concurrent, max_queued):
+        self.max_concurrent = max_concurrent
+        self.max_queued = max_queued
+        self._slots = asyncio.Semaphore(max_concurrent)
+        self._waiting = 0
+        self._in_flight = 0
+        self.rejected = 0
+
+    @contextlib.asynccontextmanager
+    async def admit(self):
+        if self._slots.locked() and self._waiting >= self.max_queued:
+            self.rejected += 1
+            raise OverloadedError()
+        self._waiting += 1
+        try:
+            await self._slots.acquire()
+        finally:
+            self._waiting -= 1
+        self._in_flight += 1
+        try:
+            yield
+        finally:
+            self._in_flight -= 1
+            self._slots.release()
+
+    def stats(self):
+        return {
+            'in_flight': self._in_flight,
+            'queued': self._waiting,
+            'rejected': self.rejected,
+            'max_concurrent': self.max_concurrent,
+            'max_queued': self.max_queued,
+        }
+
+
+class OverloadedError(Exception):
+    pass
+
+
+backpressure = Backpressure(ASGI_MAX_CONCURRENT_REQUESTS, ASGI_MAX_QUEUED_REQUESTS)
+
+
+def limited(handler):
+    async def wrapper(request):
+        try:
+            async with backpressure.admit():
+                return await handler(request)
+        except OverloadedError:
+            return JSONResponse({'error': 'Server is busy, try again shortly'}, status_code=503, headers={'Retry-After': '1'})
+    return wrapper
+
+
+async def fetch_finviz_listing(stock_ticker, since=None):
+    url = flask_app.FINVIZ_URL.format(ticker=stock_ticker)
+    with tracing.stage('finviz_fetch', source='finviz'):
+        html = await async_http.get_text(url, NEWS_LISTING_TTL, timeout=10,
+                                        deadline=time.monotonic() + flask_app.LISTING_DEADLINE)
+    return await asyncio.to_thread(flask_app.finviz_articles, html, url, since)
+
+
+async def refresh_article_listing(stock_ticker):
+    watermark = await asyncio.to_thread(article_store.watermark, stock_ticker)
+    since = watermark['published_at'] if watermark else None
+
+    try:
+        articles = await fetch_finviz_listing(stock_ticker, since)
+        source = 'finviz'
+    except requests.RequestException as e:
+        logging.error(f"Failed to fetch articles from finviz ({flask_app.FINVIZ_URL.format(ticker=stock_ticker)}): {e}")
+        # yfinance has no async API; its lookup runs on a worker thread.
+        articles = await asyncio.to_thread(flask_app.fetch_yahoo_listing, stock_ticker, since)
+        source = 'yahoo'
+
+    inserted = await asyncio.to_thread(article_store.add_articles, stock_ticker, articles, source)
+    logging.info(f"Stored {inserted} new {source} articles for {stock_ticker}")
+
+
+async def fetch_article_listing(stock_ticker, num_articles, start_date):
+    stock_ticker = stock_ticker.upper()
+    start_date = datetime.strptime(start_date, '%Y-%m-%d')
+
+    if not await asyncio.to_thread(article_store.is_fresh, stock_ticker, NEWS_LISTING_TTL):
+        try:
+            await refresh_article_listing(stock_ticker)
+        except Exception as e:
+            logging.error(f"Failed to refresh articles for {stock_ticker}: {e}")
+            if await asyncio.to_thread(article_store.watermark, stock_ticker) is None:
+                return [{"error": f"Failed to fetch articles: {str(e)}"}], None
+
+    return await asyncio.to_thread(flask_app.stored_article_listing, stock_ticker, num_articles, start_date)
+
+
+async def fetch_article_content(url, timeout=REQUEST_TIMEOUT, deadline=None):
+    try:
+        with tracing.stage('body_fetch', source='article'):
+            html = await async_http.get_text(url, ARTICLE_BODY_TTL, timeout=timeout, deadline=deadline)
+        with tracing.stage('extraction'):
+            content = await asyncio.to_thread(extract_article_text, html)
+        if content:
+            return content
+
+        logging.warning(f"Content div not found for URL: {url}")
+        return None
+    except Exception as e:
+        logging.error(f"Error fetching article content: {e}")
+        return None
+
+
+async def fetch_articles(stock_ticker, num_articles, start_date):
+    articles, fallbacks = await fetch_article_listing(stock_ticker, num_articles, start_date)
+    if not articles or 'error' in articles[0]:
+        return articles
+
+    missing = [index for index, article in enumerate(articles) if not article.get('content')]
+    deadline = time.monotonic() + DEADLINE
+    tasks = [asyncio.create_task(fetch_article_content(articles[index]['link'], deadline=deadline)) for index in missing]
+    if tasks:
+        # Bodies still outstanding at the deadline fall back like failures.
+        await asyncio.wait(tasks, timeout=DEADLINE)
+
+    for index, task in zip(missing, tasks):
+        content = task.result() if task.done() else None
+        if not task.done():
+            task.cancel()
+        if content:
+            await asyncio.to_thread(article_store.save_content, stock_ticker.upper(), articles[index]['link'], content)
+        else:
+            content = fallbacks[index] if fallbacks and fallbacks[index] else "Content not available"
+        articles[index]['content'] = content
+    return articles
+
+
+async def generate(prompt):
+    with tracing.stage('llm', source='gemini') as span:
+        response = await flask_app.get_model().generate_content_async(prompt)
+        tracing.record_tokens(span, response)
+    return response
+
+
+async def run_article_analysis(stock_ticker, article):
+    prompt = await asyncio.to_thread(flask_app.generate_analysis_prompt, article, stock_ticker)
+    cache_key = analysis_cache.prompt_key(prompt, flask_app.MODEL_NAME)
+
+    cached = await asyncio.to_thread(analysis_cache.get, cache_key)
+    if cached is not None:
+        logging.info(f"Analysis cache hit for article: {article['title']}")
+        return cached
+
+    response = await scheduler.acall(lambda: generate(prompt), estimate_tokens(prompt))
+    cached = flask_app.parse_analysis(response.text.strip())
+    await asyncio.to_thread(analysis_cache.put, cache_key, cached)
+    return cached
+
+
+async def generate_final_analysis(articles, stock_ticker=None):
+    cache_key = analysis_cache.final_analysis_key(articles, flask_app.MODEL_NAME, stock_ticker)
+    try:
+        cached = await asyncio.to_thread(analysis_cache.get, cache_key)
+        if cached is not None:
+            logging.info(f"Final analysis cache hit for {len(articles)} articles")
+            return cached['analysis']
+
+        prompt = await asyncio.to_thread(flask_app.build_final_analysis_prompt, articles, stock_ticker)
+        response = await scheduler.acall(lambda: generate(prompt), estimate_tokens(prompt))
+        final_analysis = response.text.strip()
+        await asyncio.to_thread(analysis_cache.put, cache_key, {'analysis': final_analysis})
+        return final_analysis
+    except Exception as e:
+        logging.error(f"Error occurred while generating final analysis: {e}")
+        return "Final analysis not available"
+
+
+async def stock_suggestions(request):
+    query = request.query_params.get('query', '').strip()
+    if len(query) < 2:
+        return JSONResponse({'suggestions': []})
+
+    try:
+        limit = int(request.query_params.get('limit', ticker_index.DEFAULT_LIMIT))
+        matches = ticker_index.search(query, limit)
+        if matches and matches[0]['symbol'] == query.upper():
+            await asyncio.to_thread(article_store.record_request, matches[0]['symbol'])
+        return JSONResponse({
+            'suggestions': [match['symbol'] for match in matches],
+            'matches': matches,
+        })
+    except Exception as e:
+        logging.error(f"Error fetching stock suggestions: {str(e)}")
+        return JSONResponse({'suggestions': []})
+
+
+@limited
+async def search_articles(request):
+    data = await request.json()
+    stock_ticker = data.get('stock_ticker')
+    num_articles = int(data.get('num_articles', 5))
+    start_date = data.get('start_date')
+
+    if not stock_ticker or not start_date:
+        return JSONResponse({'error': 'Stock ticker and start date are required'}, status_code=400)
+
+    await asyncio.to_thread(article_store.record_request, stock_ticker.upper())
+    job = jobs.start('search_articles', stock_ticker)
+    try:
+        job.update(stage='fetching')
+        articles = await fetch_articles(stock_ticker, num_articles, start_date)
+        job.finish()
+
+        if not articles:
+            return JSONResponse({'message': 'No articles found'}, status_code=404)
+
+        if 'error' in articles[0]:
+            return JSONResponse({'error': articles[0]['error']}, status_code=500)
+
+        logging.info(f"Returning {len(articles)} articles for {stock_ticker}")
+        return JSONResponse({'articles': articles})
+
+    except Exception as e:
+        logging.error(f"Error in search_articles: {str(e)}")
+        job.finish(error=str(e))
+        return JSONResponse({'error': 'An unexpected error occurred'}, status_code=500)
+
+
+@limited
+async def analyze_article(request):
+    data = await request.json()
+    article = data.get('article')
+    stock_ticker = data.get('stock_ticker')
+
+    if not article or not stock_ticker:
+        return JSONResponse({'error': 'Article and stock ticker are required'}, status_code=400)
+
+    logging.info(f"Analyzing article: {article['title']}")
+    try:
+        analysis = await run_article_analysis(stock_ticker, article)
+    except Exception as e:
+        logging.error(f"Error occurred during article analysis: {e}")
+        analysis = None
+    return JSONResponse(flask_app.build_analyzed_article(article, analysis))
+
+
+@limited
+async def analyze_articles(request):
+    data = await request.json()
+    articles = data.get('articles')
+    stock_ticker = data.get('stock_ticker')
+
+    if not isinstance(articles, list) or not articles or not stock_ticker:
+        return JSONResponse({'error': 'Articles and stock ticker are required'}, status_code=400)
+
+    job = jobs.start('analyze_articles', stock_ticker, total=len(articles))
+    job.update(stage='analyzing')
+
+    async def analyze(article):
+        try:
+            analysis = await run_article_analysis(stock_ticker, article)
+        except Exception:
+            job.advance(failed=True)
+            raise
+        job.advance()
+        return analysis
+
+    outcomes = await asyncio.gather(*(analyze(article) for article in articles), return_exceptions=True)
+    results = []
+    failed = []
+    for index, (article, outcome) in enumerate(zip(articles, outcomes)):
+        if isinstance(outcome, Exception):
+            logging.error(f"Error occurred during article analysis: {outcome}")
+            failed.append({'index': index, 'title': article.get('title'), 'error': str(outcome)})
+            outcome = None
+        results.append(flask_app.build_analyzed_article(article, outcome))
+    job.finish()
+    return JSONResponse({'articles': results, 'failed': failed})
+
+
+@limited
+async def generate_final_analysis_route(request):
+    data = await request.json()
+    articles = data.get('articles')
+
+    if not articles:
+        return JSONResponse({'error': 'Articles are required'}, status_code=400)
+
+    final_analysis = await generate_final_analysis(articles, data.get('stock_ticker'))
+    return JSONResponse({'final_analysis': final_analysis})
+
+
+async def get_status(request):
+    job_id = request.query_params.get('job_id')
+    if job_id:
+        job = jobs.get(job_id)
+        if job is None:
+            return JSONResponse({'error': 'Unknown job'}, status_code=404)
+        return JSONResponse(job.to_dict())
+
+    trace_id = request.query_params.get('trace_id')
+    if trace_id:
+        trace = tracing.get_trace(trace_id)
+        if trace is None:
+            return JSONResponse({'error': 'Unknown trace'}, status_code=404)
+        return JSONResponse(trace.to_dict())
+
+    status = await asyncio.to_thread(flask_app.status_snapshot)
+    status['backpressure'] = backpressure.stats()
+    return JSONResponse(status)
+
+
+async def metrics(request):
+    return Response(await asyncio.to_thread(flask_app.metrics_text), media_type='text/plain; version=0.0.4')
+
+
+def route_template(scope):
+    # Routing happens inside the middleware stack, after the trace opens, so
+    # match the path against the route table here.
+    for route in app.routes:
+        match, _ = route.matches(scope)
+        if match != Match.NONE:
+            return route.path
+    return tracing.UNMATCHED_ROUTE
+
+
+class TracingMiddleware:
+    # Opens a trace per HTTP request (the ASGI counterpart of the Flask
+    # before/after/teardown hooks) and returns its id in X-Trace-Id. With the
+    # profiler on, samples of the event loop thread include whatever other
+    # requests it interleaves with this one.
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            return await self.app(scope, receive, send)
+
+        profile = (b'x-profile', b'1') in scope.get('headers', [])
+        trace, token = tracing.start_request(route_template(scope), profile=profile)
+
+        async def send_with_trace(message):
+            if message['type'] == 'http.response.start':
+                trace.status = message['status']
+                message['headers'] = list(message.get('headers', [])) + [(b'x-trace-id', trace.id.encode())]
+            await send(message)
+
+        error = None
+        try:
+            await self.app(scope, receive, send_with_trace)
+        except Exception as e:
+            error = str(e)
+            raise
+        finally:
+            tracing.finish_request(trace, token, trace.status, error)
+
+
+@contextlib.asynccontextmanager
+async def lifespan(_app):
+    # asyncio.to_thread's default pool is sized from the CPU count, which is
+    # too small once cache and store lookups share it with parsing.
+    asyncio.get_running_loop().set_default_executor(
+        ThreadPoolExecutor(max_workers=ASGI_WORKER_THREADS, thread_name_prefix='asgi-worker'))
+    yield
+    await async_http.close()
+
+
+app = Starlette(
+    routes=[
+        Route('/stock_suggestions', stock_suggestions, methods=['GET']),
+        Route('/search_articles', search_articles, methods=['POST']),
+        Route('/analyze_article', analyze_article, methods=['POST']),
+        Route('/analyze_articles', analyze_articles, methods=['POST']),
+        Route('/generate_final_analysis', generate_final_analysis_route, methods=['POST']),
+        Route('/status', get_status, methods=['GET']),
+        Route('/metrics', metrics, methods=['GET']),
+    ],
+    middleware=[
+        Middleware(TracingMiddleware),
+        Middleware(CORSMiddleware, allow_origins=['*'], allow_methods=['*'], allow_headers=['*']),
+    ],
+    lifespan=lifespan,
+)
+
+
+if __name__ == '__main__':
+    import uvicorn
+    uvicorn.run(app, host='0.0.0.0', port=80)
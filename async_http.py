@@ -0,0 +1,124 @@
+import asyncio
+import logging
+import os
+import time
+from urllib.parse import urlparse
+
+import httpx
+import requests
+
+from cache import response_cache
+from http_client import (
+    MAX_RETRIES, POOL_PER_HOST, REQUEST_HEADERS, RETRY_STATUSES,
+    CircuitOpenError, _breaker, _bump, _retry_after, _retry_delay,
+)
+
+ASYNC_HTTP_MAX_CONNECTIONS = int(os.getenv('ASYNC_HTTP_MAX_CONNECTIONS', 100))
+
+# Shares the counters, circuit breaker and response cache with http_client,
+# so both serving modes see the same host health and cached pages. Errors are
+# raised as requests exceptions so callers handle both clients alike.
+_client = None
+_host_slots = {}
+
+
+def client():
+    global _client
+    if _client is None:
+        limits = httpx.Limits(max_connections=ASYNC_HTTP_MAX_CONNECTIONS, max_keepalive_connections=ASYNC_HTTP_MAX_CONNECTIONS)
+        _client = httpx.AsyncClient(headers=REQUEST_HEADERS, limits=limits, follow_redirects=True)
+    return _client
+
+
+async def close():
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+
+
+def _host_slot(host):
+    # At most POOL_PER_HOST requests in flight per host, like the sync pool.
+    slot = _host_slots.get(host)
+    if slot is None:
+        slot = _host_slots[host] = asyncio.Semaphore(POOL_PER_HOST)
+    return slot
+
+
+async def get(url, timeout=10, deadline=None, headers=None, retries=MAX_RETRIES):
+    host = urlparse(url).netloc.lower()
+    last_error = None
+
+    for attempt in range(retries + 1):
+        if not _breaker.allow(host):
+            _bump('breaker_rejections')
+            raise CircuitOpenError(f"Circuit open for {host}")
+
+        attempt_timeout = timeout
+        if deadline is not None:
+            attempt_timeout = min(timeout, deadline - time.monotonic())
+            if attempt_timeout <= 0:
+                break
+
+        _bump('requests')
+        response = None
+        try:
+            async with _host_slot(host):
+                response = await asyncio.wait_for(client().get(url, headers=headers, timeout=attempt_timeout), attempt_timeout)
+            if response.status_code not in RETRY_STATUSES:
+                _breaker.record_success(host)
+                if response.status_code >= 400:
+                    raise requests.HTTPError(f"{response.status_code} for url: {url}")
+                return response
+            last_error = requests.HTTPError(f"{response.status_code} for url: {url}")
+        except asyncio.TimeoutError:
+            last_error = requests.Timeout(f"Timed out fetching {url}")
+        except httpx.TimeoutException as e:
+            last_error = requests.Timeout(str(e) or f"Timed out fetching {url}")
+        except httpx.HTTPError as e:
+            last_error = requests.ConnectionError(str(e) or f"Failed to fetch {url}")
+
+        _breaker.record_failure(host, _retry_after(response))
+        if attempt == retries:
+            break
+
+        delay = _retry_delay(attempt, response)
+        if delay is None or (deadline is not None and time.monotonic() + delay >= deadline):
+            break
+        _bump('retries')
+        await asyncio.sleep(delay)
+
+    _bump('failures')
+    if last_error is None:
+        last_error = requests.Timeout(f"Deadline exceeded before request to {url}")
+    raise last_error
+
+
+async def get_text(url, ttl, timeout=10, deadline=None, cache=response_cache):
+    # Same revalidation and stale-if-error rules as http_client.get_text. The
+    # cache's disk tier is SQLite, so lookups and stores run on a worker
+    # thread rather than the event loop.
+    entry = await asyncio.to_thread(cache.get, url)
+    if entry is not None and entry.fresh:
+        return entry.value
+
+    headers = {}
+    if entry is not None:
+        if entry.etag:
+            headers['If-None-Match'] = entry.etag
+        if entry.last_modified:
+            headers['If-Modified-Since'] = entry.last_modified
+
+    try:
+        response = await get(url, timeout=timeout, deadline=deadline, headers=headers or None)
+    except requests.RequestException:
+        if entry is not None:
+            logging.warning(f"Serving stale cached copy of {url}")
+            return entry.value
+        raise
+
+    if response.status_code == 304 and entry is not None:
+        return (await asyncio.to_thread(cache.refresh, url, entry, ttl)).value
+
+    await asyncio.to_thread(cache.set, url, response.text, ttl, response.headers.get('ETag'), response.headers.get('Last-Modified'))
+    return response.text
@@ -0,0 +1,112 @@
+# Benchmarks the batch analytics in analyzer.py on synthetic data: 500
+# tickers x 5 years of daily closes (geometric random walks) and a set of
+# synthetic articles. The baseline is the per-ticker style of the original
+# helpers: one frame per ticker, features computed column by column in a
+# Python loop, and one TextBlob per article.
+#
+#   python benchmarks/bench_analyzer.py [--tickers 500] [--years 5] [--articles 2000]
+import argparse
+import os
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import analyzer
+
+WORDS = ('strong weak growth decline record loss beat miss upgrade downgrade surge plunge '
+         'revenue guidance margin outlook shares analysts investors quarter').split()
+
+
+def synthetic_close(tickers, years, seed=0):
+    rng = np.random.default_rng(seed)
+    days = analyzer.TRADING_DAYS_PER_YEAR * years
+    returns = rng.normal(0.0003, 0.02, size=(days, tickers))
+    close = 100 * np.exp(np.cumsum(returns, axis=0))
+    index = pd.bdate_range('2019-01-01', periods=days)
+    columns = [f'T{i:04d}' for i in range(tickers)]
+    return pd.DataFrame(close, index=index, columns=columns)
+
+
+def synthetic_articles(close, count, seed=1):
+    rng = np.random.default_rng(seed)
+    # A limited pool of headlines, as syndicated copies repeat across sources.
+    pool = [' '.join(rng.choice(WORDS, size=40)) for _ in range(max(count // 4, 1))]
+    offsets = rng.integers(0, len(close.index), size=count)
+    return pd.DataFrame({
+        'ticker': rng.choice(close.columns, size=count),
+        'published_at': close.index[offsets] + pd.to_timedelta(rng.integers(0, 24 * 60, size=count), unit='min'),
+        'content': [pool[i] for i in rng.integers(0, len(pool), size=count)],
+    })
+
+
+def legacy_features(close):
+    results = {}
+    for ticker in close.columns:
+        frame = pd.DataFrame({'Close': close[ticker]})
+        frame['Moving Average'] = frame['Close'].rolling(window=30).mean()
+        frame['Return'] = frame['Close'].pct_change(fill_method=None)
+        frame['Volatility'] = np.log(frame['Close']).diff().rolling(window=21).std() * np.sqrt(252)
+        frame['Momentum'] = frame['Close'] / frame['Close'].shift(21) - 1
+        frame['Drawdown'] = frame['Close'] / frame['Close'].cummax() - 1
+        results[ticker] = frame
+    return results
+
+
+def legacy_join(articles, close):
+    rows = []
+    for article in articles.itertuples():
+        sentiment = analyzer.analyze_sentiment(article.content)
+        series = close[article.ticker]
+        position = series.index.searchsorted(article.published_at, side='right')
+        if position >= len(series):
+            continue
+        start = series.iloc[position]
+        rows.append({
+            'sentiment': sentiment,
+            'return_1d': series.iloc[position + 1] / start - 1 if position + 1 < len(series) else np.nan,
+            'return_1m': series.iloc[position + 21] / start - 1 if position + 21 < len(series) else np.nan,
+        })
+    return pd.DataFrame(rows)
+
+
+def timed(fn, *args):
+    tracemalloc.start()
+    started = time.perf_counter()
+    result = fn(*args)
+    elapsed = time.perf_counter() - started
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, elapsed, peak / 1024 / 1024
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--tickers', type=int, default=500)
+    parser.add_argument('--years', type=int, default=5)
+    parser.add_argument('--articles', type=int, default=2000)
+    args = parser.parse_args()
+
+    close = synthetic_close(args.tickers, args.years)
+    articles = synthetic_articles(close, args.articles)
+    print(f"{close.shape[1]} tickers x {close.shape[0]} days, {len(articles)} articles")
+
+    _, legacy_seconds, legacy_peak = timed(legacy_features, close)
+    features, batch_seconds, batch_peak = timed(analyzer.compute_price_features, close)
+    print(f"features  legacy per-ticker loop: {legacy_seconds:7.2f}s  peak {legacy_peak:7.1f} MB  (5 features)")
+    print(f"features  batch:                   {batch_seconds:7.2f}s  peak {batch_peak:7.1f} MB  "
+          f"({features.columns.get_level_values('feature').nunique()} features)")
+
+    _, legacy_seconds, legacy_peak = timed(legacy_join, articles, close)
+    _, batch_seconds, batch_peak = timed(analyzer.join_sentiment_returns, articles, close)
+    print(f"sentiment join  legacy per-article:  {legacy_seconds:7.2f}s  peak {legacy_peak:7.1f} MB")
+    print(f"sentiment join  batch:               {batch_seconds:7.2f}s  peak {batch_peak:7.1f} MB")
+
+
+if __name__ == '__main__':
+    main()
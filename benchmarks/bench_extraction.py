@@ -0,0 +1,140 @@
+# Compares the single-pass lxml extractor in extraction.py with the previous
+# BeautifulSoup(html.parser) + sequential select_one code on the saved pages
+# in benchmarks/fixtures (synthetic pages modelled on Finviz's quote page and
+# common article layouts). Each measurement runs in a fresh subprocess so that
+# peak RSS reflects one implementation only; tracemalloc covers the Python
+# heap, RSS also covers libxml2's C allocations.
+#
+#   python benchmarks/bench_extraction.py [--iterations 50]
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+FIXTURES = os.path.join(ROOT, 'benchmarks', 'fixtures')
+sys.path.insert(0, ROOT)
+
+ARTICLE_FIXTURES = ['article_tag.html', 'article_itemprop.html', 'article_entry_content.html']
+FINVIZ_FIXTURE = 'finviz_quote.html'
+LEGACY_SELECTORS = [
+    'article', '.article-body', '.article-content', '.story-body',
+    '[itemprop="articleBody"]', '.entry-content', '.post-content', 'div.content'
+]
+
+
+def legacy_article(html):
+    from bs4 import BeautifulSoup
+    soup = BeautifulSoup(html, 'html.parser')
+    for selector in LEGACY_SELECTORS:
+        content = soup.select_one(selector)
+        if content:
+            return content.get_text(strip=True)[:5000]
+    return None
+
+
+def legacy_finviz(html):
+    from bs4 import BeautifulSoup
+    soup = BeautifulSoup(html, 'html.parser')
+    news_table = soup.find('table', class_='news-table')
+    rows = []
+    for row in news_table.find_all('tr'):
+        cols = row.find_all('td')
+        if len(cols) < 2:
+            continue
+        title = cols[1].text.strip()
+        link = cols[1].a['href'] if cols[1].a else None
+        published_at = cols[0].text.strip()
+        try:
+            if len(published_at) > 8:
+                article_date = datetime.strptime(published_at, '%b-%d-%y %I:%M%p')
+            else:
+                article_date = datetime.combine(datetime.now().date(), datetime.strptime(published_at, '%I:%M%p').time())
+        except ValueError:
+            article_date = datetime.now()
+        rows.append((title, link, article_date))
+    return rows
+
+
+def current_article(html):
+    from extraction import extract_article_text
+    return extract_article_text(html)
+
+
+def current_finviz(html):
+    from extraction import parse_finviz_news_table
+    return parse_finviz_news_table(html)
+
+
+IMPLEMENTATIONS = {
+    ('legacy', 'article'): legacy_article,
+    ('legacy', 'finviz'): legacy_finviz,
+    ('lxml', 'article'): current_article,
+    ('lxml', 'finviz'): current_finviz,
+}
+
+
+def run_worker(impl, kind, fixture, iterations):
+    with open(os.path.join(FIXTURES, fixture), encoding='utf-8') as f:
+        html = f.read()
+    fn = IMPLEMENTATIONS[(impl, kind)]
+    fn(html)  # import and warm up outside the measurement
+    rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    tracemalloc.start()
+    fn(html)
+    _, heap_peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    started = time.perf_counter()
+    for _ in range(iterations):
+        result = fn(html)
+    elapsed = time.perf_counter() - started
+    rss_after = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    print(json.dumps({
+        'pages_per_sec': iterations / elapsed,
+        'ms_per_page': elapsed / iterations * 1000,
+        'heap_peak_kb': heap_peak / 1024,
+        'rss_growth_kb': rss_after - rss_before,
+        'result_size': len(result) if result else 0,
+    }))
+
+
+def measure(impl, kind, fixture, iterations):
+    output = subprocess.run(
+        [sys.executable, __file__, '--worker', impl, kind, fixture, '--iterations', str(iterations)],
+        check=True, capture_output=True, text=True,
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--iterations', type=int, default=50)
+    parser.add_argument('--worker', nargs=3, metavar=('IMPL', 'KIND', 'FIXTURE'))
+    args = parser.parse_args()
+
+    if args.worker:
+        run_worker(*args.worker, args.iterations)
+        return
+
+    cases = [('article', fixture) for fixture in ARTICLE_FIXTURES] + [('finviz', FINVIZ_FIXTURE)]
+    print(f"{'fixture':<28} {'impl':<7} {'pages/s':>9} {'ms/page':>9} {'heap peak KB':>13} {'RSS growth KB':>14}")
+    for kind, fixture in cases:
+        results = {}
+        for impl in ('legacy', 'lxml'):
+            results[impl] = result = measure(impl, kind, fixture, args.iterations)
+            print(f"{fixture:<28} {impl:<7} {result['pages_per_sec']:>9.1f} {result['ms_per_page']:>9.2f} "
+                  f"{result['heap_peak_kb']:>13.0f} {result['rss_growth_kb']:>14}")
+        speedup = results['lxml']['pages_per_sec'] / results['legacy']['pages_per_sec']
+        print(f"{'':<28} speedup x{speedup:.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,233 @@
+# Load test comparing the Flask app with the async ASGI app (asgi_app.py)
+# against the local stubs in benchmarks/stubs.py: a fake Finviz/article site
+# and a fake Gemini model with fixed latency. Each mode runs in its own
+# subprocess with fresh caches. Flask is served by a fixed pool of worker
+# threads (--flask-threads, like gunicorn's gthread worker), the ASGI app by
+# uvicorn on one event loop.
+#
+#   python benchmarks/load_test.py [--scenario analyze|search] [--concurrency 16,64,256]
+#                                  [--requests 256] [--llm-latency 1.0] [--flask-threads 16] [--per-host 256]
+import argparse
+import asyncio
+import functools
+import json
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import httpx
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import stubs
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def serve_flask(port, threads):
+    from socketserver import ThreadingMixIn
+    from werkzeug.serving import BaseWSGIServer
+    import app
+
+    class PooledWSGIServer(ThreadingMixIn, BaseWSGIServer):
+        request_queue_size = 1024
+        executor = ThreadPoolExecutor(max_workers=threads)
+
+        def process_request(self, request, client_address):
+            self.executor.submit(self.process_request_thread, request, client_address)
+
+    PooledWSGIServer('127.0.0.1', port, app.app).serve_forever()
+
+
+def serve_asgi(port):
+    import uvicorn
+    import asgi_app
+
+    uvicorn.run(asgi_app.app, host='127.0.0.1', port=port, log_level='warning', backlog=1024)
+
+
+def serve(args):
+    import app
+
+    app.model = stubs.FakeModel(args.llm_latency)
+    if args.serve == 'flask':
+        serve_flask(args.port, args.flask_threads)
+    else:
+        serve_asgi(args.port)
+
+
+def server_env(mode, args, stub_url, workdir):
+    env = dict(os.environ)
+    env.update({
+        'GOOGLE_API_KEY': env.get('GOOGLE_API_KEY', 'load-test'),
+        'FINVIZ_URL': f"{stub_url}/quote.ashx?t={{ticker}}",
+        'ARTICLE_STORE_PATH': os.path.join(workdir, f'{mode}-articles.db'),
+        'CACHE_DB_PATH': os.path.join(workdir, f'{mode}-cache.db'),
+        'ANALYSIS_CACHE_PATH': os.path.join(workdir, f'{mode}-analysis.db'),
+        'LLM_REQUESTS_PER_MINUTE': '1000000',
+        'LLM_MAX_CONCURRENCY': str(args.llm_concurrency),
+        'PREFETCH_ENABLED': '0',
+        'TICKER_LIST_URL': '',
+        # Every stub site shares one host, so lift the per-host caps that
+        # would otherwise throttle both modes equally.
+        'HTTP_POOL_PER_HOST': str(args.per_host),
+        'FETCH_MAX_PER_HOST': str(args.per_host),
+    })
+    return env
+
+
+def start_server(mode, args, stub_url, workdir):
+    port = free_port()
+    command = [sys.executable, os.path.abspath(__file__), '--serve', mode, '--port', str(port),
+               '--llm-latency', str(args.llm_latency), '--flask-threads', str(args.flask_threads)]
+    return launch(mode, command, server_env(mode, args, stub_url, workdir), workdir, port)
+
+
+def launch(mode, command, env, workdir, port):
+    process = subprocess.Popen(command, env=env, cwd=workdir, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    base_url = f"http://127.0.0.1:{port}"
+    for _ in range(300):
+        try:
+            httpx.get(f"{base_url}/stock_suggestions?query=AA", timeout=1)
+            return process, base_url
+        except httpx.HTTPError:
+            if process.poll() is not None:
+                raise RuntimeError(f"{mode} server exited with {process.returncode}")
+            time.sleep(0.1)
+    process.kill()
+    raise RuntimeError(f"{mode} server did not start")
+
+
+def make_request(scenario, index):
+    if scenario == 'analyze':
+        article = {
+            'title': f'Load test article {index}',
+            'link': f'https://example.com/{index}',
+            'author': 'Unknown',
+            'published_at': '2024-01-01 00:00:00',
+            'content': f'Request {index}. The company reported record revenue and raised its outlook for the year.',
+        }
+        return '/analyze_article', {'stock_ticker': 'AAPL', 'article': article}
+    return '/search_articles', {'stock_ticker': f'T{index:05d}', 'num_articles': 5, 'start_date': '2000-01-01'}
+
+
+async def run_level(base_url, make_request, concurrency, total, offset):
+    latencies = []
+    statuses = {}
+    queue = asyncio.Queue()
+    for index in range(total):
+        queue.put_nowait(offset + index)
+
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=120) as client:
+        async def worker():
+            while not queue.empty():
+                path, body = make_request(queue.get_nowait())
+                started = time.perf_counter()
+                try:
+                    response = await client.post(path, json=body)
+                    status = response.status_code
+                except httpx.HTTPError as e:
+                    status = type(e).__name__
+                latencies.append(time.perf_counter() - started)
+                statuses[status] = statuses.get(status, 0) + 1
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    ok = statuses.get(200, 0)
+
+    def percentile(fraction):
+        return latencies[min(int(fraction * len(latencies)), len(latencies) - 1)] if latencies else float('nan')
+
+    return {
+        'concurrency': concurrency,
+        'requests': total,
+        'ok': ok,
+        'statuses': {str(key): value for key, value in statuses.items()},
+        'seconds': round(elapsed, 2),
+        'throughput': round(ok / elapsed, 1),
+        'p50': round(percentile(0.5), 3),
+        'p95': round(percentile(0.95), 3),
+        'p99': round(percentile(0.99), 3),
+    }
+
+
+def print_result(mode, scenario, result):
+    print(f"{mode:5} {scenario:7} c={result['concurrency']:<4} {result['throughput']:7.1f} req/s  "
+          f"p50 {result['p50']:6.2f}s  p95 {result['p95']:6.2f}s  p99 {result['p99']:6.2f}s  "
+          f"statuses {result['statuses']}")
+
+
+def run_modes(args, levels, stub_url, workdir, results):
+    for mode in args.modes.split(','):
+        process, base_url = start_server(mode, args, stub_url, workdir)
+        try:
+            offset = 0
+            for level in levels:
+                make = functools.partial(make_request, args.scenario)
+                result = asyncio.run(run_level(base_url, make, level, max(args.requests, level), offset))
+                offset += result['requests']
+                result['mode'] = mode
+                results.append(result)
+                if not args.json:
+                    print_result(mode, args.scenario, result)
+        finally:
+            process.terminate()
+            process.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--scenario', choices=['analyze', 'search'], default='analyze')
+    parser.add_argument('--modes', default='flask,asgi')
+    parser.add_argument('--concurrency', default='16,64,256')
+    parser.add_argument('--requests', type=int, default=256)
+    parser.add_argument('--llm-latency', type=float, default=1.0)
+    parser.add_argument('--llm-concurrency', type=int, default=1024)
+    parser.add_argument('--listing-latency', type=float, default=0.3)
+    parser.add_argument('--body-latency', type=float, default=0.2)
+    parser.add_argument('--flask-threads', type=int, default=16)
+    parser.add_argument('--per-host', type=int, default=256)
+    parser.add_argument('--serve', choices=['flask', 'asgi'], help=argparse.SUPPRESS)
+    parser.add_argument('--port', type=int, help=argparse.SUPPRESS)
+    parser.add_argument('--json', action='store_true')
+    args = parser.parse_args()
+
+    if args.serve:
+        serve(args)
+        return
+
+    # The stubs get their own process so they do not compete with the load
+    # generator for the GIL.
+    stub_port = free_port()
+    stub = subprocess.Popen([sys.executable, stubs.__file__, '--port', str(stub_port),
+                             '--listing-latency', str(args.listing_latency), '--body-latency', str(args.body_latency)],
+                            stdout=subprocess.DEVNULL)
+    stub_url = f"http://127.0.0.1:{stub_port}"
+    levels = [int(level) for level in args.concurrency.split(',')]
+    results = []
+    try:
+        with tempfile.TemporaryDirectory() as workdir:
+            run_modes(args, levels, stub_url, workdir, results)
+    finally:
+        stub.terminate()
+        stub.wait()
+    if args.json:
+        print(json.dumps(results, indent=2))
+
+
+if __name__ == '__main__':
+    main()
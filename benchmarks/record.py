@@ -0,0 +1,115 @@
+# Records live responses for benchmarks/replay.py: each ticker's Finviz quote
+# page, the article pages it links to, Yahoo's news listing and, with --llm,
+# Gemini's answers to the per-article and final analysis prompts. Output is
+# JSONL with one record per line (see replay.load_recording for the fields).
+#
+#   python benchmarks/record.py --tickers AAPL,MSFT --articles 5 [--llm] \
+#       --out benchmarks/recordings/sample.jsonl
+import argparse
+import hashlib
+import json
+import os
+import sys
+import time
+from datetime import datetime, timezone
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import yfinance as yf
+
+import app
+import http_client
+from extraction import extract_article_text
+
+
+def prompt_hash(prompt):
+    return hashlib.sha256(prompt.encode('utf-8')).hexdigest()
+
+
+def record_http(url, write):
+    started = time.perf_counter()
+    response = http_client.session.get(url, timeout=20)
+    elapsed = time.perf_counter() - started
+    write({
+        'kind': 'http',
+        'url': url,
+        'status': response.status_code,
+        'content_type': response.headers.get('Content-Type', 'text/html'),
+        'elapsed': round(elapsed, 4),
+        'body': response.text,
+    })
+    return response
+
+
+def record_llm(prompt, write):
+    started = time.perf_counter()
+    response = app.get_model().generate_content(prompt)
+    elapsed = time.perf_counter() - started
+    usage = getattr(response, 'usage_metadata', None)
+    write({
+        'kind': 'llm',
+        'prompt_sha256': prompt_hash(prompt),
+        'elapsed': round(elapsed, 4),
+        'text': response.text,
+        'usage': {
+            'prompt_token_count': getattr(usage, 'prompt_token_count', 0),
+            'candidates_token_count': getattr(usage, 'candidates_token_count', 0),
+            'total_token_count': getattr(usage, 'total_token_count', 0),
+        },
+    })
+
+
+def record_ticker(ticker, args, write):
+    url = app.FINVIZ_URL.format(ticker=ticker)
+    listing = record_http(url, write)
+    articles = app.finviz_articles(listing.text, url)[:args.articles] if listing.ok else []
+
+    started = time.perf_counter()
+    news = yf.Ticker(ticker).news
+    write({'kind': 'yahoo_news', 'ticker': ticker, 'elapsed': round(time.perf_counter() - started, 4), 'news': news})
+
+    for article in articles:
+        try:
+            response = record_http(article['link'], write)
+        except Exception as e:
+            print(f"  skipped {article['link']}: {e}")
+            continue
+        article['content'] = extract_article_text(response.text) if response.ok else None
+
+    if args.llm:
+        analyzed = [article for article in articles if article.get('content')]
+        for article in analyzed:
+            record_llm(app.generate_analysis_prompt(article, ticker), write)
+        if analyzed:
+            record_llm(app.build_final_analysis_prompt(analyzed, ticker), write)
+    print(f"{ticker}: {len(articles)} articles")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--tickers', default='AAPL,MSFT,NVDA')
+    parser.add_argument('--articles', type=int, default=5)
+    parser.add_argument('--llm', action='store_true', help='also record Gemini responses (uses quota)')
+    parser.add_argument('--out', default=os.path.join(ROOT, 'benchmarks', 'recordings', 'recording.jsonl'))
+    args = parser.parse_args()
+
+    tickers = [ticker.strip().upper() for ticker in args.tickers.split(',') if ticker.strip()]
+    os.makedirs(os.path.dirname(os.path.abspath(args.out)), exist_ok=True)
+    with open(args.out, 'w', encoding='utf-8') as f:
+        def write(record):
+            f.write(json.dumps(record) + '\n')
+
+        write({
+            'kind': 'meta',
+            'recorded_at': datetime.now(timezone.utc).isoformat(),
+            'tickers': tickers,
+            'model': app.MODEL_NAME,
+        })
+        for ticker in tickers:
+            record_ticker(ticker, args, write)
+    print(f"Wrote {args.out}")
+
+
+if __name__ == '__main__':
+    main()
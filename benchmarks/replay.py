@@ -0,0 +1,495 @@
+# Offline benchmark and replay suite. Serves a recording made by record.py
+# (or, without --recording, a synthetic one built from benchmarks/fixtures)
+# through a local HTTP server, answers Gemini calls from the recording with a
+# fake model, and drives the Flask and/or ASGI app at each concurrency level.
+#
+# Reports, per mode/scenario/level, throughput and latency percentiles; per
+# mode, the server's peak RSS and its per-stage latencies from /status; and
+# per stage, time and tracemalloc peak for the parsing/prompt code run
+# in-process on the recorded pages. --save writes the results as JSON and
+# --baseline compares against a saved run, exiting 1 on regressions beyond
+# --tolerance.
+#
+#   python benchmarks/replay.py [--recording benchmarks/recordings/x.jsonl]
+#       [--modes flask,asgi] [--scenarios search,analyze,final]
+#       [--concurrency 1,8,32] [--requests 64] [--llm-latency recorded|<seconds>]
+#       [--save results.json] [--baseline results.json --tolerance 0.25]
+import argparse
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import re
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from types import SimpleNamespace
+
+import httpx
+
+BENCHMARKS = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(BENCHMARKS)
+sys.path.insert(0, ROOT)
+sys.path.insert(0, BENCHMARKS)
+
+import load_test
+import stubs
+
+_ABSOLUTE_URL = re.compile(r'https?://([A-Za-z0-9.-]+)/')
+_ROOT_HREF = re.compile(r'(href=["\'])/(?!/)')
+DEFAULT_LLM_LATENCY = 1.0
+
+
+class Recording:
+    # Records by kind:
+    #   meta        recorded_at, tickers, model
+    #   http        url, status, content_type, elapsed, body
+    #   yahoo_news  ticker, elapsed, news (yfinance's Ticker.news list)
+    #   llm         prompt_sha256, elapsed, text, usage (usage_metadata fields)
+    def __init__(self, records):
+        self.meta = {}
+        self.http = {}
+        self.yahoo = {}
+        self.llm = {}
+        for record in records:
+            kind = record.get('kind')
+            if kind == 'meta':
+                self.meta = record
+            elif kind == 'http':
+                self.http[record['url']] = record
+            elif kind == 'yahoo_news':
+                self.yahoo[record['ticker']] = record
+            elif kind == 'llm':
+                self.llm[record['prompt_sha256']] = record
+
+    @property
+    def tickers(self):
+        return self.meta.get('tickers') or sorted(self.yahoo)
+
+
+def load_recording(path):
+    if not path:
+        return synthetic_recording()
+    with open(path, encoding='utf-8') as f:
+        return Recording(json.loads(line) for line in f if line.strip())
+
+
+def synthetic_recording(tickers=('AAPL', 'MSFT', 'NVDA'), listing_elapsed=0.3, body_elapsed=0.2):
+    # Stands in for a real recording when none is given: the Finviz fixture
+    # per ticker, its links served by the article fixtures, no LLM answers
+    # (the fake model's default answer is used).
+    page = stubs._read('finviz_quote.html')
+    articles = [stubs._read(name) for name in stubs.ARTICLE_FIXTURES]
+    records = [{'kind': 'meta', 'recorded_at': None, 'tickers': list(tickers), 'model': None}]
+    for ticker in tickers:
+        listing = page.replace('https://example.com/news/', f'https://news.example.com/{ticker}/')
+        records.append({'kind': 'http', 'url': f'https://finviz.com/quote.ashx?t={ticker}', 'status': 200,
+                        'content_type': 'text/html', 'elapsed': listing_elapsed, 'body': listing})
+        for index in range(100):
+            records.append({'kind': 'http', 'url': f'https://news.example.com/{ticker}/{index}', 'status': 200,
+                            'content_type': 'text/html', 'elapsed': body_elapsed,
+                            'body': articles[index % len(articles)]})
+        records.append({'kind': 'yahoo_news', 'ticker': ticker, 'elapsed': 0.2, 'news': []})
+    return Recording(records)
+
+
+class ReplayServer(ThreadingHTTPServer):
+    # Serves recorded URL https://host/path at /host/path. Absolute links in
+    # served pages are rewritten to point back here, so nothing leaves the
+    # machine; unrecorded URLs get a 404.
+    daemon_threads = True
+    request_queue_size = 1024
+
+    def __init__(self, address, recording, latency=None):
+        super().__init__(address, ReplayHandler)
+        self.recording = recording
+        self.latency = latency
+        self._rewritten = {}
+
+    def handle_error(self, request, client_address):
+        pass
+
+    @property
+    def base_url(self):
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+    def lookup(self, path):
+        host, _, rest = path.lstrip('/').partition('/')
+        for scheme in ('https', 'http'):
+            record = self.recording.http.get(f"{scheme}://{host}/{rest}")
+            if record is not None:
+                return host, record
+        return host, None
+
+    def body(self, host, record):
+        body = self._rewritten.get(record['url'])
+        if body is None:
+            body = _ABSOLUTE_URL.sub(lambda match: f"{self.base_url}/{match.group(1)}/", record['body'])
+            body = _ROOT_HREF.sub(lambda match: f"{match.group(1)}/{host}/", body).encode('utf-8')
+            self._rewritten[record['url']] = body
+        return body
+
+
+class ReplayHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        host, record = self.server.lookup(self.path)
+        if record is None:
+            body = b'not recorded'
+            self.send_response(404)
+            self.send_header('Content-Type', 'text/plain')
+        else:
+            latency = self.server.latency if self.server.latency is not None else record.get('elapsed', 0)
+            time.sleep(latency)
+            body = self.server.body(host, record)
+            self.send_response(record.get('status', 200))
+            self.send_header('Content-Type', record.get('content_type', 'text/html'))
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+class ReplayModel(stubs.FakeModel):
+    # Answers from the recording by prompt hash, sleeping for the recorded
+    # latency unless one is given. Prompts that were not recorded (the code
+    # changed, a synthetic recording, or Finviz rows dated "Today" that now
+    # resolve to a different day) get the default stub answer.
+    def __init__(self, recording, latency=None):
+        super().__init__(latency)
+        self.recording = recording
+        self.misses = 0
+
+    def _answer(self, prompt):
+        record = self.recording.llm.get(hashlib.sha256(prompt.encode('utf-8')).hexdigest())
+        if record is None:
+            self.misses += 1
+            if self.misses == 1:
+                logging.warning("Replay model: prompt not in recording, using the default answer")
+            usage = {'prompt_token_count': len(prompt) // 4, 'candidates_token_count': len(self.text) // 4}
+            record = {'text': self.text, 'usage': usage, 'elapsed': DEFAULT_LLM_LATENCY}
+        latency = self.latency if self.latency is not None else record.get('elapsed', DEFAULT_LLM_LATENCY)
+        return stubs.FakeResponse(record['text'], record.get('usage')), latency
+
+    def generate_content(self, prompt, stream=False):
+        response, latency = self._answer(prompt)
+        time.sleep(latency)
+        return response
+
+    async def generate_content_async(self, prompt, stream=False):
+        response, latency = self._answer(prompt)
+        await asyncio.sleep(latency)
+        return response
+
+
+class ReplayYahoo:
+    # Replaces the yfinance module inside app for the Yahoo fallback.
+    def __init__(self, recording):
+        self.recording = recording
+
+    def Ticker(self, ticker):
+        record = self.recording.yahoo.get(ticker.upper(), {})
+        time.sleep(record.get('elapsed', 0))
+        return SimpleNamespace(news=record.get('news', []))
+
+
+def parse_latency(value):
+    return None if value in (None, 'recorded') else float(value)
+
+
+def serve(args):
+    recording = load_recording(args.recording)
+    import app
+
+    app.model = ReplayModel(recording, parse_latency(args.llm_latency))
+    app.yf = ReplayYahoo(recording)
+    if args.serve == 'flask':
+        load_test.serve_flask(args.port, args.flask_threads)
+    else:
+        load_test.serve_asgi(args.port)
+
+
+def serve_replay(args):
+    server = ReplayServer(('127.0.0.1', args.port), load_recording(args.recording), parse_latency(args.http_latency))
+    server.serve_forever()
+
+
+def start_replay_server(args):
+    port = load_test.free_port()
+    command = [sys.executable, os.path.abspath(__file__), '--replay-server', '--port', str(port),
+               '--http-latency', args.http_latency]
+    if args.recording:
+        command += ['--recording', os.path.abspath(args.recording)]
+    process = subprocess.Popen(command, stdout=subprocess.DEVNULL)
+    base_url = f"http://127.0.0.1:{port}"
+    for _ in range(100):
+        try:
+            httpx.get(f"{base_url}/", timeout=1)
+            return process, base_url
+        except httpx.HTTPError:
+            time.sleep(0.1)
+    process.kill()
+    raise RuntimeError("Replay server did not start")
+
+
+def start_app_server(mode, args, replay_url, workdir):
+    port = load_test.free_port()
+    env = load_test.server_env(mode, args, replay_url, workdir)
+    env.update({
+        'FINVIZ_URL': f"{replay_url}/finviz.com/quote.ashx?t={{ticker}}",
+        # Re-fetch listings and re-run analyses on every request so the
+        # measured path includes them, instead of serving from the caches.
+        'NEWS_LISTING_TTL': '0',
+        'ANALYSIS_TTL': '0',
+    })
+    command = [sys.executable, os.path.abspath(__file__), '--serve', mode, '--port', str(port),
+               '--llm-latency', args.llm_latency, '--flask-threads', str(args.flask_threads)]
+    if args.recording:
+        command += ['--recording', os.path.abspath(args.recording)]
+    return load_test.launch(mode, command, env, workdir, port)
+
+
+def peak_rss_mb(pid):
+    # VmHWM is the process's peak resident set size (Linux only).
+    try:
+        with open(f'/proc/{pid}/status') as f:
+            for line in f:
+                if line.startswith('VmHWM:'):
+                    return round(int(line.split()[1]) / 1024, 1)
+    except OSError:
+        pass
+    return None
+
+
+def recorded_articles(recording):
+    # {ticker: [article dicts with extracted content]} as the app would
+    # return them from /search_articles.
+    import app
+    from extraction import extract_article_text
+
+    by_ticker = {}
+    for ticker in recording.tickers:
+        url = f'https://finviz.com/quote.ashx?t={ticker}'
+        record = recording.http.get(url)
+        if record is None:
+            continue
+        articles = []
+        for article in app.finviz_articles(record['body'], url):
+            body = recording.http.get(article['link'])
+            content = extract_article_text(body['body']) if body else None
+            if content:
+                article['content'] = content
+                articles.append(article)
+            if len(articles) == 5:
+                break
+        by_ticker[ticker] = articles
+    return by_ticker
+
+
+def request_maker(scenario, tickers, articles):
+    def make(index):
+        ticker = tickers[index % len(tickers)]
+        if scenario == 'search':
+            return '/search_articles', {'stock_ticker': ticker, 'num_articles': 5, 'start_date': '2000-01-01'}
+        if scenario == 'analyze':
+            ticker_articles = articles[ticker]
+            return '/analyze_article', {'stock_ticker': ticker, 'article': ticker_articles[index % len(ticker_articles)]}
+        return '/generate_final_analysis', {'stock_ticker': ticker, 'articles': articles[ticker]}
+    return make
+
+
+def measure(fn, inputs, iterations):
+    # Per-call wall time and tracemalloc peak (KB above the starting level).
+    times = []
+    peaks = []
+    tracemalloc.start()
+    try:
+        for _ in range(iterations):
+            for value in inputs:
+                before, _ = tracemalloc.get_traced_memory()
+                tracemalloc.reset_peak()
+                started = time.perf_counter()
+                fn(value)
+                times.append(time.perf_counter() - started)
+                _, peak = tracemalloc.get_traced_memory()
+                peaks.append(max(peak - before, 0) / 1024)
+    finally:
+        tracemalloc.stop()
+    times.sort()
+    return {
+        'calls': len(times),
+        'mean_ms': round(statistics.mean(times) * 1000, 3),
+        'p95_ms': round(times[min(int(0.95 * len(times)), len(times) - 1)] * 1000, 3),
+        'peak_kb': round(max(peaks), 1),
+    }
+
+
+def stage_benchmarks(recording, articles, iterations):
+    import app
+    import summarizer
+    from extraction import extract_article_text, parse_finviz_news_table
+
+    listings = [record['body'] for url, record in recording.http.items() if 'finviz.com/' in url]
+    bodies = [record['body'] for url, record in recording.http.items() if 'finviz.com/' not in url][:50]
+    pairs = [(ticker, article) for ticker, items in articles.items() for article in items]
+    answers = [record['text'] for record in recording.llm.values()] or [stubs.ANALYSIS_TEXT]
+
+    def prompt_build(pair):
+        # Summaries are memoized; clear so every call does the work.
+        summarizer._summarize.cache_clear()
+        app.generate_analysis_prompt(pair[1], pair[0])
+
+    return {
+        'finviz_parse': measure(parse_finviz_news_table, listings, iterations),
+        'extraction': measure(extract_article_text, bodies, iterations),
+        'prompt_build': measure(prompt_build, pairs, iterations),
+        'final_prompt_build': measure(lambda ticker: app.build_final_analysis_prompt(articles[ticker], ticker),
+                                      list(articles), iterations),
+        'projection_extract': measure(app.parse_analysis, answers, iterations * 10),
+    }
+
+
+def run(args, recording, workdir):
+    articles = recorded_articles(recording)
+    tickers = [ticker for ticker in recording.tickers if articles.get(ticker)]
+    if not tickers:
+        raise SystemExit("Recording has no tickers with articles")
+    levels = [int(level) for level in args.concurrency.split(',')]
+    results = {'load': [], 'servers': {}, 'stages': {}}
+
+    replay, replay_url = start_replay_server(args)
+    try:
+        for mode in args.modes.split(','):
+            process, base_url = start_app_server(mode, args, replay_url, workdir)
+            try:
+                offset = 0
+                for scenario in args.scenarios.split(','):
+                    make = request_maker(scenario, tickers, articles)
+                    for level in levels:
+                        result = asyncio.run(load_test.run_level(base_url, make, level, max(args.requests, level), offset))
+                        offset += result['requests']
+                        result.update(mode=mode, scenario=scenario)
+                        results['load'].append(result)
+                        load_test.print_result(mode, scenario, result)
+                status = httpx.get(f"{base_url}/status", timeout=30).json()
+                results['servers'][mode] = {
+                    'peak_rss_mb': peak_rss_mb(process.pid),
+                    'stages': status.get('tracing', {}).get('stages', {}),
+                }
+            finally:
+                process.terminate()
+                process.wait()
+    finally:
+        replay.terminate()
+        replay.wait()
+
+    results['stages'] = stage_benchmarks(recording, articles, args.iterations)
+    return results
+
+
+def print_report(results):
+    for mode, server in results['servers'].items():
+        print(f"\n{mode} server: peak RSS {server['peak_rss_mb']} MB")
+        for stage, timings in sorted(server['stages'].items()):
+            print(f"  {stage:20} n={timings['count']:<6} p50 {timings['p50_ms']} ms  p95 {timings['p95_ms']} ms  "
+                  f"p99 {timings['p99_ms']} ms  errors {timings['errors']}")
+    print("\nIn-process stages on recorded pages:")
+    for stage, timings in results['stages'].items():
+        print(f"  {stage:20} {timings['calls']:6} calls  mean {timings['mean_ms']:8.3f} ms  "
+              f"p95 {timings['p95_ms']:8.3f} ms  peak {timings['peak_kb']:9.1f} KB")
+
+
+def compare(baseline, results, tolerance):
+    # Lower throughput, or higher latency/memory, by more than tolerance.
+    regressions = []
+
+    def check(name, old, new, higher_is_worse=True):
+        if old in (None, 0) or new is None:
+            return
+        change = (new - old) / old
+        if (change > tolerance) if higher_is_worse else (change < -tolerance):
+            regressions.append(f"{name}: {old} -> {new} ({change:+.0%})")
+
+    old_load = {(r['mode'], r['scenario'], r['concurrency']): r for r in baseline.get('load', [])}
+    for result in results['load']:
+        old = old_load.get((result['mode'], result['scenario'], result['concurrency']))
+        if old is None:
+            continue
+        label = f"{result['mode']} {result['scenario']} c={result['concurrency']}"
+        check(f"{label} throughput", old['throughput'], result['throughput'], higher_is_worse=False)
+        check(f"{label} p95", old['p95'], result['p95'])
+    for mode, server in results['servers'].items():
+        old = baseline.get('servers', {}).get(mode)
+        if old:
+            check(f"{mode} peak RSS MB", old['peak_rss_mb'], server['peak_rss_mb'])
+    for stage, timings in results['stages'].items():
+        old = baseline.get('stages', {}).get(stage)
+        if old:
+            check(f"{stage} mean ms", old['mean_ms'], timings['mean_ms'])
+            check(f"{stage} peak KB", old['peak_kb'], timings['peak_kb'])
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--recording', help='JSONL from record.py; synthetic fixtures if omitted')
+    parser.add_argument('--modes', default='flask,asgi')
+    parser.add_argument('--scenarios', default='search,analyze,final')
+    parser.add_argument('--concurrency', default='1,8,32')
+    parser.add_argument('--requests', type=int, default=64)
+    parser.add_argument('--iterations', type=int, default=5, help='repetitions for the in-process stage benchmarks')
+    parser.add_argument('--llm-latency', default='recorded')
+    parser.add_argument('--http-latency', default='recorded')
+    parser.add_argument('--llm-concurrency', type=int, default=1024)
+    parser.add_argument('--flask-threads', type=int, default=16)
+    parser.add_argument('--per-host', type=int, default=256)
+    parser.add_argument('--save')
+    parser.add_argument('--baseline')
+    parser.add_argument('--tolerance', type=float, default=0.25)
+    parser.add_argument('--serve', choices=['flask', 'asgi'], help=argparse.SUPPRESS)
+    parser.add_argument('--replay-server', action='store_true', help=argparse.SUPPRESS)
+    parser.add_argument('--port', type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.serve:
+        serve(args)
+        return
+    if args.replay_server:
+        serve_replay(args)
+        return
+
+    recording = load_recording(args.recording)
+    with tempfile.TemporaryDirectory() as workdir:
+        # The in-process stage benchmarks import app; keep its stores here.
+        for name in ('ARTICLE_STORE_PATH', 'CACHE_DB_PATH', 'ANALYSIS_CACHE_PATH'):
+            os.environ[name] = os.path.join(workdir, f'bench-{name.lower()}.db')
+        os.environ.setdefault('PREFETCH_ENABLED', '0')
+        os.environ.setdefault('TICKER_LIST_URL', '')
+        logging.disable(logging.WARNING)
+        results = run(args, recording, workdir)
+    print_report(results)
+
+    if args.save:
+        with open(args.save, 'w') as f:
+            json.dump(results, f, indent=2)
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(json.load(f), results, args.tolerance)
+        if regressions:
+            print(f"\n{len(regressions)} regression(s) beyond {args.tolerance:.0%}:")
+            for regression in regressions:
+                print(f"  {regression}")
+            sys.exit(1)
+        print(f"\nNo regressions beyond {args.tolerance:.0%} against {args.baseline}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,120 @@
+# Local stand-ins for the services the backend talks to, for load tests:
+# an HTTP server answering like Finviz's quote page and the article sites it
+# links to (built from the fixtures, with configurable latency), and a fake
+# Gemini model that sleeps instead of calling out.
+import argparse
+import asyncio
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from types import SimpleNamespace
+from urllib.parse import parse_qs, urlparse
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures')
+ARTICLE_FIXTURES = ['article_tag.html', 'article_itemprop.html', 'article_entry_content.html']
+ANALYSIS_TEXT = """1. **Strengths:** Solid quarter.
+Estimated Returns (1 Month): +2.5%
+Estimated Returns (1 Year): +12%
+"""
+
+
+def _read(name):
+    with open(os.path.join(FIXTURES, name), encoding='utf-8') as f:
+        return f.read()
+
+
+class StubServer(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 1024
+
+    def __init__(self, address, listing_latency, body_latency):
+        super().__init__(address, StubHandler)
+        self.listing_latency = listing_latency
+        self.body_latency = body_latency
+        self.finviz_page = _read('finviz_quote.html')
+        self.articles = [_read(name).encode('utf-8') for name in ARTICLE_FIXTURES]
+
+    def handle_error(self, request, client_address):
+        # Clients abandoning a slow body at their deadline is expected.
+        pass
+
+    @property
+    def base_url(self):
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, *args):
+        pass
+
+    def _send(self, body, status=200):
+        self.send_response(status)
+        self.send_header('Content-Type', 'text/html; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        if url.path == '/quote.ashx':
+            # Each ticker links to its own article URLs so bodies are not
+            # shared between requests for different tickers.
+            ticker = parse_qs(url.query).get('t', ['X'])[0]
+            time.sleep(self.server.listing_latency)
+            page = self.server.finviz_page.replace('https://example.com/news/', f"{self.server.base_url}/news/{ticker}/")
+            self._send(page.encode('utf-8'))
+        elif url.path.startswith('/news/'):
+            time.sleep(self.server.body_latency)
+            self._send(self.server.articles[hash(url.path) % len(self.server.articles)])
+        else:
+            self._send(b'not found', 404)
+
+
+def start_stub_server(port=0, listing_latency=0.3, body_latency=0.2):
+    server = StubServer(('127.0.0.1', port), listing_latency, body_latency)
+    threading.Thread(target=server.serve_forever, name='stub-server', daemon=True).start()
+    return server
+
+
+class FakeResponse:
+    def __init__(self, text, usage=None):
+        self.text = text
+        # Same attribute names as Gemini's usage_metadata.
+        self.usage_metadata = SimpleNamespace(**usage) if usage else None
+
+    def __iter__(self):
+        for line in self.text.splitlines(keepends=True):
+            yield FakeResponse(line)
+
+
+class FakeModel:
+    # Mimics genai.GenerativeModel's generate_content / generate_content_async.
+    def __init__(self, latency=1.0, text=ANALYSIS_TEXT):
+        self.latency = latency
+        self.text = text
+
+    def generate_content(self, prompt, stream=False):
+        time.sleep(self.latency)
+        return FakeResponse(self.text)
+
+    async def generate_content_async(self, prompt, stream=False):
+        await asyncio.sleep(self.latency)
+        return FakeResponse(self.text)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--port', type=int, default=8900)
+    parser.add_argument('--listing-latency', type=float, default=0.3)
+    parser.add_argument('--body-latency', type=float, default=0.2)
+    args = parser.parse_args()
+    server = StubServer(('127.0.0.1', args.port), args.listing_latency, args.body_latency)
+    print(f"Stub server on {server.base_url}", flush=True)
+    server.serve_forever()
+
+
+if __name__ == '__main__':
+    main()
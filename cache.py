@@ -0,0 +1,193 @@
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+MEMORY_BUDGET_MB = float(os.getenv('CACHE_MEMORY_BUDGET_MB', 64))
+DISK_BUDGET_MB = float(os.getenv('CACHE_DISK_BUDGET_MB', 512))
+CACHE_DB_PATH = os.getenv('CACHE_DB_PATH')
+NEWS_LISTING_TTL = float(os.getenv('NEWS_LISTING_TTL', 300))
+ARTICLE_BODY_TTL = float(os.getenv('ARTICLE_BODY_TTL', 86400))
+
+
+def _sizeof(value):
+    if isinstance(value, str):
+        return len(value)
+    return len(json.dumps(value))
+
+
+class CacheEntry:
+    __slots__ = ('value', 'expires_at', 'etag', 'last_modified', 'size')
+
+    def __init__(self, value, expires_at, etag=None, last_modified=None, size=None):
+        self.value = value
+        self.expires_at = expires_at
+        self.etag = etag
+        self.last_modified = last_modified
+        self.size = _sizeof(value) if size is None else size
+
+    @property
+    def fresh(self):
+        return time.time() < self.expires_at
+
+
+class _MemoryTier:
+    def __init__(self, budget_bytes):
+        self.budget = budget_bytes
+        self.bytes = 0
+        self.evictions = 0
+        self._entries = OrderedDict()
+
+    def get(self, key):
+        entry = self._entries.get(key)
+        if entry is not None:
+            self._entries.move_to_end(key)
+        return entry
+
+    def put(self, key, entry):
+        if entry.size > self.budget:
+            return
+        old = self._entries.pop(key, None)
+        if old is not None:
+            self.bytes -= old.size
+        self._entries[key] = entry
+        self.bytes += entry.size
+        while self.bytes > self.budget:
+            _, evicted = self._entries.popitem(last=False)
+            self.bytes -= evicted.size
+            self.evictions += 1
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class _DiskTier:
+    def __init__(self, path, budget_bytes, name):
+        self.budget = budget_bytes
+        self.table = f"cache_{name}"
+        self.evictions = 0
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        self._conn.execute(f"""
+            CREATE TABLE IF NOT EXISTS {self.table} (
+                key TEXT PRIMARY KEY,
+                value TEXT NOT NULL,
+                expires_at REAL NOT NULL,
+                etag TEXT,
+                last_modified TEXT,
+                size INTEGER NOT NULL,
+                accessed_at REAL NOT NULL
+            )
+        """)
+        self._conn.execute(f"CREATE INDEX IF NOT EXISTS {self.table}_accessed ON {self.table} (accessed_at)")
+        self._conn.commit()
+        self.bytes = self._conn.execute(f"SELECT COALESCE(SUM(size), 0) FROM {self.table}").fetchone()[0]
+
+    def get(self, key):
+        row = self._conn.execute(
+            f"SELECT value, expires_at, etag, last_modified, size FROM {self.table} WHERE key = ?", (key,)
+        ).fetchone()
+        if row is None:
+            return None
+        self._conn.execute(f"UPDATE {self.table} SET accessed_at = ? WHERE key = ?", (time.time(), key))
+        self._conn.commit()
+        value, expires_at, etag, last_modified, size = row
+        return CacheEntry(json.loads(value), expires_at, etag, last_modified, size)
+
+    def put(self, key, entry):
+        old = self._conn.execute(f"SELECT size FROM {self.table} WHERE key = ?", (key,)).fetchone()
+        self._conn.execute(
+            f"INSERT OR REPLACE INTO {self.table} VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (key, json.dumps(entry.value), entry.expires_at, entry.etag, entry.last_modified, entry.size, time.time()),
+        )
+        self.bytes += entry.size - (old[0] if old else 0)
+        if self.bytes > self.budget:
+            self._evict()
+        self._conn.commit()
+
+    def _evict(self):
+        target = self.budget * 0.9
+        rows = self._conn.execute(f"SELECT key, size FROM {self.table} ORDER BY accessed_at").fetchall()
+        doomed = []
+        for key, size in rows:
+            if self.bytes <= target:
+                break
+            doomed.append((key,))
+            self.bytes -= size
+        self._conn.executemany(f"DELETE FROM {self.table} WHERE key = ?", doomed)
+        self.evictions += len(doomed)
+
+    def __len__(self):
+        return self._conn.execute(f"SELECT COUNT(*) FROM {self.table}").fetchone()[0]
+
+
+class TieredCache:
+    def __init__(self, name, memory_budget_mb=MEMORY_BUDGET_MB, disk_path=CACHE_DB_PATH, disk_budget_mb=DISK_BUDGET_MB):
+        self.name = name
+        self._lock = threading.Lock()
+        self._memory = _MemoryTier(int(memory_budget_mb * 1024 * 1024))
+        self._disk = None
+        if disk_path:
+            try:
+                self._disk = _DiskTier(disk_path, int(disk_budget_mb * 1024 * 1024), name)
+            except sqlite3.Error as e:
+                logging.error(f"Disk cache disabled for {name}: {e}")
+        self._counters = {'memory_hits': 0, 'disk_hits': 0, 'misses': 0, 'stale': 0, 'revalidated': 0, 'stores': 0}
+
+    def _count(self, name):
+        self._counters[name] += 1
+
+    def get(self, key):
+        # Returns the entry even when expired so callers can revalidate or
+        # fall back to it; check entry.fresh before trusting it.
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is None and self._disk is not None:
+                entry = self._disk.get(key)
+                if entry is not None:
+                    self._memory.put(key, entry)
+                    if entry.fresh:
+                        self._count('disk_hits')
+                        return entry
+            elif entry is not None and entry.fresh:
+                self._count('memory_hits')
+                return entry
+
+            self._count('stale' if entry is not None else 'misses')
+            return entry
+
+    def set(self, key, value, ttl, etag=None, last_modified=None):
+        entry = CacheEntry(value, time.time() + ttl, etag, last_modified)
+        with self._lock:
+            self._count('stores')
+            self._memory.put(key, entry)
+            if self._disk is not None:
+                self._disk.put(key, entry)
+        return entry
+
+    def refresh(self, key, entry, ttl):
+        with self._lock:
+            self._count('revalidated')
+        return self.set(key, entry.value, ttl, entry.etag, entry.last_modified)
+
+    def stats(self):
+        with self._lock:
+            snapshot = dict(self._counters)
+            hits = snapshot['memory_hits'] + snapshot['disk_hits']
+            lookups = hits + snapshot['misses'] + snapshot['stale']
+            snapshot['hit_rate'] = round(hits / lookups, 4) if lookups else 0.0
+            snapshot['memory_entries'] = len(self._memory)
+            snapshot['memory_bytes'] = self._memory.bytes
+            snapshot['memory_evictions'] = self._memory.evictions
+            if self._disk is not None:
+                snapshot['disk_entries'] = len(self._disk)
+                snapshot['disk_bytes'] = self._disk.bytes
+                snapshot['disk_evictions'] = self._disk.evictions
+        return snapshot
+
+
+response_cache = TieredCache('responses')
@@ -0,0 +1,179 @@
+import re
+from datetime import datetime
+
+from lxml import etree
+
+CONTENT_SELECTORS = [
+    'article', '.article-body', '.article-content', '.story-body',
+    '[itemprop="articleBody"]', '.entry-content', '.post-content', 'div.content'
+]
+MAX_CONTENT_CHARS = 5000
+CHUNK_SIZE = 64 * 1024
+
+_SELECTOR_PATTERN = re.compile(r'^(?P<tag>[a-z0-9]+)?(?:\.(?P<cls>[\w-]+))?(?:\[(?P<attr>[\w-]+)="(?P<value>[^"]*)"\])?$')
+_TEXT = etree.XPath('.//text()[not(ancestor::script or ancestor::style or ancestor::noscript or ancestor::template)]')
+_WHITESPACE = re.compile(r'\s+')
+
+
+class SelectorSet:
+    # Compiles simple CSS selectors (tag, .class, tag.class, [attr="value"])
+    # into lookup tables, so one pass over the document can test an element
+    # against every selector with a few dict lookups.
+    def __init__(self, selectors):
+        self.selectors = list(selectors)
+        self._by_tag = {}
+        self._by_class = {}
+        self._by_attr = {}
+        self._attrs = set()
+        for priority, selector in enumerate(self.selectors):
+            match = _SELECTOR_PATTERN.match(selector)
+            if not match:
+                raise ValueError(f"Unsupported selector: {selector}")
+            tag, cls, attr, value = match.group('tag', 'cls', 'attr', 'value')
+            if cls:
+                self._by_class.setdefault(cls, []).append((priority, tag))
+            elif attr:
+                self._by_attr.setdefault((attr, value), []).append((priority, tag))
+                self._attrs.add(attr)
+            else:
+                self._by_tag.setdefault(tag, []).append(priority)
+
+    def best_match(self, element):
+        tag = element.tag
+        best = None
+        for priority in self._by_tag.get(tag, ()):
+            best = priority if best is None else min(best, priority)
+
+        classes = element.get('class')
+        if classes:
+            for cls in classes.split():
+                for priority, required_tag in self._by_class.get(cls, ()):
+                    if required_tag is None or required_tag == tag:
+                        best = priority if best is None else min(best, priority)
+
+        for attr in self._attrs:
+            value = element.get(attr)
+            if value is not None:
+                for priority, required_tag in self._by_attr.get((attr, value), ()):
+                    if required_tag is None or required_tag == tag:
+                        best = priority if best is None else min(best, priority)
+        return best
+
+
+CONTENT_SELECTOR_SET = SelectorSet(CONTENT_SELECTORS)
+
+
+def element_text(element, limit=None):
+    parts = []
+    length = 0
+    for text in _TEXT(element):
+        text = text.strip()
+        if not text:
+            continue
+        parts.append(text)
+        length += len(text) + 1
+        if limit is not None and length > limit:
+            break
+    text = ' '.join(parts)
+    return text[:limit] if limit is not None else text
+
+
+def _iter_events(html, events=('start', 'end')):
+    parser = etree.HTMLPullParser(events=events)
+    for offset in range(0, len(html), CHUNK_SIZE):
+        parser.feed(html[offset:offset + CHUNK_SIZE])
+        for event in parser.read_events():
+            yield event
+    parser.close()
+    for event in parser.read_events():
+        yield event
+
+
+def extract_article_text(html, selectors=CONTENT_SELECTOR_SET, limit=MAX_CONTENT_CHARS):
+    # Single streaming pass: every element is checked against all selectors
+    # as it opens, finished subtrees outside any candidate are freed, and
+    # parsing stops as soon as the top-priority selector's element closes.
+    # Returns the text of the first element matching the highest-priority
+    # selector, or None when nothing matches.
+    best = None
+    best_priority = None
+    open_candidates = 0
+    candidates = set()
+
+    for event, element in _iter_events(html):
+        if event == 'start':
+            priority = selectors.best_match(element)
+            if priority is not None and (best_priority is None or priority < best_priority):
+                best, best_priority = element, priority
+                candidates.add(element)
+                open_candidates += 1
+            continue
+
+        if element in candidates:
+            open_candidates -= 1
+            if element is best and best_priority == 0:
+                break
+        elif open_candidates == 0 and best is None:
+            element.clear(keep_tail=True)
+
+    if best is None:
+        return None
+    text = element_text(best, limit)
+    return text or None
+
+
+def _is_news_table(element):
+    if element.tag != 'table':
+        return False
+    return element.get('id') == 'news-table' or 'news-table' in (element.get('class') or '').split()
+
+
+def _parse_finviz_date(text, current_date, now):
+    parts = _WHITESPACE.sub(' ', text).strip().split(' ')
+    if len(parts) == 2:
+        day, clock = parts
+        if day.lower() == 'today':
+            current_date = now.date()
+        else:
+            current_date = datetime.strptime(day, '%b-%d-%y').date()
+    else:
+        clock = parts[0]
+    if current_date is None:
+        current_date = now.date()
+    return datetime.combine(current_date, datetime.strptime(clock, '%I:%M%p').time()), current_date
+
+
+def parse_finviz_news_table(html, now=None):
+    # Returns the news-table rows in page order as dicts with title, link,
+    # source and published_at (a datetime). Time-only rows inherit the date
+    # of the row above them, as they do on the page.
+    now = now or datetime.now()
+    table = None
+    for _, element in _iter_events(html, events=('end',)):
+        if _is_news_table(element):
+            table = element
+            break
+    if table is None:
+        return None
+
+    rows = []
+    current_date = None
+    for row in table.iter('tr'):
+        cells = [cell for cell in row if cell.tag == 'td']
+        if len(cells) < 2:
+            continue
+
+        anchor = next(cells[1].iter('a'), None)
+        link = anchor.get('href') if anchor is not None else None
+        title = element_text(anchor if anchor is not None else cells[1])
+        source = None
+        for span in cells[1].iter('span'):
+            source = element_text(span).strip('()') or None
+
+        try:
+            published_at, current_date = _parse_finviz_date(element_text(cells[0]), current_date, now)
+        except ValueError:
+            published_at = now
+
+        rows.append({'title': title, 'link': link, 'source': source, 'published_at': published_at})
+    return rows
@@ -0,0 +1,102 @@
+import collections
+import contextvars
+import logging
+import os
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor, wait, FIRST_COMPLETED
+from urllib.parse import urlparse
+
+MAX_WORKERS = int(os.getenv('FETCH_MAX_WORKERS', 32))
+MAX_PER_HOST = int(os.getenv('FETCH_MAX_PER_HOST', 6))
+REQUEST_TIMEOUT = float(os.getenv('FETCH_REQUEST_TIMEOUT', 10))
+DEADLINE = float(os.getenv('FETCH_DEADLINE', 15))
+
+_executor = ThreadPoolExecutor(max_workers=MAX_WORKERS, thread_name_prefix='body-fetch')
+# Per-host FIFO in front of the shared pool: at most MAX_PER_HOST fetches
+# per host are submitted at once and the rest wait here, so a request with
+# many links to one host never parks worker threads on a host limit.
+_hosts = {}
+_hosts_lock = threading.Lock()
+
+
+class _HostQueue:
+    def __init__(self):
+        self.active = 0
+        self.waiting = collections.deque()
+
+
+def _submit(url, fn, *args):
+    # Returns a Future for fn(*args), run in a copy of the caller's context
+    # so its timings land in the caller's request trace.
+    host = urlparse(url).netloc.lower()
+    task = (Future(), contextvars.copy_context(), fn, args)
+    with _hosts_lock:
+        queue = _hosts.get(host)
+        if queue is None:
+            queue = _hosts[host] = _HostQueue()
+        if queue.active >= MAX_PER_HOST:
+            queue.waiting.append(task)
+            return task[0]
+        queue.active += 1
+    _executor.submit(_run, host, task)
+    return task[0]
+
+
+def _run(host, task):
+    future, context, fn, args = task
+    # Cancelled while queued (its caller hit the deadline): skip it.
+    if future.set_running_or_notify_cancel():
+        try:
+            future.set_result(context.run(fn, *args))
+        except Exception as e:
+            future.set_exception(e)
+
+    # Hand this host's slot to the next queued fetch, if any.
+    with _hosts_lock:
+        queue = _hosts[host]
+        if queue.waiting:
+            task = queue.waiting.popleft()
+        else:
+            queue.active -= 1
+            if not queue.active:
+                del _hosts[host]
+            return
+    _executor.submit(_run, host, task)
+
+
+def _fetch_one(fetch, url, timeout, expires_at):
+    remaining = expires_at - time.monotonic()
+    if remaining <= 0:
+        return None
+    return fetch(url, timeout=min(timeout, remaining), deadline=expires_at)
+
+
+def iter_bodies(urls, fetch, timeout=REQUEST_TIMEOUT, deadline=DEADLINE):
+    # Yields (index, content) in completion order; anything still running at
+    # the deadline is reported as None so callers never wait past it.
+    expires_at = time.monotonic() + deadline
+    futures = {
+        _submit(url, _fetch_one, fetch, url, timeout, expires_at): index
+        for index, url in enumerate(urls)
+    }
+    pending = set(futures)
+
+    while pending:
+        remaining = expires_at - time.monotonic()
+        if remaining <= 0:
+            break
+        done, pending = wait(pending, timeout=remaining, return_when=FIRST_COMPLETED)
+        for future in done:
+            try:
+                content = future.result()
+            except Exception as e:
+                logging.error(f"Body fetch failed for {urls[futures[future]]}: {e}")
+                content = None
+            yield futures[future], content
+
+    for future in pending:
+        future.cancel()
+        logging.warning(f"Body fetch missed the {deadline}s deadline: {urls[futures[future]]}")
+        yield futures[future], None
+
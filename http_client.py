@@ -0,0 +1,266 @@
+import contextvars
+import logging
+import os
+import random
+import threading
+import time
+from urllib.parse import urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+from urllib3.exceptions import EmptyPoolError
+
+from cache import response_cache
+
+POOL_HOSTS = int(os.getenv('HTTP_POOL_HOSTS', 32))
+POOL_PER_HOST = int(os.getenv('HTTP_POOL_PER_HOST', 6))
+MAX_RETRIES = int(os.getenv('HTTP_MAX_RETRIES', 3))
+BACKOFF_BASE = float(os.getenv('HTTP_BACKOFF_BASE', 0.5))
+BACKOFF_MAX = float(os.getenv('HTTP_BACKOFF_MAX', 8))
+BREAKER_THRESHOLD = int(os.getenv('HTTP_BREAKER_THRESHOLD', 5))
+BREAKER_COOLDOWN = float(os.getenv('HTTP_BREAKER_COOLDOWN', 60))
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+REQUEST_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
+}
+
+_counters = {
+    'requests': 0,
+    'pool_checkouts': 0,
+    'connections_opened': 0,
+    'retries': 0,
+    'failures': 0,
+    'breaker_trips': 0,
+    'breaker_rejections': 0,
+}
+_counters_lock = threading.Lock()
+# How long the current request may wait for a pooled connection; requests
+# never passes urllib3 a pool timeout, so get() sets it here.
+_pool_timeout = contextvars.ContextVar('pool_timeout', default=None)
+
+
+def _bump(name, amount=1):
+    with _counters_lock:
+        _counters[name] += amount
+
+
+def stats():
+    with _counters_lock:
+        snapshot = dict(_counters)
+    snapshot['pool_hits'] = max(snapshot['pool_checkouts'] - snapshot['connections_opened'], 0)
+    snapshot['open_circuits'] = sorted(_breaker.open_hosts())
+    return snapshot
+
+
+class CircuitOpenError(requests.RequestException):
+    pass
+
+
+class PoolTimeoutError(requests.Timeout):
+    # All POOL_PER_HOST connections to the host stayed busy for the whole
+    # attempt timeout. Local contention, so it does not count against the
+    # host's circuit breaker.
+    pass
+
+
+class _CountingPoolMixin:
+    def _get_conn(self, timeout=None):
+        _bump('pool_checkouts')
+        if timeout is None:
+            timeout = _pool_timeout.get()
+        return super()._get_conn(timeout=timeout)
+
+    def _new_conn(self):
+        _bump('connections_opened')
+        return super()._new_conn()
+
+
+class _CountingHTTPConnectionPool(_CountingPoolMixin, HTTPConnectionPool):
+    pass
+
+
+class _CountingHTTPSConnectionPool(_CountingPoolMixin, HTTPSConnectionPool):
+    pass
+
+
+class _PooledAdapter(HTTPAdapter):
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            'http': _CountingHTTPConnectionPool,
+            'https': _CountingHTTPSConnectionPool,
+        }
+
+    def send(self, request, *args, **kwargs):
+        try:
+            return super().send(request, *args, **kwargs)
+        except EmptyPoolError as e:
+            raise PoolTimeoutError(e, request=request)
+
+
+class _CircuitBreaker:
+    def __init__(self, threshold, cooldown):
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self._failures = {}
+        self._open_until = {}
+        self._lock = threading.Lock()
+
+    def allow(self, host):
+        with self._lock:
+            open_until = self._open_until.get(host)
+            if open_until is None:
+                return True
+            if time.monotonic() >= open_until:
+                # Half-open: let one trial request through and re-arm the
+                # breaker for another cooldown in case it fails too.
+                self._open_until[host] = time.monotonic() + self.cooldown
+                return True
+            return False
+
+    def record_success(self, host):
+        with self._lock:
+            self._failures.pop(host, None)
+            self._open_until.pop(host, None)
+
+    def record_failure(self, host, retry_after=None):
+        with self._lock:
+            failures = self._failures.get(host, 0) + 1
+            self._failures[host] = failures
+            # A Retry-After too long to wait out in a retry opens the circuit
+            # for that long straight away.
+            long_wait = retry_after is not None and retry_after > BACKOFF_MAX
+            if failures < self.threshold and not long_wait:
+                return
+            cooldown = max(self.cooldown if failures >= self.threshold else 0, retry_after or 0)
+            tripped = host not in self._open_until
+            self._open_until[host] = time.monotonic() + cooldown
+        if tripped:
+            _bump('breaker_trips')
+            logging.warning(f"Circuit opened for {host} for {cooldown:.0f}s after {failures} failures")
+
+    def open_hosts(self):
+        now = time.monotonic()
+        with self._lock:
+            return [host for host, until in self._open_until.items() if until > now]
+
+
+_breaker = _CircuitBreaker(BREAKER_THRESHOLD, BREAKER_COOLDOWN)
+
+
+def _build_session():
+    session = requests.Session()
+    adapter = _PooledAdapter(pool_connections=POOL_HOSTS, pool_maxsize=POOL_PER_HOST, pool_block=True, max_retries=0)
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    session.headers.update(REQUEST_HEADERS)
+    return session
+
+
+session = _build_session()
+
+
+def _backoff(attempt):
+    return random.uniform(0, min(BACKOFF_MAX, BACKOFF_BASE * (2 ** attempt)))
+
+
+def _retry_after(response):
+    value = response.headers.get('Retry-After') if response is not None else None
+    try:
+        return float(value) if value else None
+    except ValueError:
+        return None
+
+
+def _retry_delay(attempt, response):
+    # None when the server asks for a longer wait than BACKOFF_MAX: the caller
+    # gives up and the circuit breaker keeps the host closed for that long.
+    retry_after = _retry_after(response)
+    if retry_after is not None and retry_after > BACKOFF_MAX:
+        return None
+    return max(_backoff(attempt), retry_after or 0)
+
+
+def get(url, timeout=10, deadline=None, headers=None, retries=MAX_RETRIES):
+    # deadline is an absolute time.monotonic() value. Backoff never sleeps past
+    # it, so a retry only holds the calling thread while the caller still has
+    # budget left; an open circuit fails immediately without touching the host.
+    host = urlparse(url).netloc.lower()
+    last_error = None
+
+    for attempt in range(retries + 1):
+        if not _breaker.allow(host):
+            _bump('breaker_rejections')
+            raise CircuitOpenError(f"Circuit open for {host}")
+
+        attempt_timeout = timeout
+        if deadline is not None:
+            attempt_timeout = min(timeout, deadline - time.monotonic())
+            if attempt_timeout <= 0:
+                break
+
+        _bump('requests')
+        response = None
+        token = _pool_timeout.set(attempt_timeout)
+        try:
+            response = session.get(url, headers=headers, timeout=attempt_timeout)
+            if response.status_code not in RETRY_STATUSES:
+                _breaker.record_success(host)
+                response.raise_for_status()
+                return response
+            last_error = requests.HTTPError(f"{response.status_code} for url: {url}", response=response)
+        except requests.HTTPError:
+            raise
+        except PoolTimeoutError as e:
+            last_error = e
+            break
+        except requests.RequestException as e:
+            last_error = e
+        finally:
+            _pool_timeout.reset(token)
+
+        _breaker.record_failure(host, _retry_after(response))
+        if attempt == retries:
+            break
+
+        delay = _retry_delay(attempt, response)
+        if delay is None or (deadline is not None and time.monotonic() + delay >= deadline):
+            break
+        _bump('retries')
+        time.sleep(delay)
+
+    _bump('failures')
+    if last_error is None:
+        last_error = requests.Timeout(f"Deadline exceeded before request to {url}")
+    raise last_error
+
+
+def get_text(url, ttl, timeout=10, deadline=None, cache=response_cache):
+    # Fresh entries are served without touching the network. Stale entries
+    # are revalidated with their validators and served as-is if the origin
+    # answers 304, or if it cannot be reached at all.
+    entry = cache.get(url)
+    if entry is not None and entry.fresh:
+        return entry.value
+
+    headers = {}
+    if entry is not None:
+        if entry.etag:
+            headers['If-None-Match'] = entry.etag
+        if entry.last_modified:
+            headers['If-Modified-Since'] = entry.last_modified
+
+    try:
+        response = get(url, timeout=timeout, deadline=deadline, headers=headers or None)
+    except requests.RequestException:
+        if entry is not None:
+            logging.warning(f"Serving stale cached copy of {url}")
+            return entry.value
+        raise
+
+    if response.status_code == 304 and entry is not None:
+        return cache.refresh(url, entry, ttl).value
+
+    cache.set(url, response.text, ttl, response.headers.get('ETag'), response.headers.get('Last-Modified'))
+    return response.text
@@ -0,0 +1,90 @@
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+MAX_FINISHED_JOBS = int(os.getenv('MAX_FINISHED_JOBS', 100))
+
+_jobs = OrderedDict()
+_lock = threading.Lock()
+
+
+class Job:
+    def __init__(self, kind, ticker=None, total=0):
+        self.id = uuid.uuid4().hex[:12]
+        self.kind = kind
+        self.ticker = ticker
+        self.stage = 'queued'
+        self.total = total
+        self.completed = 0
+        self.failed = 0
+        self.error = None
+        self.started_at = time.time()
+        self.finished_at = None
+
+    @property
+    def running(self):
+        return self.finished_at is None
+
+    def update(self, stage=None, total=None):
+        with _lock:
+            if stage is not None:
+                self.stage = stage
+            if total is not None:
+                self.total = total
+                self.completed = 0
+                self.failed = 0
+
+    def advance(self, failed=False):
+        with _lock:
+            self.completed += 1
+            if failed:
+                self.failed += 1
+
+    def finish(self, error=None):
+        with _lock:
+            if self.finished_at is not None:
+                return
+            self.finished_at = time.time()
+            self.stage = 'failed' if error else 'done'
+            self.error = error
+            _jobs.move_to_end(self.id)
+            finished = [job_id for job_id, job in _jobs.items() if not job.running]
+            for job_id in finished[:-MAX_FINISHED_JOBS]:
+                del _jobs[job_id]
+
+    def to_dict(self):
+        with _lock:
+            end = self.finished_at or time.time()
+            return {
+                'job_id': self.id,
+                'kind': self.kind,
+                'ticker': self.ticker,
+                'stage': self.stage,
+                'completed': self.completed,
+                'failed': self.failed,
+                'total': self.total,
+                'error': self.error,
+                'elapsed_seconds': round(end - self.started_at, 3),
+            }
+
+
+def start(kind, ticker=None, total=0):
+    job = Job(kind, ticker, total)
+    with _lock:
+        _jobs[job.id] = job
+    return job
+
+
+def get(job_id):
+    with _lock:
+        return _jobs.get(job_id)
+
+
+def snapshot():
+    with _lock:
+        jobs = list(_jobs.values())
+    running = [job.to_dict() for job in jobs if job.running]
+    recent = [job.to_dict() for job in reversed(jobs) if not job.running]
+    return {'running': running, 'recent': recent}
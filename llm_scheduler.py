@@ -0,0 +1,133 @@
+import asyncio
+import contextvars
+import logging
+import os
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from google.api_core.exceptions import ResourceExhausted, TooManyRequests
+
+LLM_REQUESTS_PER_MINUTE = float(os.getenv('LLM_REQUESTS_PER_MINUTE', 15))
+LLM_TOKENS_PER_MINUTE = float(os.getenv('LLM_TOKENS_PER_MINUTE', 1000000))
+LLM_MAX_CONCURRENCY = int(os.getenv('LLM_MAX_CONCURRENCY', 8))
+LLM_MAX_RETRIES = int(os.getenv('LLM_MAX_RETRIES', 4))
+LLM_OUTPUT_TOKENS = int(os.getenv('LLM_OUTPUT_TOKENS', 1024))
+RATE_LIMIT_ERRORS = (ResourceExhausted, TooManyRequests)
+
+
+def estimate_tokens(prompt):
+    return len(prompt) // 4 + LLM_OUTPUT_TOKENS
+
+
+class TokenBucket:
+    def __init__(self, per_minute, capacity=None):
+        self.rate = per_minute / 60.0
+        self.capacity = capacity or per_minute
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self, amount):
+        # Takes the tokens now, even if that drives the balance negative, and
+        # returns how long the caller must wait before using them. Callers
+        # therefore queue in the order they reserved.
+        amount = min(amount, self.capacity)
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self._tokens -= amount
+            if self._tokens >= 0:
+                return 0.0
+            return -self._tokens / self.rate
+
+    def drain(self):
+        with self._lock:
+            self._tokens = min(self._tokens, 0)
+            self._updated = time.monotonic()
+
+
+class RateLimitedScheduler:
+    def __init__(self, requests_per_minute, tokens_per_minute, max_concurrency, max_retries=LLM_MAX_RETRIES):
+        self.requests = TokenBucket(requests_per_minute)
+        self.tokens = TokenBucket(tokens_per_minute)
+        self.max_retries = max_retries
+        self._slots = threading.BoundedSemaphore(max_concurrency)
+        self._async_slots = asyncio.Semaphore(max_concurrency)
+        self._executor = ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix='llm')
+        self._counters = {'calls': 0, 'rate_limited': 0, 'waited_seconds': 0.0}
+        self._counters_lock = threading.Lock()
+
+    def _count(self, name, amount=1):
+        with self._counters_lock:
+            self._counters[name] += amount
+
+    def stats(self):
+        with self._counters_lock:
+            snapshot = dict(self._counters)
+        snapshot['waited_seconds'] = round(snapshot['waited_seconds'], 3)
+        return snapshot
+
+    def call(self, fn, estimated_tokens):
+        for attempt in range(self.max_retries + 1):
+            wait = max(self.requests.reserve(1), self.tokens.reserve(estimated_tokens))
+            if wait > 0:
+                self._count('waited_seconds', wait)
+                time.sleep(wait)
+
+            with self._slots:
+                self._count('calls')
+                try:
+                    return fn()
+                except RATE_LIMIT_ERRORS as e:
+                    if attempt == self.max_retries:
+                        raise
+                    self._count('rate_limited')
+                    self.requests.drain()
+                    delay = random.uniform(0, min(60, 2 ** (attempt + 1)))
+                    logging.warning(f"LLM rate limited ({e}); retrying in {delay:.1f}s")
+            time.sleep(delay)
+
+    async def acall(self, fn, estimated_tokens):
+        # Same budget as call(), for coroutines: fn returns an awaitable and
+        # waiting happens on the event loop instead of holding a thread.
+        for attempt in range(self.max_retries + 1):
+            wait = max(self.requests.reserve(1), self.tokens.reserve(estimated_tokens))
+            if wait > 0:
+                self._count('waited_seconds', wait)
+                await asyncio.sleep(wait)
+
+            async with self._async_slots:
+                self._count('calls')
+                try:
+                    return await fn()
+                except RATE_LIMIT_ERRORS as e:
+                    if attempt == self.max_retries:
+                        raise
+                    self._count('rate_limited')
+                    self.requests.drain()
+                    delay = random.uniform(0, min(60, 2 ** (attempt + 1)))
+                    logging.warning(f"LLM rate limited ({e}); retrying in {delay:.1f}s")
+            await asyncio.sleep(delay)
+
+    def iter_completed(self, fn, items):
+        # Runs fn over items concurrently and yields (index, result, error)
+        # as each one finishes.
+        futures = {
+            self._executor.submit(contextvars.copy_context().run, fn, item): index
+            for index, item in enumerate(items)
+        }
+        try:
+            for future in as_completed(futures):
+                try:
+                    yield futures[future], future.result(), None
+                except Exception as e:
+                    yield futures[future], None, e
+        finally:
+            for future in futures:
+                future.cancel()
+
+
+scheduler = RateLimitedScheduler(LLM_REQUESTS_PER_MINUTE, LLM_TOKENS_PER_MINUTE, LLM_MAX_CONCURRENCY)
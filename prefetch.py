@@ -0,0 +1,177 @@
+import itertools
+import logging
+import os
+import queue
+import signal
+import threading
+import time
+
+from llm_scheduler import TokenBucket
+
+PREFETCH_ENABLED = os.getenv('PREFETCH_ENABLED', '').lower() in ('1', 'true', 'yes')
+PREFETCH_WATCHLIST = [ticker.strip().upper() for ticker in os.getenv('PREFETCH_WATCHLIST', '').split(',') if ticker.strip()]
+PREFETCH_INTERVAL = float(os.getenv('PREFETCH_INTERVAL', 300))
+PREFETCH_TOP_TICKERS = int(os.getenv('PREFETCH_TOP_TICKERS', 10))
+PREFETCH_POPULARITY_WINDOW = float(os.getenv('PREFETCH_POPULARITY_WINDOW', 86400))
+PREFETCH_WORKERS = int(os.getenv('PREFETCH_WORKERS', 2))
+PREFETCH_QUEUE_SIZE = int(os.getenv('PREFETCH_QUEUE_SIZE', 50))
+PREFETCH_ANALYSES_PER_MINUTE = float(os.getenv('PREFETCH_ANALYSES_PER_MINUTE', 5))
+PREFETCH_ARTICLES = int(os.getenv('PREFETCH_ARTICLES', 10))
+PREFETCH_LOOKBACK_DAYS = int(os.getenv('PREFETCH_LOOKBACK_DAYS', 7))
+WATCHLIST_WEIGHT = 1000
+
+
+class PrefetchScheduler:
+    # Every interval, ranks the watchlist plus the most-requested tickers by
+    # popularity and queues them. Workers refresh each ticker's news and
+    # bodies, then precompute per-article analyses within their own budget,
+    # so background work never takes more than its share of the LLM quota.
+    def __init__(self, refresh_fn, analyze_fn, popular_fn, is_analyzed_fn=None, watchlist=PREFETCH_WATCHLIST,
+                 interval=PREFETCH_INTERVAL, workers=PREFETCH_WORKERS, queue_size=PREFETCH_QUEUE_SIZE,
+                 analyses_per_minute=PREFETCH_ANALYSES_PER_MINUTE):
+        self.refresh_fn = refresh_fn
+        self.analyze_fn = analyze_fn
+        self.popular_fn = popular_fn
+        self.is_analyzed_fn = is_analyzed_fn
+        self.watchlist = list(watchlist)
+        self.interval = interval
+        self.workers = workers
+        self.analysis_budget = TokenBucket(analyses_per_minute)
+        self._queue = queue.PriorityQueue(maxsize=queue_size)
+        self._pending = set()
+        self._pending_lock = threading.Lock()
+        self._sequence = itertools.count()
+        self._stop = threading.Event()
+        self._threads = []
+        self._counters = {'cycles': 0, 'queued': 0, 'dropped': 0, 'refreshed': 0, 'analyzed': 0, 'errors': 0}
+        self._counters_lock = threading.Lock()
+
+    def _count(self, name, amount=1):
+        with self._counters_lock:
+            self._counters[name] += amount
+
+    def stats(self):
+        with self._counters_lock:
+            snapshot = dict(self._counters)
+        snapshot['running'] = bool(self._threads) and not self._stop.is_set()
+        snapshot['queue_depth'] = self._queue.qsize()
+        return snapshot
+
+    def enqueue(self, ticker, score):
+        with self._pending_lock:
+            if ticker in self._pending:
+                return False
+            try:
+                self._queue.put_nowait((-score, next(self._sequence), ticker))
+            except queue.Full:
+                self._count('dropped')
+                return False
+            self._pending.add(ticker)
+        self._count('queued')
+        return True
+
+    def plan(self):
+        scores = {ticker: WATCHLIST_WEIGHT for ticker in self.watchlist}
+        for ticker, requests in self.popular_fn(PREFETCH_TOP_TICKERS, time.time() - PREFETCH_POPULARITY_WINDOW):
+            scores[ticker] = scores.get(ticker, 0) + requests
+        for ticker, score in sorted(scores.items(), key=lambda item: -item[1]):
+            self.enqueue(ticker, score)
+        self._count('cycles')
+
+    def _plan_loop(self):
+        while not self._stop.is_set():
+            try:
+                self.plan()
+            except Exception as e:
+                self._count('errors')
+                logging.error(f"Prefetch planning failed: {e}")
+            self._stop.wait(self.interval)
+
+    def _wait_for_budget(self):
+        wait = self.analysis_budget.reserve(1)
+        return not self._stop.wait(wait) if wait > 0 else not self._stop.is_set()
+
+    def warm(self, ticker):
+        articles = self.refresh_fn(ticker)
+        self._count('refreshed')
+        for article in articles:
+            if self._stop.is_set():
+                return
+            if not article.get('content') or (self.is_analyzed_fn and self.is_analyzed_fn(ticker, article)):
+                continue
+            if not self._wait_for_budget():
+                return
+            try:
+                self.analyze_fn(ticker, article)
+            except Exception as e:
+                self._count('errors')
+                logging.error(f"Prefetch analysis failed for {ticker} ({article.get('title')}): {e}")
+                continue
+            self._count('analyzed')
+
+    def _work_loop(self):
+        while True:
+            _, _, ticker = self._queue.get()
+            try:
+                if ticker is None:
+                    return
+                if self._stop.is_set():
+                    continue
+                logging.info(f"Prefetching {ticker}")
+                self.warm(ticker)
+            except Exception as e:
+                self._count('errors')
+                logging.error(f"Prefetch failed for {ticker}: {e}")
+            finally:
+                with self._pending_lock:
+                    self._pending.discard(ticker)
+                self._queue.task_done()
+
+    def start(self):
+        if self._threads:
+            return
+        self._stop.clear()
+        self._threads = [threading.Thread(target=self._plan_loop, name='prefetch-plan', daemon=True)]
+        self._threads += [
+            threading.Thread(target=self._work_loop, name=f'prefetch-{index}', daemon=True)
+            for index in range(self.workers)
+        ]
+        for thread in self._threads:
+            thread.start()
+        logging.info(f"Prefetch started: watchlist={self.watchlist} interval={self.interval}s workers={self.workers}")
+
+    def stop(self, timeout=30):
+        # Lets in-flight tickers finish their current step, drops whatever is
+        # still queued and waits up to timeout for the threads to exit.
+        if not self._threads:
+            return
+        self._stop.set()
+        deadline = time.monotonic() + timeout
+        for _ in range(self.workers):
+            # Sentinels sort after any real entry. Workers skip queued tickers
+            # once stopped, so room frees up unless one is stuck mid-ticker.
+            try:
+                self._queue.put((float('inf'), next(self._sequence), None), timeout=max(deadline - time.monotonic(), 0))
+            except queue.Full:
+                logging.warning("Prefetch queue still full at shutdown, not waiting for workers")
+                break
+        for thread in self._threads:
+            thread.join(max(deadline - time.monotonic(), 0))
+        self._threads = []
+        logging.info("Prefetch stopped")
+
+
+def main():
+    from app import prefetcher
+
+    stopped = threading.Event()
+    signal.signal(signal.SIGTERM, lambda *_: stopped.set())
+    signal.signal(signal.SIGINT, lambda *_: stopped.set())
+
+    prefetcher.start()
+    stopped.wait()
+    prefetcher.stop()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,196 @@
+import json
+import logging
+import os
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+import yfinance as yf
+
+PRICE_STORE_DIR = os.getenv('PRICE_STORE_DIR', 'price_store')
+PRICE_HISTORY_PERIOD = os.getenv('PRICE_HISTORY_PERIOD', '5y')
+PRICE_REFRESH_INTERVAL = float(os.getenv('PRICE_REFRESH_INTERVAL', 6 * 3600))
+FIELDS = ['open', 'high', 'low', 'close', 'volume']
+_HISTORY_COLUMNS = {'Open': 'open', 'High': 'high', 'Low': 'low', 'Close': 'close', 'Volume': 'volume'}
+_ACTION_COLUMNS = ['Dividends', 'Stock Splits']
+
+
+def _days(index):
+    index = pd.DatetimeIndex(index)
+    if index.tz is not None:
+        index = index.tz_localize(None)
+    return index.normalize().to_numpy().astype('datetime64[D]').astype('<i8')
+
+
+def _columns(history):
+    return _days(history.index), {field: history[column].to_numpy(dtype='<f8') for column, field in _HISTORY_COLUMNS.items()}
+
+
+def _last_action(history):
+    # Latest date with a dividend or split in a yfinance frame, or None.
+    columns = [column for column in _ACTION_COLUMNS if column in history.columns]
+    if history.empty or not columns:
+        return None
+    days = _days(history.index)[(history[columns].fillna(0) != 0).any(axis=1).to_numpy()]
+    return str(days.max().astype('datetime64[D]')) if len(days) else None
+
+
+class PriceStore:
+    # One directory per ticker holding a raw little-endian column file per
+    # field (float64) plus dates.i8 (int64 days since the epoch). Appends
+    # write the value columns first and dates last, so the length of
+    # dates.i8 is the committed row count and a torn append is ignored and
+    # truncated on the next write. Reads are np.memmap slices, so a range
+    # query touches only the pages it needs and copies nothing.
+    #
+    # Bars are stored split- and dividend-adjusted as of the last fetch, so
+    # a new corporate action invalidates every earlier row; rebuild()
+    # swaps in freshly written files and open maps keep the old ones.
+    def __init__(self, root=PRICE_STORE_DIR):
+        self.root = root
+        self._locks = {}
+        self._locks_lock = threading.Lock()
+
+    def _lock(self, ticker):
+        with self._locks_lock:
+            return self._locks.setdefault(ticker.upper(), threading.Lock())
+
+    def _path(self, ticker, name):
+        return os.path.join(self.root, ticker.upper(), name)
+
+    def _rows(self, ticker):
+        path = self._path(ticker, 'dates.i8')
+        return os.path.getsize(path) // 8 if os.path.exists(path) else 0
+
+    def _memmap(self, ticker, name, dtype, rows, mode='r'):
+        if rows == 0:
+            return np.empty(0, dtype=dtype)
+        return np.memmap(self._path(ticker, name), dtype=dtype, mode=mode, shape=(rows,))
+
+    def _meta(self, ticker):
+        try:
+            with open(self._path(ticker, 'meta.json')) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def dates(self, ticker):
+        return self._memmap(ticker, 'dates.i8', '<i8', self._rows(ticker)).view('datetime64[D]')
+
+    def append(self, ticker, history):
+        # history: a frame indexed by date with Open/High/Low/Close/Volume
+        # (yfinance's layout). Bars on the last stored date overwrite it, as
+        # that bar may have been partial; older bars are ignored.
+        if history.empty:
+            return 0
+        days, values = _columns(history)
+
+        with self._lock(ticker):
+            os.makedirs(os.path.dirname(self._path(ticker, 'dates.i8')), exist_ok=True)
+            rows = self._rows(ticker)
+            last = int(self._memmap(ticker, 'dates.i8', '<i8', rows)[-1]) if rows else None
+
+            if last is not None and (days == last).any():
+                position = int(np.flatnonzero(days == last)[-1])
+                for field in FIELDS:
+                    column = self._memmap(ticker, f'{field}.f8', '<f8', rows, mode='r+')
+                    column[-1] = values[field][position]
+                    column.flush()
+
+            new = days > last if last is not None else np.ones(len(days), dtype=bool)
+            if not new.any():
+                return 0
+            order = np.argsort(days[new], kind='stable')
+            for field in FIELDS:
+                with open(self._path(ticker, f'{field}.f8'), 'ab') as f:
+                    f.truncate(rows * 8)
+                    f.write(values[field][new][order].tobytes())
+            with open(self._path(ticker, 'dates.i8'), 'ab') as f:
+                f.write(days[new][order].tobytes())
+            return int(new.sum())
+
+    def rebuild(self, ticker, history):
+        # Replaces the ticker's rows with history. Each column is written to
+        # a temporary file and renamed over the old one, dates last, while
+        # holding the lock read() takes to open its maps. An empty history
+        # leaves the stored rows alone.
+        if history.empty:
+            return 0
+        days, values = _columns(history)
+        order = np.argsort(days, kind='stable')
+        with self._lock(ticker):
+            os.makedirs(os.path.dirname(self._path(ticker, 'dates.i8')), exist_ok=True)
+            columns = [(f'{field}.f8', values[field][order]) for field in FIELDS] + [('dates.i8', days[order])]
+            for name, column in columns:
+                with open(self._path(ticker, f'{name}.tmp'), 'wb') as f:
+                    f.write(column.tobytes())
+            for name, _ in columns:
+                os.replace(self._path(ticker, f'{name}.tmp'), self._path(ticker, name))
+        return len(days)
+
+    def update(self, ticker, force=False):
+        # Fetches only bars from the last stored date onwards; skips the
+        # network entirely if the ticker was refreshed recently. A dividend
+        # or split newer than the last one seen means the stored bars are
+        # adjusted on a different basis, so the whole range is refetched.
+        ticker = ticker.upper()
+        meta = self._meta(ticker)
+        if not force and time.time() - meta.get('updated_at', 0) < PRICE_REFRESH_INTERVAL:
+            return 0
+
+        dates = self.dates(ticker)
+        stock = yf.Ticker(ticker)
+        last_action = meta.get('last_action')
+        if len(dates):
+            history = stock.history(start=str(dates[-1]), auto_adjust=True)
+            action = _last_action(history)
+            if action is not None and action > (last_action or ''):
+                logging.info(f"Price store: {ticker} has a corporate action on {action}, rebuilding")
+                history = stock.history(start=str(dates[0]), auto_adjust=True)
+                appended = self.rebuild(ticker, history)
+            else:
+                appended = self.append(ticker, history)
+        else:
+            history = stock.history(period=PRICE_HISTORY_PERIOD, auto_adjust=True)
+            appended = self.append(ticker, history)
+        last_action = max(filter(None, [last_action, _last_action(history)]), default=None)
+
+        os.makedirs(os.path.dirname(self._path(ticker, 'meta.json')), exist_ok=True)
+        with open(self._path(ticker, 'meta.json'), 'w') as f:
+            json.dump({'updated_at': time.time(), 'rows': self._rows(ticker), 'last_action': last_action}, f)
+        logging.info(f"Price store: stored {appended} bars for {ticker}")
+        return appended
+
+    def read(self, ticker, start=None, end=None, fields=FIELDS):
+        # Returns {'dates': datetime64[D] view, field: float64 view, ...} for
+        # start <= date <= end, all backed by the memory-mapped files.
+        with self._lock(ticker):
+            rows = self._rows(ticker)
+            maps = {field: self._memmap(ticker, f'{field}.f8', '<f8', rows) for field in fields}
+            dates = self._memmap(ticker, 'dates.i8', '<i8', rows).view('datetime64[D]')
+        first = dates.searchsorted(np.datetime64(start, 'D')) if start is not None else 0
+        last = dates.searchsorted(np.datetime64(end, 'D'), side='right') if end is not None else rows
+        columns = {'dates': dates[first:last]}
+        for field in fields:
+            columns[field] = maps[field][first:last]
+        return columns
+
+    def frame(self, ticker, start=None, end=None):
+        columns = self.read(ticker, start, end)
+        index = pd.DatetimeIndex(columns.pop('dates'), name='Date')
+        return pd.DataFrame({column: columns[field] for column, field in _HISTORY_COLUMNS.items()}, index=index, copy=False)
+
+    def panel(self, tickers, start=None, end=None, field='close'):
+        # dates x tickers frame over the union of the tickers' trading days;
+        # days a ticker did not trade are NaN. Only the requested range of
+        # each ticker is read, so memory scales with the result, not the store.
+        slices = {ticker.upper(): self.read(ticker, start, end, fields=[field]) for ticker in tickers}
+        index = np.unique(np.concatenate([columns['dates'] for columns in slices.values()] or [np.empty(0, 'datetime64[D]')]))
+        values = np.full((len(index), len(slices)), np.nan)
+        for position, columns in enumerate(slices.values()):
+            values[index.searchsorted(columns['dates']), position] = columns[field]
+        return pd.DataFrame(values, index=pd.DatetimeIndex(index, name='Date'), columns=list(slices))
+
+
+price_store = PriceStore()
@@ -1,9 +1,9 @@
 from bs4 import BeautifulSoup
-import requests
+import http_client
 
 def scrape_articles(stock_symbol):
     url = f'https://news.example.com/search?q={stock_symbol}'
-    response = requests.get(url)
+    response = http_client.get(url)
     soup = BeautifulSoup(response.text, 'html.parser')
     
     articles = []
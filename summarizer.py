@@ -0,0 +1,217 @@
+import functools
+import os
+import re
+import threading
+
+import numpy as np
+
+SUMMARY_ARTICLE_TOKENS = int(os.getenv('SUMMARY_ARTICLE_TOKENS', 600))
+# Per article in the final analysis prompt; the default keeps it within the
+# 500 characters per article it used before summarizing.
+SUMMARY_FINAL_ARTICLE_TOKENS = int(os.getenv('SUMMARY_FINAL_ARTICLE_TOKENS', 125))
+SUMMARY_KEYWORD_BOOST = float(os.getenv('SUMMARY_KEYWORD_BOOST', 1.0))
+CHARS_PER_TOKEN = 4
+DAMPING = 0.85
+MIN_SENTENCE_WORDS = 5
+# How much of each article the prompts used before summarizing (its first N
+# characters); savings are reported against this.
+TRUNCATED_ARTICLE_CHARS = 5000
+TRUNCATED_FINAL_CHARS = 500
+
+_SENTENCE_END = re.compile(r'(?<=[.!?])["\')\]]?\s+(?=["\'(\[]?[A-Z0-9$])')
+_WORD = re.compile(r"[a-z0-9][a-z0-9'&.-]*[a-z0-9]|[a-z0-9]")
+_BOILERPLATE = re.compile(
+    r'\bsubscribe (?:now|to|today|for)\b|\bsign (?:up|in) (?:for|to|now)\b|\blog in to\b|\bour newsletters?\b|'
+    r'\bwe use cookies\b|\bcookie (?:policy|settings|preferences)\b|\bprivacy policy\b|\bterms of (?:use|service)\b|'
+    r'\ball rights reserved\b|\bclick here\b|\bread more\b|\brelated:|^advertisement\b|\bsponsored content\b|'
+    r'\bfollow us\b|\bshare this\b|\bdownload the app\b|©|\bmotley fool has\b|\bhas no position\b|'
+    r'\bdisclosure policy\b|\bthis story was originally\b|\bimage source\b|\bphoto:|\bgetty images\b',
+    re.IGNORECASE,
+)
+_STOPWORDS = frozenset("""
+a about above after again against all also am an and any are as at be because been before being below between
+both but by can could did do does doing down during each few for from further had has have having he her here
+hers him his how i if in into is it its itself just me more most my no nor not now of off on once only or other
+our ours out over own said same says she should so some such than that the their theirs them then there these
+they this those through to too under until up very was we were what when where which while who whom why will
+with would you your yours
+inc corp corporation co company ltd plc holdings group class common stock shares
+""".split())
+
+_stats = {
+    'summaries': 0, 'input_tokens': 0, 'truncated_tokens': 0, 'output_tokens': 0,
+    'boilerplate_sentences': 0, 'duplicate_sentences': 0,
+}
+_stats_lock = threading.Lock()
+
+
+def estimate_tokens(text):
+    return len(text) // CHARS_PER_TOKEN
+
+
+def stats():
+    with _stats_lock:
+        snapshot = dict(_stats)
+    # Savings compared with what the prompts sent before summarizing (a
+    # truncated prefix of each article), not with the full articles.
+    snapshot['saved_tokens'] = snapshot['truncated_tokens'] - snapshot['output_tokens']
+    snapshot['savings_ratio'] = round(snapshot['saved_tokens'] / snapshot['truncated_tokens'], 3) if snapshot['truncated_tokens'] else 0.0
+    return snapshot
+
+
+def _record(text, summary, truncated_chars, boilerplate=0, duplicates=0):
+    with _stats_lock:
+        _stats['summaries'] += 1
+        _stats['input_tokens'] += estimate_tokens(text)
+        _stats['truncated_tokens'] += estimate_tokens(text[:truncated_chars])
+        _stats['output_tokens'] += estimate_tokens(summary)
+        _stats['boilerplate_sentences'] += boilerplate
+        _stats['duplicate_sentences'] += duplicates
+
+
+def split_sentences(text):
+    sentences = []
+    for block in re.split(r'\n\s*\n|\n(?=\S)', text):
+        block = ' '.join(block.split())
+        if block:
+            sentences.extend(part.strip() for part in _SENTENCE_END.split(block) if part.strip())
+    return sentences
+
+
+def words(text):
+    return [word for word in _WORD.findall(text.lower()) if word not in _STOPWORDS]
+
+
+def keyword_set(keywords):
+    found = set()
+    for keyword in keywords:
+        if keyword:
+            found.update(words(keyword))
+    return frozenset(found)
+
+
+def fingerprint(sentence):
+    return ' '.join(_WORD.findall(sentence.lower()))
+
+
+def is_boilerplate(sentence):
+    return len(sentence.split()) < MIN_SENTENCE_WORDS or bool(_BOILERPLATE.search(sentence))
+
+
+def rank_sentences(sentences, keywords=frozenset()):
+    # TextRank over TF-IDF sentence vectors: cosine similarities form the
+    # graph, a few power iterations give each sentence its centrality, which
+    # is then boosted for sentences mentioning the ticker or company and,
+    # slightly, for the lead sentences that usually carry the news.
+    tokens = [words(sentence) for sentence in sentences]
+    vocabulary = {}
+    for sentence_words in tokens:
+        for word in sentence_words:
+            vocabulary.setdefault(word, len(vocabulary))
+    if not vocabulary:
+        return np.zeros(len(sentences))
+
+    counts = np.zeros((len(sentences), len(vocabulary)))
+    for row, sentence_words in enumerate(tokens):
+        for word in sentence_words:
+            counts[row, vocabulary[word]] += 1
+    idf = np.log((1 + len(sentences)) / (1 + (counts > 0).sum(axis=0))) + 1
+    vectors = counts * idf
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    vectors = np.divide(vectors, norms, out=np.zeros_like(vectors), where=norms > 0)
+
+    similarity = vectors @ vectors.T
+    np.fill_diagonal(similarity, 0)
+    weights = similarity.sum(axis=1, keepdims=True)
+    transition = np.divide(similarity, weights, out=np.full_like(similarity, 1 / len(sentences)), where=weights > 0)
+    scores = np.full(len(sentences), 1 / len(sentences))
+    for _ in range(30):
+        updated = (1 - DAMPING) / len(sentences) + DAMPING * (transition.T @ scores)
+        if np.abs(updated - scores).sum() < 1e-6:
+            scores = updated
+            break
+        scores = updated
+
+    if keywords:
+        mentions = np.array([sum(word in keywords for word in sentence_words) for sentence_words in tokens])
+        scores = scores * (1 + SUMMARY_KEYWORD_BOOST * np.minimum(mentions, 3))
+    scores = scores * (1 + 0.5 / (1 + np.arange(len(sentences))))
+    return scores
+
+
+def _cut(text, budget):
+    if len(text) <= budget:
+        return text
+    cut = text[:budget]
+    return cut.rsplit(' ', 1)[0] if ' ' in cut else cut
+
+
+def _select(sentences, keywords, max_tokens, seen):
+    # Drops boilerplate and sentences already in seen, then keeps the best
+    # ranked sentences that fit the budget, in their original order. If none
+    # fits, the best sentence is cut to the budget; text that is all
+    # boilerplate (a few words, a placeholder) is passed through cut the
+    # same way, unless some of it was already used for an earlier text.
+    kept = []
+    boilerplate = duplicates = 0
+    for sentence in sentences:
+        if is_boilerplate(sentence):
+            boilerplate += 1
+            continue
+        key = fingerprint(sentence)
+        if key in seen:
+            duplicates += 1
+            continue
+        seen.add(key)
+        kept.append(sentence)
+
+    budget = max_tokens * CHARS_PER_TOKEN
+    chosen = []
+    used = 0
+    ranked = np.argsort(-rank_sentences(kept, keywords), kind='stable')
+    for index in ranked:
+        length = len(kept[index]) + 1
+        if used + length > budget:
+            continue
+        chosen.append(index)
+        used += length
+    if chosen:
+        summary = ' '.join(kept[index] for index in sorted(chosen))
+    elif kept:
+        summary = _cut(kept[ranked[0]], budget)
+    elif not duplicates:
+        summary = _cut(' '.join(sentences), budget)
+    else:
+        summary = ''
+    return summary, boilerplate, duplicates
+
+
+@functools.lru_cache(maxsize=1024)
+def _summarize(text, max_tokens, keywords):
+    summary, boilerplate, duplicates = _select(split_sentences(text), keywords, max_tokens, set())
+    _record(text, summary, TRUNCATED_ARTICLE_CHARS, boilerplate, duplicates)
+    return summary
+
+
+def summarize(text, max_tokens=SUMMARY_ARTICLE_TOKENS, keywords=()):
+    # Extractive summary of one article that fits max_tokens (estimated as
+    # characters / 4). Deterministic, so prompts built from it keep hitting
+    # the analysis cache.
+    if not text:
+        return ''
+    return _summarize(text, max_tokens, keyword_set(keywords))
+
+
+def summarize_many(texts, tokens_per_text=SUMMARY_FINAL_ARTICLE_TOKENS, keywords=()):
+    # Summarizes each text within tokens_per_text and drops sentences
+    # already used for an earlier text, so syndicated copies of a story cost
+    # nothing extra. A text left with nothing but such sentences gives None,
+    # an empty one ''.
+    keywords = keyword_set(keywords)
+    seen = set()
+    summaries = []
+    for text in texts:
+        summary, boilerplate, duplicates = _select(split_sentences(text or ''), keywords, tokens_per_text, seen)
+        _record(text or '', summary, TRUNCATED_FINAL_CHARS, boilerplate, duplicates)
+        summaries.append(None if not summary and duplicates else summary)
+    return summaries
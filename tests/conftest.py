@@ -0,0 +1,20 @@
+import os
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+FIXTURES = os.path.join(ROOT, 'benchmarks', 'fixtures')
+sys.path.insert(0, ROOT)
+
+# Several modules open their SQLite files and directories at import time;
+# keep them out of the working tree.
+_workdir = tempfile.mkdtemp(prefix='stocknews-tests-')
+for name, filename in (
+    ('ARTICLE_STORE_PATH', 'articles.db'),
+    ('CACHE_DB_PATH', 'cache.db'),
+    ('ANALYSIS_CACHE_PATH', 'analysis_cache.db'),
+    ('PRICE_STORE_DIR', 'price_store'),
+    ('TICKER_CACHE_PATH', 'tickers_cache.csv'),
+):
+    os.environ.setdefault(name, os.path.join(_workdir, filename))
+os.environ.setdefault('TICKER_LIST_URL', '')
@@ -0,0 +1,29 @@
+import analysis_cache
+import summarizer
+
+ARTICLES = [
+    {'title': 'Apple beats estimates', 'link': 'https://a.com/1', 'content': 'Apple reported record revenue.'},
+    {'title': 'Microsoft raises outlook', 'link': 'https://b.com/1', 'content': 'Microsoft lifted guidance.'},
+]
+
+
+def test_final_key_ignores_article_order():
+    assert (analysis_cache.final_analysis_key(ARTICLES, 'model', 'AAPL')
+            == analysis_cache.final_analysis_key(ARTICLES[::-1], 'model', 'AAPL'))
+
+
+def test_final_key_depends_on_ticker():
+    assert (analysis_cache.final_analysis_key(ARTICLES, 'model', 'AAPL')
+            != analysis_cache.final_analysis_key(ARTICLES, 'model', 'MSFT'))
+    assert (analysis_cache.final_analysis_key(ARTICLES, 'model', 'aapl')
+            == analysis_cache.final_analysis_key(ARTICLES, 'model', 'AAPL'))
+
+
+def test_final_key_depends_on_summary_budget(monkeypatch):
+    before = analysis_cache.final_analysis_key(ARTICLES, 'model', 'AAPL')
+    monkeypatch.setattr(summarizer, 'SUMMARY_FINAL_ARTICLE_TOKENS', summarizer.SUMMARY_FINAL_ARTICLE_TOKENS * 2)
+    assert analysis_cache.final_analysis_key(ARTICLES, 'model', 'AAPL') != before
+
+
+def test_prompt_key_depends_on_model():
+    assert analysis_cache.prompt_key('prompt', 'a') != analysis_cache.prompt_key('prompt', 'b')
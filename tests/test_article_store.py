@@ -0,0 +1,66 @@
+from datetime import datetime
+
+import pytest
+
+from article_store import ArticleStore, title_fingerprint
+
+
+@pytest.mark.parametrize('first, second', [
+    ('Apple beats estimates - Reuters', 'apple beats estimates'),
+    ('Apple Beats Estimates (Bloomberg)', 'Apple beats estimates.'),
+    ('Apple beats the estimates', 'Apple beats estimates'),
+])
+def test_syndicated_titles_share_a_fingerprint(first, second):
+    assert title_fingerprint(first) == title_fingerprint(second)
+
+
+@pytest.mark.parametrize('first, second', [
+    ('Apple beats estimates - shares jump 5%', 'Apple beats estimates - shares fall 3%'),
+    ('Apple beats estimates (Q3)', 'Apple beats estimates (Q4)'),
+    ('Nvidia stock rises as AMD falls', 'AMD stock rises as Nvidia falls'),
+])
+def test_different_stories_keep_distinct_fingerprints(first, second):
+    assert title_fingerprint(first) != title_fingerprint(second)
+
+
+def article(link, title, published_at):
+    return {'link': link, 'title': title, 'published_at': published_at}
+
+
+def test_recurring_headline_is_stored_again_on_a_later_day():
+    store = ArticleStore(':memory:')
+    inserted = store.add_articles('TSLA', [
+        article('https://a.com/1', 'Why Tesla Stock Is Down Today', '2024-01-01 10:00:00'),
+        article('https://b.com/1', 'Why Tesla stock is down today', '2024-01-01 18:00:00'),
+        article('https://a.com/2', 'Why Tesla Stock Is Down Today', '2024-01-09 10:00:00'),
+    ], 'finviz')
+    assert inserted == 3
+    urls = [row['url'] for row in store.query('TSLA', datetime(2024, 1, 1))]
+    assert sorted(urls) == ['https://a.com/1', 'https://a.com/2']
+
+
+def test_title_duplicate_is_kept_when_its_text_differs():
+    store = ArticleStore(':memory:')
+    store.add_articles('AAPL', [
+        article('https://a.com/1', 'Apple beats estimates', '2024-01-01 10:00:00'),
+        article('https://b.com/1', 'Apple beats estimates - Reuters', '2024-01-01 11:00:00'),
+    ], 'finviz')
+    assert [row['url'] for row in store.query('AAPL', datetime(2024, 1, 1))] == ['https://a.com/1']
+    store.save_content('AAPL', 'https://a.com/1', ' '.join(['Apple reported record iPhone revenue this quarter'] * 5))
+    store.save_content('AAPL', 'https://b.com/1', ' '.join(['Services growth offset weaker Mac sales for Apple'] * 5))
+    urls = [row['url'] for row in store.query('AAPL', datetime(2024, 1, 1))]
+    assert sorted(urls) == ['https://a.com/1', 'https://b.com/1']
+
+
+def test_shared_consent_page_does_not_hide_same_host_articles():
+    store = ArticleStore(':memory:')
+    store.add_articles('AAPL', [
+        article('https://a.com/1', 'First story', '2024-01-01 10:00:00'),
+        article('https://a.com/2', 'Second story', '2024-01-01 11:00:00'),
+        article('https://b.com/1', 'Reprint of first story', '2024-01-01 12:00:00'),
+    ], 'finviz')
+    body = ' '.join(['Please accept cookies to continue reading this page'] * 5)
+    for url in ('https://a.com/1', 'https://a.com/2', 'https://b.com/1'):
+        store.save_content('AAPL', url, body)
+    urls = [row['url'] for row in store.query('AAPL', datetime(2024, 1, 1))]
+    assert sorted(urls) == ['https://a.com/1', 'https://a.com/2']
@@ -0,0 +1,83 @@
+import time
+
+import cache
+import http_client
+from cache import TieredCache
+
+
+def test_memory_tier_evicts_least_recently_used():
+    store = TieredCache('lru', memory_budget_mb=25 / (1024 * 1024), disk_path=None)
+    store.set('a', 'x' * 10, 60)
+    store.set('b', 'x' * 10, 60)
+    store.get('a')
+    store.set('c', 'x' * 10, 60)
+    assert store.get('b') is None
+    assert store.get('a').value == 'x' * 10
+    assert store.stats()['memory_evictions'] == 1
+
+
+def test_expired_entries_are_returned_as_stale():
+    store = TieredCache('ttl', disk_path=None)
+    store.set('key', 'value', -1)
+    entry = store.get('key')
+    assert entry.value == 'value'
+    assert not entry.fresh
+    stats = store.stats()
+    assert stats['stale'] == 1
+    assert stats['memory_hits'] == 0
+
+
+def test_disk_tier_survives_a_new_instance(tmp_path):
+    path = str(tmp_path / 'cache.db')
+    TieredCache('disk', disk_path=path).set('key', {'nested': [1, 2]}, 60, etag='"v1"')
+    entry = TieredCache('disk', disk_path=path).get('key')
+    assert entry.value == {'nested': [1, 2]}
+    assert entry.etag == '"v1"'
+
+
+class FakeResponse:
+    def __init__(self, status_code, text='', headers=None):
+        self.status_code = status_code
+        self.text = text
+        self.headers = headers or {}
+
+
+def test_get_text_revalidates_stale_entries(monkeypatch):
+    store = TieredCache('revalidate', disk_path=None)
+    store.set('https://example.com/a', 'cached body', -1, etag='"abc"')
+    sent = {}
+
+    def fake_get(url, timeout=10, deadline=None, headers=None):
+        sent.update(headers or {})
+        return FakeResponse(304)
+
+    monkeypatch.setattr(http_client, 'get', fake_get)
+    assert http_client.get_text('https://example.com/a', 60, cache=store) == 'cached body'
+    assert sent == {'If-None-Match': '"abc"'}
+    assert store.get('https://example.com/a').fresh
+    assert store.stats()['revalidated'] == 1
+
+
+def test_get_text_serves_fresh_entries_without_fetching(monkeypatch):
+    store = TieredCache('fresh', disk_path=None)
+    store.set('https://example.com/b', 'body', 60)
+    monkeypatch.setattr(http_client, 'get', lambda *args, **kwargs: (_ for _ in ()).throw(AssertionError('fetched')))
+    assert http_client.get_text('https://example.com/b', 60, cache=store) == 'body'
+
+
+def test_get_text_falls_back_to_stale_copy_on_error(monkeypatch):
+    store = TieredCache('stale', disk_path=None)
+    store.set('https://example.com/c', 'old body', -1)
+
+    def failing_get(*args, **kwargs):
+        raise http_client.requests.ConnectionError('down')
+
+    monkeypatch.setattr(http_client, 'get', failing_get)
+    assert http_client.get_text('https://example.com/c', 60, cache=store) == 'old body'
+
+
+def test_entry_freshness_follows_clock(monkeypatch):
+    entry = cache.CacheEntry('value', time.time() + 10)
+    assert entry.fresh
+    monkeypatch.setattr(cache.time, 'time', lambda: entry.expires_at + 1)
+    assert not entry.fresh
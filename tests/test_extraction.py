@@ -0,0 +1,81 @@
+import os
+import re
+from datetime import datetime
+
+import pytest
+
+from conftest import FIXTURES
+from extraction import MAX_CONTENT_CHARS, extract_article_text, parse_finviz_news_table
+
+
+def read_fixture(name):
+    with open(os.path.join(FIXTURES, name), encoding='utf-8') as f:
+        return f.read()
+
+
+def test_higher_priority_selector_wins_over_earlier_match():
+    html = ('<html><body><div class="content">Related stories teaser</div>'
+            '<div itemprop="articleBody">The real story body.</div></body></html>')
+    assert extract_article_text(html) == 'The real story body.'
+
+
+def test_article_tag_beats_everything():
+    html = ('<html><body><div class="article-body">Secondary body</div>'
+            '<article>Primary body <script>var x = 1;</script>text.</article></body></html>')
+    assert extract_article_text(html) == 'Primary body text.'
+
+
+def test_no_match_returns_none():
+    assert extract_article_text('<html><body><p>Nothing to see</p></body></html>') is None
+
+
+@pytest.mark.parametrize('name', ['article_tag.html', 'article_itemprop.html', 'article_entry_content.html'])
+def test_fixtures_extract_within_limit(name):
+    text = extract_article_text(read_fixture(name))
+    assert text
+    assert len(text) <= MAX_CONTENT_CHARS
+
+
+def test_itemprop_fixture_skips_promo_in_outer_content_div():
+    html = read_fixture('article_itemprop.html')
+    promo_start = html.index('class="promo"><p>') + len('class="promo"><p>')
+    promo = html[promo_start:html.index('.', promo_start)]
+    assert promo not in extract_article_text(html)
+
+
+def test_finviz_rows_inherit_date_from_row_above():
+    html = read_fixture('finviz_quote.html')
+    rows = parse_finviz_news_table(html, now=datetime(2024, 11, 1))
+    assert len(rows) == 100
+    assert rows[0]['published_at'] == datetime(2024, 10, 17, 16, 30)
+    # The second row only shows a time.
+    assert rows[1]['published_at'] == datetime(2024, 10, 17, 15, 53)
+
+    table = html[html.index('news-table'):]
+    date_cells = re.findall(r'<td[^>]*>\s*([^<]*?)\s*</td>', table)[:len(rows)]
+    for previous, row, cell in zip(rows, rows[1:], date_cells[1:]):
+        if ' ' not in cell:
+            assert row['published_at'].date() == previous['published_at'].date()
+    assert {row['published_at'].date() for row in rows} == {
+        datetime(2024, 10, day).date() for day in (15, 16, 17)
+    }
+
+
+def test_finviz_today_and_date_changes():
+    html = """<table id="news-table">
+        <tr><td>Today 09:15AM</td><td><a href="/a">First</a><span>(Reuters)</span></td></tr>
+        <tr><td>08:00AM</td><td><a href="/b">Second</a></td></tr>
+        <tr><td>Mar-04-24 11:00PM</td><td><a href="/c">Third</a></td></tr>
+        <tr><td>10:30PM</td><td><a href="/d">Fourth</a></td></tr>
+    </table>"""
+    rows = parse_finviz_news_table(html, now=datetime(2024, 3, 5, 12))
+    assert [row['published_at'] for row in rows] == [
+        datetime(2024, 3, 5, 9, 15), datetime(2024, 3, 5, 8, 0),
+        datetime(2024, 3, 4, 23, 0), datetime(2024, 3, 4, 22, 30),
+    ]
+    assert rows[0]['source'] == 'Reuters'
+    assert rows[1]['link'] == '/b'
+
+
+def test_finviz_missing_table():
+    assert parse_finviz_news_table('<html><body><table><tr><td>x</td></tr></table></body></html>') is None
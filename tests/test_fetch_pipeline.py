@@ -0,0 +1,84 @@
+import threading
+import time
+
+import pytest
+
+import fetch_pipeline
+
+
+class FakeFetch:
+    # Records how many fetches run at once per host; each takes delay seconds.
+    def __init__(self, delay=0.05):
+        self.delay = delay
+        self.lock = threading.Lock()
+        self.active = {}
+        self.peak = {}
+        self.calls = []
+
+    def __call__(self, url, timeout, deadline):
+        host = url.split('/')[2]
+        with self.lock:
+            self.calls.append(url)
+            self.active[host] = self.active.get(host, 0) + 1
+            self.peak[host] = max(self.peak.get(host, 0), self.active[host])
+        time.sleep(self.delay)
+        with self.lock:
+            self.active[host] -= 1
+        return f"body of {url}"
+
+
+@pytest.fixture
+def per_host(monkeypatch):
+    monkeypatch.setattr(fetch_pipeline, 'MAX_PER_HOST', 2)
+
+
+def wait_for_idle(timeout=2):
+    # Queued tasks hand their slot on after the caller has its results.
+    deadline = time.monotonic() + timeout
+    while fetch_pipeline._hosts and time.monotonic() < deadline:
+        time.sleep(0.01)
+
+
+def test_per_host_cap_is_respected(per_host):
+    fetch = FakeFetch()
+    urls = [f"https://a.com/{index}" for index in range(8)] + ["https://b.com/0"]
+    results = dict(fetch_pipeline.iter_bodies(urls, fetch, deadline=5))
+    assert fetch.peak == {'a.com': 2, 'b.com': 1}
+    assert len(results) == len(urls)
+    wait_for_idle()
+    assert fetch_pipeline._hosts == {}
+
+
+def test_results_come_back_per_index(per_host):
+    fetch = FakeFetch(delay=0.01)
+    urls = [f"https://a.com/{index}" for index in range(5)] + [f"https://b.com/{index}" for index in range(3)]
+    results = dict(fetch_pipeline.iter_bodies(urls, fetch, deadline=5))
+    assert results == {index: f"body of {url}" for index, url in enumerate(urls)}
+
+
+def test_other_hosts_do_not_wait_behind_a_busy_host(per_host):
+    fetch = FakeFetch(delay=0.05)
+    urls = [f"https://a.com/{index}" for index in range(10)] + ["https://b.com/0"]
+    order = [index for index, _ in fetch_pipeline.iter_bodies(urls, fetch, deadline=5)]
+    assert order.index(10) < 3
+
+
+def test_queued_tasks_are_skipped_after_the_deadline(per_host):
+    fetch = FakeFetch(delay=0.2)
+    urls = [f"https://a.com/{index}" for index in range(6)]
+    results = dict(fetch_pipeline.iter_bodies(urls, fetch, deadline=0.1))
+    assert results == {index: None for index in range(6)}
+    wait_for_idle()
+    # Only the first two ever reached a worker; the queued ones were cancelled.
+    assert len(fetch.calls) == 2
+    assert fetch_pipeline._hosts == {}
+
+
+def test_failed_fetch_yields_none(per_host):
+    def fetch(url, timeout, deadline):
+        if url.endswith('/bad'):
+            raise ValueError('boom')
+        return 'ok'
+
+    results = dict(fetch_pipeline.iter_bodies(["https://a.com/good", "https://a.com/bad"], fetch, deadline=5))
+    assert results == {0: 'ok', 1: None}
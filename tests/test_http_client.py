@@ -0,0 +1,164 @@
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+import requests
+
+import http_client
+
+
+class FakeResponse:
+    def __init__(self, status_code, headers=None):
+        self.status_code = status_code
+        self.headers = headers or {}
+        self.text = ''
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise requests.HTTPError(f"{self.status_code}", response=self)
+
+
+class FakeSession:
+    def __init__(self, *outcomes):
+        self.outcomes = list(outcomes)
+        self.calls = 0
+
+    def get(self, url, headers=None, timeout=None):
+        self.calls += 1
+        outcome = self.outcomes.pop(0)
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+        self.sleeps = []
+
+    def monotonic(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(http_client.time, 'monotonic', clock.monotonic)
+    monkeypatch.setattr(http_client.time, 'sleep', clock.sleep)
+    monkeypatch.setattr(http_client, '_backoff', lambda attempt: 0.5 * (2 ** attempt))
+    monkeypatch.setattr(http_client, '_breaker', http_client._CircuitBreaker(threshold=5, cooldown=60))
+    return clock
+
+
+def test_retries_then_succeeds(clock, monkeypatch):
+    session = FakeSession(FakeResponse(503), requests.ConnectionError('reset'), FakeResponse(200))
+    monkeypatch.setattr(http_client, 'session', session)
+    assert http_client.get('https://example.com/a', retries=3).status_code == 200
+    assert session.calls == 3
+    assert clock.sleeps == [0.5, 1.0]
+
+
+def test_client_errors_are_not_retried(clock, monkeypatch):
+    session = FakeSession(FakeResponse(404))
+    monkeypatch.setattr(http_client, 'session', session)
+    with pytest.raises(requests.HTTPError):
+        http_client.get('https://example.com/a')
+    assert session.calls == 1
+
+
+def test_backoff_never_sleeps_past_the_deadline(clock, monkeypatch):
+    session = FakeSession(FakeResponse(503), FakeResponse(503), FakeResponse(503))
+    monkeypatch.setattr(http_client, 'session', session)
+    with pytest.raises(requests.HTTPError):
+        http_client.get('https://example.com/a', deadline=clock.now + 1.2, retries=3)
+    # 0.5s fits in the budget, the next 1.0s backoff would not.
+    assert clock.sleeps == [0.5]
+    assert session.calls == 2
+
+
+def test_short_retry_after_sets_the_minimum_delay(clock, monkeypatch):
+    session = FakeSession(FakeResponse(429, {'Retry-After': '3'}), FakeResponse(200))
+    monkeypatch.setattr(http_client, 'session', session)
+    http_client.get('https://example.com/a')
+    assert clock.sleeps == [3.0]
+
+
+def test_long_retry_after_gives_up_and_opens_the_circuit(clock, monkeypatch):
+    session = FakeSession(FakeResponse(429, {'Retry-After': '120'}))
+    monkeypatch.setattr(http_client, 'session', session)
+    with pytest.raises(requests.HTTPError):
+        http_client.get('https://example.com/a')
+    assert clock.sleeps == []
+    with pytest.raises(http_client.CircuitOpenError):
+        http_client.get('https://example.com/b')
+    clock.now += 121
+    monkeypatch.setattr(http_client, 'session', FakeSession(FakeResponse(200)))
+    assert http_client.get('https://example.com/b').status_code == 200
+
+
+def test_breaker_opens_after_threshold_and_half_opens_after_cooldown(clock):
+    breaker = http_client._CircuitBreaker(threshold=2, cooldown=60)
+    breaker.record_failure('a.com')
+    assert breaker.allow('a.com')
+    breaker.record_failure('a.com')
+    assert not breaker.allow('a.com')
+    assert breaker.open_hosts() == ['a.com']
+
+    clock.now += 61
+    # One trial request goes through; others wait for its outcome.
+    assert breaker.allow('a.com')
+    assert not breaker.allow('a.com')
+    breaker.record_success('a.com')
+    assert breaker.allow('a.com')
+    assert breaker.open_hosts() == []
+
+
+def test_failed_trial_reopens_the_breaker(clock):
+    breaker = http_client._CircuitBreaker(threshold=1, cooldown=60)
+    breaker.record_failure('a.com')
+    clock.now += 61
+    assert breaker.allow('a.com')
+    breaker.record_failure('a.com')
+    assert not breaker.allow('a.com')
+
+
+class SlowHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        time.sleep(1)
+        self.send_response(200)
+        self.send_header('Content-Length', '2')
+        self.end_headers()
+        self.wfile.write(b'ok')
+
+
+def test_waiting_for_a_pooled_connection_is_bounded(monkeypatch):
+    server = ThreadingHTTPServer(('127.0.0.1', 0), SlowHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    session = requests.Session()
+    session.mount('http://', http_client._PooledAdapter(pool_connections=1, pool_maxsize=1, pool_block=True, max_retries=0))
+    monkeypatch.setattr(http_client, 'session', session)
+    monkeypatch.setattr(http_client, '_breaker', http_client._CircuitBreaker(threshold=1, cooldown=60))
+    url = f"http://127.0.0.1:{server.server_address[1]}/"
+    try:
+        busy = threading.Thread(target=http_client.get, args=(url,))
+        busy.start()
+        time.sleep(0.2)
+        started = time.monotonic()
+        with pytest.raises(http_client.PoolTimeoutError):
+            http_client.get(url, timeout=0.3)
+        assert time.monotonic() - started < 0.8
+        # Local pool contention says nothing about the host's health.
+        assert http_client._breaker.open_hosts() == []
+        busy.join()
+    finally:
+        server.shutdown()
@@ -0,0 +1,52 @@
+import pytest
+
+import llm_scheduler
+from llm_scheduler import TokenBucket
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(llm_scheduler.time, 'monotonic', clock.monotonic)
+    return clock
+
+
+def test_reservations_within_capacity_do_not_wait(clock):
+    bucket = TokenBucket(60)
+    assert bucket.reserve(30) == 0.0
+    assert bucket.reserve(30) == 0.0
+
+
+def test_overdrawn_bucket_waits_for_refill(clock):
+    bucket = TokenBucket(60)
+    bucket.reserve(60)
+    # One token per second; the next caller queues behind the deficit.
+    assert bucket.reserve(1) == pytest.approx(1.0)
+    assert bucket.reserve(2) == pytest.approx(3.0)
+
+
+def test_refill_is_capped_at_capacity(clock):
+    bucket = TokenBucket(60, capacity=10)
+    bucket.reserve(10)
+    clock.now += 3600
+    assert bucket.reserve(10) == 0.0
+    assert bucket.reserve(1) == pytest.approx(1.0)
+
+
+def test_requests_larger_than_capacity_are_clamped(clock):
+    bucket = TokenBucket(60, capacity=10)
+    assert bucket.reserve(1000) == 0.0
+
+
+def test_drain_empties_the_bucket(clock):
+    bucket = TokenBucket(60)
+    bucket.drain()
+    assert bucket.reserve(6) == pytest.approx(6.0)
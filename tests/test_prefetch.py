@@ -0,0 +1,41 @@
+import threading
+import time
+
+from prefetch import PrefetchScheduler
+
+
+def scheduler(refresh_fn, analyze_fn, **kwargs):
+    return PrefetchScheduler(refresh_fn, analyze_fn, popular_fn=lambda *_: [], watchlist=[],
+                             analyses_per_minute=6000, **kwargs)
+
+
+def test_failed_analyses_count_as_errors():
+    articles = [{'title': 'ok', 'content': 'body'}, {'title': 'bad', 'content': 'body'}, {'title': 'empty'}]
+
+    def analyze(ticker, article):
+        if article['title'] == 'bad':
+            raise RuntimeError('quota exhausted')
+
+    prefetcher = scheduler(lambda ticker: articles, analyze)
+    prefetcher.warm('AAPL')
+    stats = prefetcher.stats()
+    assert stats['analyzed'] == 1
+    assert stats['errors'] == 1
+
+
+def test_stop_is_bounded_when_a_worker_is_stuck_and_the_queue_is_full():
+    release = threading.Event()
+    prefetcher = scheduler(lambda ticker: release.wait(10) and [], lambda *_: None,
+                           workers=1, queue_size=1, interval=3600)
+    prefetcher.start()
+    prefetcher.enqueue('AAPL', 1)
+    deadline = time.monotonic() + 5
+    while prefetcher.stats()['queue_depth'] and time.monotonic() < deadline:
+        time.sleep(0.01)
+    # The worker is stuck on AAPL; MSFT fills the only queue slot.
+    assert prefetcher.enqueue('MSFT', 1)
+
+    started = time.monotonic()
+    prefetcher.stop(timeout=0.2)
+    assert time.monotonic() - started < 2
+    release.set()
@@ -0,0 +1,103 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from price_store import PriceStore
+
+
+def history(dates, close):
+    close = np.asarray(close, dtype=float)
+    return pd.DataFrame({
+        'Open': close - 1, 'High': close + 1, 'Low': close - 2, 'Close': close, 'Volume': close * 100,
+    }, index=pd.DatetimeIndex(dates))
+
+
+@pytest.fixture
+def store(tmp_path):
+    return PriceStore(str(tmp_path))
+
+
+def test_append_and_read_range(store):
+    assert store.append('aapl', history(['2024-01-02', '2024-01-03', '2024-01-04'], [10, 11, 12])) == 3
+    columns = store.read('AAPL', '2024-01-03', '2024-01-04')
+    assert list(columns['dates'].astype(str)) == ['2024-01-03', '2024-01-04']
+    assert list(columns['close']) == [11, 12]
+
+
+def test_last_bar_is_overwritten_and_older_bars_ignored(store):
+    store.append('AAPL', history(['2024-01-02', '2024-01-03'], [10, 11]))
+    appended = store.append('AAPL', history(['2024-01-02', '2024-01-03', '2024-01-04'], [99, 11.5, 12]))
+    assert appended == 1
+    frame = store.frame('AAPL')
+    assert list(frame['Close']) == [10, 11.5, 12]
+    assert frame['Volume'].iloc[1] == 1150
+
+
+def test_unsorted_bars_are_stored_in_date_order(store):
+    store.append('AAPL', history(['2024-01-04', '2024-01-02', '2024-01-03'], [12, 10, 11]))
+    assert list(store.read('AAPL')['close']) == [10, 11, 12]
+
+
+def test_tz_aware_index_is_normalized(store):
+    index = pd.DatetimeIndex(['2024-01-02 00:00', '2024-01-03 00:00']).tz_localize('America/New_York')
+    frame = history(index, [10, 11])
+    store.append('AAPL', frame)
+    assert list(store.dates('AAPL').astype(str)) == ['2024-01-02', '2024-01-03']
+
+
+def test_panel_aligns_tickers_on_union_of_dates(store):
+    store.append('AAPL', history(['2024-01-02', '2024-01-03'], [10, 11]))
+    store.append('MSFT', history(['2024-01-03', '2024-01-04'], [20, 21]))
+    panel = store.panel(['AAPL', 'MSFT'])
+    assert list(panel.columns) == ['AAPL', 'MSFT']
+    assert np.isnan(panel.loc['2024-01-04', 'AAPL'])
+    assert np.isnan(panel.loc['2024-01-02', 'MSFT'])
+    assert panel.loc['2024-01-03'].tolist() == [11, 20]
+
+
+def test_empty_ticker_reads_empty(store):
+    assert len(store.read('NONE')['close']) == 0
+
+
+class FakeTicker:
+    # Serves a fixed adjusted history; start= slices it like yfinance does.
+    def __init__(self, frame):
+        self.frame = frame
+        self.starts = []
+
+    def history(self, start=None, period=None, auto_adjust=True):
+        self.starts.append(start)
+        return self.frame if start is None else self.frame[self.frame.index >= start]
+
+
+def with_actions(frame, dividends=None, splits=None):
+    frame = frame.copy()
+    frame['Dividends'] = pd.Series(dividends or {}, dtype=float).reindex(frame.index, fill_value=0.0)
+    frame['Stock Splits'] = pd.Series(splits or {}, dtype=float).reindex(frame.index, fill_value=0.0)
+    return frame
+
+
+def test_update_appends_when_no_new_corporate_action(store, monkeypatch):
+    dates = ['2024-01-02', '2024-01-03', '2024-01-04']
+    ticker = FakeTicker(with_actions(history(dates[:2], [10, 11]), dividends={pd.Timestamp('2024-01-02'): 0.5}))
+    monkeypatch.setattr('price_store.yf.Ticker', lambda symbol: ticker)
+    store.update('AAPL', force=True)
+    ticker.frame = with_actions(history(dates, [10, 11, 12]), dividends={pd.Timestamp('2024-01-02'): 0.5})
+    assert store.update('AAPL', force=True) == 1
+    assert ticker.starts == [None, '2024-01-03']
+    assert list(store.read('AAPL')['close']) == [10, 11, 12]
+
+
+def test_split_in_fetched_window_rebuilds_the_adjusted_history(store, monkeypatch):
+    ticker = FakeTicker(with_actions(history(['2024-01-02', '2024-01-03'], [100, 110])))
+    monkeypatch.setattr('price_store.yf.Ticker', lambda symbol: ticker)
+    store.update('AAPL', force=True)
+    # A 2:1 split on 01-04: Yahoo now reports every earlier bar halved.
+    ticker.frame = with_actions(history(['2024-01-02', '2024-01-03', '2024-01-04'], [50, 55, 56]),
+                                splits={pd.Timestamp('2024-01-04'): 2.0})
+    assert store.update('AAPL', force=True) == 3
+    assert ticker.starts == [None, '2024-01-03', '2024-01-02']
+    assert list(store.read('AAPL')['close']) == [50, 55, 56]
+    # The split is now part of the stored basis; later updates append again.
+    assert store.update('AAPL', force=True) == 0
+    assert ticker.starts[-1] == '2024-01-04'
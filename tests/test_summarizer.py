@@ -0,0 +1,60 @@
+import pytest
+
+import summarizer
+
+
+@pytest.mark.parametrize('sentence', [
+    'Subscribe now to get the full story delivered to your inbox.',
+    'Sign up for our newsletter to get market news every morning.',
+    'We use cookies to improve your experience on this site.',
+    'The Motley Fool has positions in and recommends Apple and Microsoft.',
+    'Copyright © 2024 Example Media. All rights reserved.',
+    'Click here to read the full earnings call transcript.',
+])
+def test_boilerplate_sentences_are_dropped(sentence):
+    assert summarizer.is_boilerplate(sentence)
+
+
+@pytest.mark.parametrize('sentence', [
+    'Netflix added 9 million paid subscribers in the quarter, well above estimates.',
+    'Boeing said the backlog in the aerospace unit grew to a record this year.',
+    'Apple plans to ship a new design in the fall lineup of its flagship phones.',
+    'Mondelez said its cookie brands drove most of the growth in North America.',
+    'Fannie Mae is a government-sponsored lender that buys mortgages from banks.',
+])
+def test_finance_sentences_are_kept(sentence):
+    assert not summarizer.is_boilerplate(sentence)
+
+
+def test_summary_fits_budget_and_keeps_order():
+    sentences = [f"Sentence number {index} talks about revenue growth at the company this quarter." for index in range(40)]
+    text = ' '.join(sentences)
+    summary = summarizer.summarize(text, max_tokens=50)
+    assert 0 < len(summary) <= 50 * summarizer.CHARS_PER_TOKEN
+    positions = [text.index(sentence) for sentence in summarizer.split_sentences(summary)]
+    assert positions == sorted(positions)
+
+
+def test_summarize_many_skips_repeated_sentences():
+    text = "Apple reported record revenue for the quarter. Services revenue grew by double digits again. " * 3
+    first, second = summarizer.summarize_many([text, text], tokens_per_text=100)
+    assert first
+    assert second is None
+
+
+def test_long_sentence_is_cut_to_the_budget():
+    text = 'Apple said ' + ' and '.join(f'segment {index} revenue grew' for index in range(200)) + '.'
+    summary = summarizer.summarize(text, max_tokens=50)
+    assert summary.startswith('Apple said segment 0 revenue grew')
+    assert 0 < len(summary) <= 50 * summarizer.CHARS_PER_TOKEN
+
+
+@pytest.mark.parametrize('text', ['Apple shares jumped.', 'Content not available'])
+def test_short_text_is_passed_through(text):
+    assert summarizer.summarize(text) == text
+    assert summarizer.summarize_many([text]) == [text]
+
+
+def test_empty_text_is_not_reported_as_a_duplicate():
+    assert summarizer.summarize_many(['Apple reported record revenue for the quarter.', '', None]) == [
+        'Apple reported record revenue for the quarter.', '', '']
@@ -0,0 +1,84 @@
+import os
+import threading
+import time
+
+import ticker_index
+from ticker_index import TickerIndex, parse_symbol_list
+
+ENTRIES = [
+    ('AAPL', 'Apple Inc.'),
+    ('AAP', 'Advance Auto Parts Inc.'),
+    ('APLE', 'Apple Hospitality REIT Inc.'),
+    ('MSFT', 'Microsoft Corporation'),
+    ('SO', 'Southern Company'),
+    ('SOFI', 'SoFi Technologies Inc.'),
+    ('PNAP', 'Pineapple Energy Inc.'),
+]
+
+
+def symbols(results):
+    return [result['symbol'] for result in results]
+
+
+def test_exact_symbol_ranks_first_then_prefixes():
+    index = TickerIndex(ENTRIES)
+    assert symbols(index.search('AAP', 3)) == ['AAP', 'AAPL']
+
+
+def test_name_prefix_before_substring():
+    index = TickerIndex(ENTRIES)
+    results = symbols(index.search('apple', 5))
+    assert results[:2] == ['AAPL', 'APLE']
+    assert results[2] == 'PNAP'
+
+
+def test_short_symbol_does_not_hide_longer_exact_match():
+    index = TickerIndex(ENTRIES)
+    assert symbols(index.search('sofi', 1)) == ['SOFI']
+
+
+def test_fuzzy_match_for_typos():
+    index = TickerIndex(ENTRIES)
+    assert 'MSFT' in symbols(index.search('microsfot', 3))
+
+
+def test_name_lookup():
+    index = TickerIndex(ENTRIES)
+    assert index.name('msft') == 'Microsoft Corporation'
+    assert index.name('NOPE') is None
+
+
+def test_parses_nasdaq_trader_directory():
+    text = (
+        "Nasdaq Traded|Symbol|Security Name|Listing Exchange|Market Category|ETF|Round Lot Size|Test Issue|"
+        "Financial Status|CQS Symbol|NASDAQ Symbol|NextShares\n"
+        "Y|SOFI|SoFi Technologies, Inc. - Common Stock|Q|Q|N|100|N|N||SOFI|N\n"
+        "Y|ZXZZT|NASDAQ TEST STOCK|Q|G|N|100|Y|N||ZXZZT|N\n"
+        "File Creation Time: 1017202600:00|||||||||||\n"
+    )
+    assert parse_symbol_list(text) == [('SOFI', 'SoFi Technologies, Inc. - Common Stock')]
+
+
+def test_parses_bundled_csv():
+    assert parse_symbol_list("symbol,name\nAAPL,Apple Inc.\n") == [('AAPL', 'Apple Inc.')]
+
+
+def start_refresh_with_cache(monkeypatch, tmp_path, age):
+    path = tmp_path / 'tickers_cache.csv'
+    path.write_text('symbol,name\nAAPL,Apple Inc.\n')
+    os.utime(path, (time.time() - age, time.time() - age))
+    refreshed = threading.Event()
+    monkeypatch.setattr(ticker_index, 'refresh', lambda url, path: refreshed.set())
+    stop = ticker_index.start_refresh(interval=3600, url='https://example.com/tickers.txt', path=str(path))
+    try:
+        return refreshed.wait(1)
+    finally:
+        stop.set()
+
+
+def test_fresh_cache_skips_the_startup_download(monkeypatch, tmp_path):
+    assert not start_refresh_with_cache(monkeypatch, tmp_path, age=60)
+
+
+def test_stale_cache_is_refreshed_at_startup(monkeypatch, tmp_path):
+    assert start_refresh_with_cache(monkeypatch, tmp_path, age=7200)
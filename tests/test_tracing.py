@@ -0,0 +1,37 @@
+import contextvars
+import threading
+
+import tracing
+
+
+def watched(trace):
+    return set(tracing.profiler._targets.get(trace, ()))
+
+
+def test_pool_thread_is_profiled_only_inside_its_stages():
+    trace, token = tracing.start_request('/analyze', profile=True)
+    try:
+        request_thread = threading.get_ident()
+        seen = {}
+
+        def work():
+            pool_thread = threading.get_ident()
+            with tracing.stage('fetch'):
+                with tracing.stage('parse'):
+                    pass
+                seen['nested'] = watched(trace)
+            seen['after'] = watched(trace)
+            seen['pool'] = pool_thread
+
+        worker = threading.Thread(target=contextvars.copy_context().run, args=(work,))
+        worker.start()
+        worker.join()
+
+        assert seen['nested'] == {request_thread, seen['pool']}
+        assert seen['after'] == {request_thread}
+        with tracing.stage('render'):
+            pass
+        assert watched(trace) == {request_thread}
+    finally:
+        tracing.finish_request(trace, token, status=200)
+    assert watched(trace) == set()
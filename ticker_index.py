@@ -0,0 +1,210 @@
+import bisect
+import csv
+import difflib
+import io
+import logging
+import os
+import re
+import threading
+import time
+
+import http_client
+
+# The bundled list only covers large caps so the index works offline; the
+# full directory (every NASDAQ, NYSE and other US-listed symbol) is
+# downloaded every TICKER_REFRESH_INTERVAL and cached in TICKER_CACHE_PATH,
+# which later starts reuse until it is that old. Set TICKER_LIST_URL to an empty
+# string to stay on the bundled list.
+TICKER_LIST_PATH = os.getenv('TICKER_LIST_PATH', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'tickers.csv'))
+TICKER_CACHE_PATH = os.getenv('TICKER_CACHE_PATH', 'tickers_cache.csv')
+TICKER_LIST_URL = os.getenv('TICKER_LIST_URL', 'https://www.nasdaqtrader.com/dynamic/SymDir/nasdaqtraded.txt')
+TICKER_REFRESH_INTERVAL = float(os.getenv('TICKER_REFRESH_INTERVAL', 86400))
+DEFAULT_LIMIT = 5
+MAX_LIMIT = 50
+
+_WORD = re.compile(r'[a-z0-9]+')
+
+# Ranks, best first.
+EXACT, SYMBOL_PREFIX, NAME_PREFIX, SUBSTRING, FUZZY = range(5)
+
+
+class TickerIndex:
+    # Sorted symbol and name-word arrays answer prefix queries with bisect;
+    # substring queries scan one lower-cased haystack with str.find, which
+    # runs in C. difflib only runs when the cheaper tiers come up short.
+    def __init__(self, entries):
+        entries = sorted({symbol.upper(): name for symbol, name in entries if symbol}.items())
+        self.symbols = [symbol for symbol, _ in entries]
+        self.names = [name for _, name in entries]
+
+        words = []
+        for position, name in enumerate(self.names):
+            for word in set(_WORD.findall(name.lower())):
+                words.append((word, position))
+        words.sort()
+        self._words = [word for word, _ in words]
+        self._word_positions = [position for _, position in words]
+
+        lines = [f"{symbol}\t{name}".lower() for symbol, name in entries]
+        self._line_starts = []
+        offset = 0
+        for line in lines:
+            self._line_starts.append(offset)
+            offset += len(line) + 1
+        self._haystack = '\n'.join(lines)
+
+    def __len__(self):
+        return len(self.symbols)
+
+    def _prefix_range(self, keys, prefix):
+        start = bisect.bisect_left(keys, prefix)
+        end = bisect.bisect_left(keys, prefix + '\uffff', start)
+        return start, end
+
+    def name(self, symbol):
+        position = bisect.bisect_left(self.symbols, symbol.upper())
+        if position < len(self.symbols) and self.symbols[position] == symbol.upper():
+            return self.names[position]
+        return None
+
+    def search(self, query, limit=DEFAULT_LIMIT):
+        query = query.strip()
+        if not query or limit <= 0:
+            return []
+
+        ranked = {}
+
+        def add(position, rank):
+            if position not in ranked or rank < ranked[position]:
+                ranked[position] = rank
+
+        symbol_query = query.upper()
+        start, end = self._prefix_range(self.symbols, symbol_query)
+        for position in range(start, end):
+            add(position, EXACT if self.symbols[position] == symbol_query else SYMBOL_PREFIX)
+
+        lowered = query.lower()
+        word_query = ' '.join(_WORD.findall(lowered))
+        if word_query and ' ' not in word_query:
+            start, end = self._prefix_range(self._words, word_query)
+            for index in range(start, end):
+                add(self._word_positions[index], NAME_PREFIX)
+
+        if len(ranked) < limit:
+            offset = self._haystack.find(lowered)
+            while offset != -1 and len(ranked) < limit * 4:
+                add(bisect.bisect_right(self._line_starts, offset) - 1, SUBSTRING)
+                offset = self._haystack.find(lowered, offset + 1)
+
+        if len(ranked) < limit:
+            # Typos rarely hit the first character, so only compare against
+            # symbols and name words sharing it.
+            start, end = self._prefix_range(self.symbols, symbol_query[0])
+            for symbol in difflib.get_close_matches(symbol_query, self.symbols[start:end], n=limit, cutoff=0.6):
+                add(bisect.bisect_left(self.symbols, symbol), FUZZY)
+            if word_query:
+                start, end = self._prefix_range(self._words, word_query[0])
+                candidates = sorted(set(self._words[start:end]))
+                for word in difflib.get_close_matches(word_query, candidates, n=limit, cutoff=0.6):
+                    first, last = self._prefix_range(self._words, word)
+                    for index in range(first, last):
+                        if self._words[index] == word:
+                            add(self._word_positions[index], FUZZY)
+
+        best = sorted(ranked, key=lambda position: (ranked[position], len(self.symbols[position]), self.symbols[position]))
+        return [{'symbol': self.symbols[position], 'name': self.names[position]} for position in best[:limit]]
+
+
+def parse_symbol_list(text):
+    # Accepts the bundled "symbol,name" CSV or NASDAQ Trader's pipe-delimited
+    # symbol directory (Symbol / Security Name columns, trailing
+    # "File Creation Time" line, Test Issue rows skipped).
+    delimiter = '|' if '|' in text.split('\n', 1)[0] else ','
+    rows = csv.DictReader(io.StringIO(text), delimiter=delimiter)
+    entries = []
+    for row in rows:
+        symbol = row.get('symbol') or row.get('Symbol') or row.get('NASDAQ Symbol')
+        name = row.get('name') or row.get('Security Name') or ''
+        if not symbol or symbol.startswith('File Creation Time') or row.get('Test Issue') == 'Y':
+            continue
+        entries.append((symbol.strip(), name.strip()))
+    return entries
+
+
+def load_index(path=None):
+    # Defaults to the last downloaded list, falling back to the bundled one.
+    if path is None:
+        path = TICKER_CACHE_PATH if os.path.exists(TICKER_CACHE_PATH) else TICKER_LIST_PATH
+    with open(path, encoding='utf-8') as f:
+        index = TickerIndex(parse_symbol_list(f.read()))
+    logging.info(f"Loaded {len(index)} ticker symbols from {path}")
+    return index
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def get_index():
+    global _index
+    if _index is None:
+        with _index_lock:
+            if _index is None:
+                _index = load_index()
+    return _index
+
+
+def search(query, limit=DEFAULT_LIMIT):
+    return get_index().search(query, max(1, min(limit, MAX_LIMIT)))
+
+
+def company_name(symbol):
+    return get_index().name(symbol) if symbol else None
+
+
+def refresh(url=TICKER_LIST_URL, path=TICKER_CACHE_PATH):
+    # Downloads a new symbol list, swaps the in-memory index and caches it in
+    # path so the next start uses it too. The bundled list is never touched.
+    global _index
+
+    text = http_client.get(url, timeout=30).text
+    index = TickerIndex(parse_symbol_list(text))
+    if len(index) == 0:
+        raise ValueError(f"No symbols found at {url}")
+
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(['symbol', 'name'])
+        writer.writerows(zip(index.symbols, index.names))
+    os.replace(tmp_path, path)
+
+    with _index_lock:
+        _index = index
+    logging.info(f"Refreshed ticker index with {len(index)} symbols from {url}")
+
+
+def start_refresh(interval=TICKER_REFRESH_INTERVAL, url=TICKER_LIST_URL, path=TICKER_CACHE_PATH):
+    # The first download waits until the cached list is interval old, so
+    # restarts do not each fetch the whole directory.
+    if not url:
+        return None
+    stop = threading.Event()
+    try:
+        delay = interval - (time.time() - os.path.getmtime(path))
+    except OSError:
+        delay = 0
+
+    def loop():
+        if delay > 0:
+            logging.info(f"Ticker cache {path} is fresh, next refresh in {delay:.0f}s")
+            stop.wait(delay)
+        while not stop.is_set():
+            try:
+                refresh(url, path)
+            except Exception as e:
+                logging.error(f"Failed to refresh ticker index: {e}")
+            stop.wait(interval)
+
+    threading.Thread(target=loop, name='ticker-refresh', daemon=True).start()
+    return stop
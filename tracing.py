@@ -0,0 +1,355 @@
+import collections
+import contextlib
+import contextvars
+import itertools
+import logging
+import os
+import random
+import sys
+import threading
+import time
+
+TRACE_WINDOW = int(os.getenv('TRACE_WINDOW', 2048))
+TRACE_HISTORY = int(os.getenv('TRACE_HISTORY', 50))
+TRACE_SLOW_SECONDS = float(os.getenv('TRACE_SLOW_SECONDS', 10))
+PROFILE_SAMPLE_RATE = float(os.getenv('PROFILE_SAMPLE_RATE', 0))
+PROFILE_INTERVAL = float(os.getenv('PROFILE_INTERVAL', 0.005))
+PROFILE_MAX_DEPTH = 48
+PROFILE_TOP_STACKS = 20
+QUANTILES = (0.5, 0.95, 0.99)
+METRIC_PREFIX = 'stocknews'
+# Route label for requests that matched no route, so arbitrary paths (scans,
+# typos) share one set of timings instead of adding a label each.
+UNMATCHED_ROUTE = 'unmatched'
+
+_current = contextvars.ContextVar('trace', default=None)
+_trace_ids = itertools.count(1)
+
+
+class Timings:
+    # Rolling window of the last TRACE_WINDOW durations for percentiles,
+    # plus lifetime count/sum/errors and an in-flight gauge.
+    def __init__(self):
+        self.samples = collections.deque(maxlen=TRACE_WINDOW)
+        self.count = 0
+        self.total = 0.0
+        self.errors = 0
+        self.in_flight = 0
+
+    def quantiles(self):
+        ordered = sorted(self.samples)
+        if not ordered:
+            return {q: None for q in QUANTILES}
+        return {q: ordered[min(int(q * len(ordered)), len(ordered) - 1)] for q in QUANTILES}
+
+    def to_dict(self):
+        quantiles = self.quantiles()
+        result = {'count': self.count, 'errors': self.errors, 'in_flight': self.in_flight}
+        for q, value in quantiles.items():
+            result[f'p{int(q * 100)}_ms'] = round(value * 1000, 2) if value is not None else None
+        return result
+
+
+_lock = threading.Lock()
+_stages = collections.defaultdict(Timings)
+_routes = collections.defaultdict(Timings)
+_sources = collections.defaultdict(lambda: {'requests': 0, 'errors': 0})
+_tokens = {'prompt': 0, 'output': 0}
+_history = collections.deque(maxlen=TRACE_HISTORY)
+
+
+class Trace:
+    def __init__(self, route, profile=False):
+        self.id = f"{next(_trace_ids):x}-{random.getrandbits(32):08x}"
+        self.route = route
+        self.started = time.perf_counter()
+        self.started_at = time.time()
+        self.duration = None
+        self.status = None
+        self.error = None
+        self.spans = []
+        self.samples = collections.Counter() if profile else None
+
+    @property
+    def profiled(self):
+        return self.samples is not None
+
+    def to_dict(self, spans=True):
+        result = {
+            'trace_id': self.id,
+            'route': self.route,
+            'started_at': self.started_at,
+            'duration_ms': round(self.duration * 1000, 2) if self.duration is not None else None,
+            'status': self.status,
+            'error': self.error,
+        }
+        if spans:
+            result['spans'] = list(self.spans)
+            result['stage_totals_ms'] = self.stage_totals()
+        if self.profiled:
+            result['profile'] = [
+                {'stack': stack, 'samples': count}
+                for stack, count in self.samples.most_common(PROFILE_TOP_STACKS)
+            ]
+        return result
+
+    def stage_totals(self):
+        totals = collections.defaultdict(float)
+        for span in list(self.spans):
+            totals[span['stage']] += span['ms']
+        return {stage: round(ms, 2) for stage, ms in totals.items()}
+
+
+class SamplingProfiler:
+    # While profiled requests are running, a background thread snapshots
+    # sys._current_frames() every PROFILE_INTERVAL and counts the collapsed
+    # stack of every thread working for each request (the request thread
+    # plus any pool thread while it is inside a stage for it). Watches are
+    # counted per thread, so nested stages keep a thread watched until the
+    # outermost one exits.
+    def __init__(self, interval=PROFILE_INTERVAL):
+        self.interval = interval
+        self._targets = {}
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread = None
+
+    def watch(self, trace, thread_id):
+        with self._lock:
+            self._targets.setdefault(trace, collections.Counter())[thread_id] += 1
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='sampling-profiler', daemon=True)
+                self._thread.start()
+        self._wake.set()
+
+    def unwatch_thread(self, trace, thread_id):
+        with self._lock:
+            threads = self._targets.get(trace)
+            if threads is None:
+                return
+            threads[thread_id] -= 1
+            if threads[thread_id] <= 0:
+                del threads[thread_id]
+
+    def unwatch(self, trace):
+        with self._lock:
+            self._targets.pop(trace, None)
+
+    def _run(self):
+        own = threading.get_ident()
+        while True:
+            with self._lock:
+                targets = {trace: set(threads) for trace, threads in self._targets.items()}
+            if not targets:
+                self._wake.wait()
+                self._wake.clear()
+                continue
+            frames = sys._current_frames()
+            for trace, threads in targets.items():
+                for thread_id in threads:
+                    frame = frames.get(thread_id)
+                    if frame is not None and thread_id != own:
+                        trace.samples[collapse(frame)] += 1
+            time.sleep(self.interval)
+
+
+def collapse(frame):
+    # Root-first "file:function;file:function" (flamegraph collapsed format).
+    names = []
+    while frame is not None and len(names) < PROFILE_MAX_DEPTH:
+        code = frame.f_code
+        names.append(f"{os.path.basename(code.co_filename)}:{code.co_name}")
+        frame = frame.f_back
+    return ';'.join(reversed(names))
+
+
+profiler = SamplingProfiler()
+
+
+def current():
+    return _current.get()
+
+
+def start_request(route, profile=False):
+    # route is the matched route's template (not the raw path), or
+    # UNMATCHED_ROUTE. profile: True forces the sampling profiler on for
+    # this request; otherwise PROFILE_SAMPLE_RATE decides.
+    profile = profile or (PROFILE_SAMPLE_RATE > 0 and random.random() < PROFILE_SAMPLE_RATE)
+    trace = Trace(route, profile)
+    token = _current.set(trace)
+    with _lock:
+        _routes[route].in_flight += 1
+    if trace.profiled:
+        profiler.watch(trace, threading.get_ident())
+    return trace, token
+
+
+def finish_request(trace, token=None, status=None, error=None):
+    if trace.duration is not None:
+        return
+    trace.duration = time.perf_counter() - trace.started
+    trace.status = status
+    trace.error = error
+    if trace.profiled:
+        profiler.unwatch(trace)
+    if token is not None:
+        try:
+            _current.reset(token)
+        except ValueError:
+            # Finished from a different context (e.g. after a streamed body).
+            pass
+
+    with _lock:
+        timings = _routes[trace.route]
+        timings.in_flight -= 1
+        timings.count += 1
+        timings.total += trace.duration
+        timings.samples.append(trace.duration)
+        if error is not None or (status is not None and status >= 500):
+            timings.errors += 1
+        _history.append(trace)
+
+    if trace.duration >= TRACE_SLOW_SECONDS:
+        totals = ' '.join(f"{stage}={ms:.0f}ms" for stage, ms in trace.stage_totals().items())
+        logging.warning(f"Slow request {trace.id} {trace.route} took {trace.duration:.1f}s: {totals}")
+
+
+@contextlib.contextmanager
+def stage(name, source=None, **attributes):
+    # Times one step of a request. Records into the stage's rolling window,
+    # counts errors (and requests/errors per source when given) and adds a
+    # span to the current request's trace, if any. Yields the span dict so
+    # callers can attach attributes such as token counts.
+    trace = _current.get()
+    span = {'stage': name, 'ms': None}
+    if source:
+        span['source'] = source
+    span.update(attributes)
+    profiled = trace is not None and trace.profiled
+    if profiled:
+        profiler.watch(trace, threading.get_ident())
+
+    with _lock:
+        _stages[name].in_flight += 1
+    started = time.perf_counter()
+    error = None
+    try:
+        yield span
+    except Exception as e:
+        error = e
+        raise
+    finally:
+        elapsed = time.perf_counter() - started
+        span['ms'] = round(elapsed * 1000, 2)
+        if error is not None:
+            span['error'] = type(error).__name__
+        with _lock:
+            timings = _stages[name]
+            timings.in_flight -= 1
+            timings.count += 1
+            timings.total += elapsed
+            timings.samples.append(elapsed)
+            if error is not None:
+                timings.errors += 1
+            if source:
+                _sources[source]['requests'] += 1
+                if error is not None:
+                    _sources[source]['errors'] += 1
+        if trace is not None:
+            trace.spans.append(span)
+        if profiled:
+            profiler.unwatch_thread(trace, threading.get_ident())
+
+
+def record_tokens(span, response):
+    # Gemini responses carry usage_metadata; older clients and stubs may not.
+    usage = getattr(response, 'usage_metadata', None)
+    prompt = getattr(usage, 'prompt_token_count', None) or 0
+    output = getattr(usage, 'candidates_token_count', None) or 0
+    if not usage:
+        return
+    span['prompt_tokens'] = prompt
+    span['output_tokens'] = output
+    with _lock:
+        _tokens['prompt'] += prompt
+        _tokens['output'] += output
+
+
+def get_trace(trace_id):
+    with _lock:
+        for trace in _history:
+            if trace.id == trace_id:
+                return trace
+    return None
+
+
+def stats():
+    with _lock:
+        stages = {name: timings.to_dict() for name, timings in _stages.items()}
+        routes = {route: timings.to_dict() for route, timings in _routes.items()}
+        sources = {
+            source: dict(counts, error_rate=round(counts['errors'] / counts['requests'], 4) if counts['requests'] else 0.0)
+            for source, counts in _sources.items()
+        }
+        tokens = dict(_tokens)
+        history = list(_history)
+    slowest = sorted(history, key=lambda trace: trace.duration, reverse=True)[:5]
+    return {
+        'stages': stages,
+        'routes': routes,
+        'sources': sources,
+        'llm_tokens': tokens,
+        'recent_traces': [trace.to_dict(spans=False) for trace in history[-10:]],
+        'slowest_traces': [trace.to_dict() for trace in slowest],
+    }
+
+
+def _escape(value):
+    # Label values escape backslash, double quote and newline.
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(**labels):
+    return ','.join(f'{key}="{_escape(value)}"' for key, value in labels.items())
+
+
+def _summary(lines, metric, help_text, timings_by_label, label):
+    lines.append(f"# HELP {METRIC_PREFIX}_{metric}_seconds {help_text}")
+    lines.append(f"# TYPE {METRIC_PREFIX}_{metric}_seconds summary")
+    for value, timings in timings_by_label.items():
+        for q, seconds in timings.quantiles().items():
+            if seconds is not None:
+                lines.append(f"{METRIC_PREFIX}_{metric}_seconds{{{_labels(**{label: value}, quantile=q)}}} {seconds:.6f}")
+        lines.append(f"{METRIC_PREFIX}_{metric}_seconds_sum{{{_labels(**{label: value})}}} {timings.total:.6f}")
+        lines.append(f"{METRIC_PREFIX}_{metric}_seconds_count{{{_labels(**{label: value})}}} {timings.count}")
+    lines.append(f"# TYPE {METRIC_PREFIX}_{metric}_errors_total counter")
+    for value, timings in timings_by_label.items():
+        lines.append(f"{METRIC_PREFIX}_{metric}_errors_total{{{_labels(**{label: value})}}} {timings.errors}")
+    lines.append(f"# TYPE {METRIC_PREFIX}_{metric}_in_flight gauge")
+    for value, timings in timings_by_label.items():
+        lines.append(f"{METRIC_PREFIX}_{metric}_in_flight{{{_labels(**{label: value})}}} {timings.in_flight}")
+
+
+def prometheus(extra_counters=None):
+    # Prometheus text exposition format. Latencies are summaries whose
+    # quantiles come from the rolling window; _sum/_count are lifetime.
+    # extra_counters: {name: {counter: value}} from other modules' stats().
+    lines = []
+    with _lock:
+        _summary(lines, 'stage', 'Time spent in each request stage.', _stages, 'stage')
+        _summary(lines, 'request', 'Request latency by route.', _routes, 'route')
+        lines.append(f"# TYPE {METRIC_PREFIX}_source_requests_total counter")
+        for source, counts in _sources.items():
+            lines.append(f"{METRIC_PREFIX}_source_requests_total{{{_labels(source=source)}}} {counts['requests']}")
+        lines.append(f"# TYPE {METRIC_PREFIX}_source_errors_total counter")
+        for source, counts in _sources.items():
+            lines.append(f"{METRIC_PREFIX}_source_errors_total{{{_labels(source=source)}}} {counts['errors']}")
+        lines.append(f"# TYPE {METRIC_PREFIX}_llm_tokens_total counter")
+        for kind, count in _tokens.items():
+            lines.append(f"{METRIC_PREFIX}_llm_tokens_total{{{_labels(kind=kind)}}} {count}")
+
+    for name, counters in (extra_counters or {}).items():
+        for counter, value in counters.items():
+            if isinstance(value, (int, float)) and not isinstance(value, bool):
+                lines.append(f"{METRIC_PREFIX}_{name}_{counter} {value}")
+    return '\n'.join(lines) + '\n'